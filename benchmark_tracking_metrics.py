@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Сравнение скорости скалярного и векторизованного расчета метрик трекинга
+(переключения ID и длительность треков) на реальном видео
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+import supervision as sv
+
+from evaluate_tracking import load_config, iterate_detections, count_id_switches
+
+
+def calculate_iou(box1, box2):
+    """Вычисление IoU между двумя ограничивающими рамками"""
+    x1_1, y1_1, x2_1, y2_1 = box1
+    x1_2, y1_2, x2_2, y2_2 = box2
+    
+    # Определение координат пересечения
+    x_left = max(x1_1, x1_2)
+    y_top = max(y1_1, y1_2)
+    x_right = min(x2_1, x2_2)
+    y_bottom = min(y2_1, y2_2)
+    
+    # Проверка на пересечение
+    if x_right < x_left or y_bottom < y_top:
+        return 0.0
+    
+    # Площадь пересечения
+    intersection_area = (x_right - x_left) * (y_bottom - y_top)
+    
+    # Площади обоих боксов
+    box1_area = (x2_1 - x1_1) * (y2_1 - y1_1)
+    box2_area = (x2_2 - x1_2) * (y2_2 - y1_2)
+    
+    # IoU
+    iou = intersection_area / float(box1_area + box2_area - intersection_area)
+    
+    return iou
+
+
+def count_id_switches_scalar(prev_boxes, prev_ids, curr_boxes, curr_ids, iou_threshold=0.5):
+    """Исходный вариант: двойной цикл с поэлементным calculate_iou"""
+    id_switches = 0
+    for prev_idx, prev_bbox in enumerate(prev_boxes):
+        max_iou = 0
+        max_iou_idx = -1
+        for curr_idx, curr_bbox in enumerate(curr_boxes):
+            iou = calculate_iou(prev_bbox, curr_bbox)
+            if iou > max_iou:
+                max_iou = iou
+                max_iou_idx = curr_idx
+        if max_iou > iou_threshold and max_iou_idx != -1:
+            if prev_ids[prev_idx] != curr_ids[max_iou_idx]:
+                id_switches += 1
+    return id_switches
+
+
+def max_consecutive_run_scalar(frames):
+    """Исходный вариант: проход по списку кадров в цикле Python"""
+    consecutive_frames = 1
+    max_consecutive = 1
+    for i in range(1, len(frames)):
+        if frames[i] == frames[i-1] + 1:
+            consecutive_frames += 1
+        else:
+            max_consecutive = max(max_consecutive, consecutive_frames)
+            consecutive_frames = 1
+    return max(max_consecutive, consecutive_frames)
+
+
+def max_consecutive_run(frames):
+    """Длина самой длинной серии подряд идущих номеров кадров"""
+    frames = np.asarray(frames)
+    if frames.size == 0:
+        return 0
+    
+    # Разрывы серий - места, где следующий кадр не равен предыдущему + 1
+    breaks = np.flatnonzero(np.diff(frames) != 1)
+    bounds = np.concatenate(([-1], breaks, [frames.size - 1]))
+    return int(np.diff(bounds).max())
+
+
+def motion_detections(video_path, max_frames, min_area=20):
+    """
+    Детекции без модели: области движения (вычитание фона MOG2)
+
+    Нужны, чтобы замерить метрики на реальном видео, когда весов YOLO нет
+    """
+    cap = cv2.VideoCapture(video_path)
+    subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    frame_count = 0
+    while cap.isOpened() and frame_count < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        mask = cv2.morphologyEx(subtractor.apply(frame), cv2.MORPH_OPEN, kernel)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) >= min_area]
+        xyxy = np.array([(x, y, x + w, y + h) for x, y, w, h in boxes], dtype=np.float32).reshape(-1, 4)
+        yield sv.Detections(
+            xyxy=xyxy,
+            confidence=np.ones(len(xyxy), dtype=np.float32),
+            class_id=np.zeros(len(xyxy), dtype=int)
+        )
+        frame_count += 1
+    cap.release()
+
+
+def collect_tracks(video_path, model_path, conf_threshold, iou_threshold, max_frames):
+    """
+    Результаты трекинга по кадрам (детекции берутся из кеша, если он есть)
+
+    Без model_path детекциями служат области движения
+    """
+    tracker = sv.ByteTrack()
+    if model_path:
+        frames = (
+            detections for _, _, detections in iterate_detections(
+                video_path, model_path, conf_threshold, iou_threshold, max_frames
+            )
+        )
+    else:
+        frames = motion_detections(video_path, max_frames)
+    return [tracker.update_with_detections(detections) for detections in frames]
+
+
+def benchmark(function, pairs, repeats):
+    """Лучшее время из repeats прогонов функции по всем парам кадров"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = sum(function(*pair) for pair in pairs)
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк метрик трекинга')
+    parser.add_argument('--video', type=str, default=os.path.join('videos', 'birds.mp4'), help='Путь к видеофайлу')
+    parser.add_argument('--model', type=str, help='Путь к модели YOLO')
+    parser.add_argument('--conf', type=float, default=0.25, help='Порог уверенности')
+    parser.add_argument('--iou', type=float, default=0.45, help='Порог IoU')
+    parser.add_argument('--frames', type=int, default=1000, help='Максимальное количество кадров')
+    parser.add_argument('--repeats', type=int, default=3, help='Количество повторов замера')
+    parser.add_argument('--motion', action='store_true',
+                        help='Детекции по движению вместо модели (если весов нет)')
+    args = parser.parse_args()
+
+    if args.motion:
+        args.model = None
+    else:
+        if not args.model:
+            config = load_config()
+            if config:
+                args.model = config.get('last_model')
+
+        if not args.model or not os.path.exists(args.model):
+            print("Ошибка: Файл модели не найден или не указан (для замера без модели: --motion)")
+            return
+    if not os.path.exists(args.video):
+        print("Ошибка: Видеофайл не найден")
+        return
+
+    tracked = collect_tracks(args.video, args.model, args.conf, args.iou, args.frames)
+    pairs = [
+        (prev.xyxy, prev.tracker_id, curr.xyxy, curr.tracker_id)
+        for prev, curr in zip(tracked, tracked[1:])
+        if prev.tracker_id is not None and curr.tracker_id is not None
+    ]
+
+    id_history = defaultdict(list)
+    for frame_index, detections in enumerate(tracked):
+        if detections.tracker_id is not None:
+            for track_id in detections.tracker_id:
+                id_history[track_id].append(frame_index)
+    histories = [(frames,) for frames in id_history.values()]
+
+    avg_objects = sum(len(d) for d in tracked) / max(len(tracked), 1)
+    print(f"Кадров: {len(tracked)}, объектов на кадр: {avg_objects:.1f}, треков: {len(histories)}")
+
+    scalar_time, scalar_switches = benchmark(count_id_switches_scalar, pairs, args.repeats)
+    vector_time, vector_switches = benchmark(count_id_switches, pairs, args.repeats)
+    print("\n=== Переключения ID ===")
+    print(f"Скалярный расчет:       {scalar_time * 1000:.1f} мс ({scalar_switches} переключений)")
+    print(f"Векторизованный расчет: {vector_time * 1000:.1f} мс ({vector_switches} переключений)")
+    print(f"Ускорение: {scalar_time / vector_time:.1f}x" if vector_time > 0 else "Ускорение: -")
+
+    scalar_time, scalar_total = benchmark(max_consecutive_run_scalar, histories, args.repeats)
+    vector_time, vector_total = benchmark(max_consecutive_run, histories, args.repeats)
+    print("\n=== Длительность треков ===")
+    print(f"Скалярный расчет:       {scalar_time * 1000:.1f} мс (сумма длин {scalar_total})")
+    print(f"Векторизованный расчет: {vector_time * 1000:.1f} мс (сумма длин {vector_total})")
+    print(f"Ускорение: {scalar_time / vector_time:.1f}x" if vector_time > 0 else "Ускорение: -")
+
+    if scalar_switches != vector_switches or scalar_total != vector_total:
+        print("\nВНИМАНИЕ: результаты скалярного и векторизованного расчета различаются")
+
+
+if __name__ == "__main__":
+    main()
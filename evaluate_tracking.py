@@ -10,8 +10,9 @@ import argparse
 import json
 import time
 import os
-from ultralytics import YOLO
-from collections import defaultdict, Counter
+from collections import Counter
+from src.core.model_registry import ModelRegistry
+from src.core.detection_cache import DetectionCache
 
 def load_config():
     """Загрузка конфигурации из settings.json"""
@@ -23,7 +24,142 @@ def load_config():
         print(f"Ошибка загрузки конфигурации: {e}")
         return None
 
-def evaluate_tracking(video_path, model_path, conf_threshold=0.25, iou_threshold=0.45, max_frames=5000):
+def iterate_detections(video_path, model_path, conf_threshold=0.25, iou_threshold=0.45, max_frames=None,
+                       use_cache=True, need_frames=False, imgsz=None, stats=None):
+    """
+    Генератор детекций модели (до трекера) по кадрам видео
+    
+    Детекции берутся из DetectionCache; модель запускается только для кадров,
+    которых нет в кеше. Если кадры не нужны (need_frames=False) и кеш
+    полный, видео даже не декодируется.
+    
+    Если передан словарь stats, в нем считаются кадры, взятые из кеша
+    (cached_frames) и распознанные моделью (inferred_frames).
+    
+    Yields:
+        tuple: (номер кадра, кадр или None, sv.Detections)
+    """
+    cache = None
+    if use_cache:
+        cache = DetectionCache(video_path, model_path, conf_threshold, iou_threshold, imgsz)
+        if cache.load():
+            print(f"Используем кеш детекций: {cache.path} ({cache.frame_count} кадров)")
+    
+    registry = ModelRegistry.instance()
+    model = None
+    cap = None
+    frame_index = 0
+    if stats is not None:
+        stats.setdefault("cached_frames", 0)
+        stats.setdefault("inferred_frames", 0)
+    
+    try:
+        while max_frames is None or frame_index < max_frames:
+            cached = cache is not None and cache.has_frame(frame_index)
+            if cached and not need_frames:
+                if stats is not None:
+                    stats["cached_frames"] += 1
+                yield frame_index, None, cache.get(frame_index)
+                frame_index += 1
+                continue
+            if not cached and cache is not None and cache.complete:
+                break
+            
+            # Открываем видео только когда действительно нужны кадры
+            if cap is None:
+                cap = cv2.VideoCapture(video_path)
+                if not cap.isOpened():
+                    print(f"Ошибка: Не удалось открыть видео {video_path}")
+                    return
+                if frame_index > 0:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            
+            ret, frame = cap.read()
+            if not ret:
+                if cache is not None:
+                    cache.mark_complete()
+                break
+            
+            if cached:
+                detections = cache.get(frame_index)
+            else:
+                if model is None:
+                    try:
+                        model = registry.acquire(model_path)
+                    except Exception as e:
+                        print(f"Ошибка загрузки модели: {e}")
+                        return
+                
+                # Детекция объектов
+                results = model.predict(
+                    frame, 
+                    conf=conf_threshold, 
+                    iou=iou_threshold, 
+                    verbose=False,
+                    **({'imgsz': imgsz} if imgsz else {})
+                )[0]
+                detections = sv.Detections.from_ultralytics(results)
+                if cache is not None:
+                    cache.put(frame_index, detections, results.names)
+            
+            if stats is not None:
+                stats["cached_frames" if cached else "inferred_frames"] += 1
+            yield frame_index, frame, detections
+            frame_index += 1
+    finally:
+        if cap is not None:
+            cap.release()
+        if model is not None:
+            registry.release(model)
+        if cache is not None:
+            cache.save()
+
+class TrackStats:
+    """
+    Потоковая статистика одного трека
+    
+    Хранит только счетчики (число кадров, текущую и максимальную серию
+    подряд идущих кадров, сумму уверенности, число кадров по классам),
+    поэтому память не растет с длительностью записи.
+    """
+    __slots__ = ('frames', 'first_frame', 'last_frame', 'current_run', 'max_run',
+                 'confidence_sum', 'confidence_count', 'class_counts')
+    
+    def __init__(self):
+        self.frames = 0
+        self.first_frame = -1
+        self.last_frame = -1
+        self.current_run = 0
+        self.max_run = 0
+        self.confidence_sum = 0.0
+        self.confidence_count = 0
+        self.class_counts = Counter()
+    
+    def update(self, frame_index, class_id, confidence=None):
+        """Учитывает появление трека на кадре frame_index"""
+        if self.frames and frame_index == self.last_frame + 1:
+            self.current_run += 1
+        else:
+            self.current_run = 1
+        self.max_run = max(self.max_run, self.current_run)
+        
+        if self.frames == 0:
+            self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.frames += 1
+        
+        self.class_counts[class_id] += 1
+        if confidence is not None:
+            self.confidence_sum += float(confidence)
+            self.confidence_count += 1
+    
+    @property
+    def mean_confidence(self):
+        """Средняя уверенность детекций трека"""
+        return self.confidence_sum / self.confidence_count if self.confidence_count else 0.0
+
+def evaluate_tracking(video_path, model_path, conf_threshold=0.25, iou_threshold=0.45, max_frames=5000,
+                      frame_detections=None, use_cache=True, imgsz=None, visualizer=None):
     """
     Оценка эффективности трекинга объектов
     
@@ -33,64 +169,51 @@ def evaluate_tracking(video_path, model_path, conf_threshold=0.25, iou_threshold
         conf_threshold: порог уверенности для детекций
         iou_threshold: порог IoU для детекций
         max_frames: максимальное количество кадров для обработки
+        frame_detections: список, в который сохраняются детекции модели
+            каждого кадра до трекера (память растет с числом кадров -
+            только для коротких сравнений)
+        use_cache: использовать дисковый кеш детекций
+        imgsz: размер входа модели (None - по умолчанию модели)
+        visualizer: TrackingVisualizer - кадры аннотируются и записываются
+            в том же проходе, без накопления результатов
     
     Returns:
         dict: словарь с метриками
     """
-    # Загрузка видео
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"Ошибка: Не удалось открыть видео {video_path}")
-        return None
-
-    # Загрузка модели
-    try:
-        model = YOLO(model_path)
-    except Exception as e:
-        print(f"Ошибка загрузки модели: {e}")
-        return None
-
     # Инициализация трекера
     tracker = sv.ByteTrack()
     
-    # Структуры данных для анализа
-    id_history = defaultdict(list)  # {object_id: [frame_appearances]}
-    id_class_consistency = defaultdict(list)  # {object_id: [class_ids]}
-    frame_counts = defaultdict(int)  # {object_id: frame_count}
-    id_bbox_history = defaultdict(list)  # {object_id: [bbox_positions]}
-    confidence_history = defaultdict(list)  # {object_id: [confidence_values]}
+    # Потоковая статистика: объем памяти зависит от числа треков, а не кадров
+    track_stats = {}  # {object_id: TrackStats}
     class_counts = Counter()  # Количество объектов каждого класса
+    class_names = {}  # {class_id: class_name}
     
     # Статистика для визуализации
-    track_lengths = []
     lost_tracks = 0
     id_switches = 0
-    total_tracks = 0
+    track_length_sum = 0  # сумма самых длинных серий кадров по трекам
     previous_detections = None
     
     frame_count = 0
-    processing_time = 0
+    # Время получения детекций (декодирование и модель или чтение кеша)
+    # и время трекинга с подсчетом метрик учитываются раздельно
+    detection_time = 0
+    tracking_time = 0
+    source_stats = {}  # сколько кадров взято из кеша, сколько распознано моделью
     
     print(f"Начинаем анализ видео {video_path}...")
     
-    while frame_count < max_frames:
-        start_time = time.time()
-        
-        # Чтение кадра
-        ret, frame = cap.read()
-        if not ret:
-            break
+    start_time = time.time()
+    for _, frame, detections in iterate_detections(
+        video_path, model_path, conf_threshold, iou_threshold, max_frames, use_cache,
+        need_frames=visualizer is not None, imgsz=imgsz, stats=source_stats
+    ):
+        detected_time = time.time()
+        detection_time += detected_time - start_time
         
-        # Детекция объектов
-        results = model.predict(
-            frame, 
-            conf=conf_threshold, 
-            iou=iou_threshold, 
-            verbose=False
-        )[0]
-        
-        # Конвертация результатов для трекера
-        detections = sv.Detections.from_ultralytics(results)
+        # Сохраняем детекции кадра до трекера (для сравнения моделей)
+        if frame_detections is not None:
+            frame_detections.append(detections)
         
         # Применение трекинга
         detections = tracker.update_with_detections(detections)
@@ -101,116 +224,96 @@ def evaluate_tracking(video_path, model_path, conf_threshold=0.25, iou_threshold
                 if track_id is None:
                     continue
                     
-                # Сохраняем информацию о появлении ID на кадрах
-                id_history[track_id].append(frame_count)
-                
-                # Сохраняем класс объекта
+                # Обновляем статистику трека: серии кадров, классы, уверенность
                 class_id = int(detections.class_id[i])
-                id_class_consistency[track_id].append(class_id)
-                
-                # Подсчет кадров для каждого ID
-                frame_counts[track_id] += 1
-                
-                # Сохраняем позицию bbox
-                id_bbox_history[track_id].append(detections.xyxy[i])
+                confidence = detections.confidence[i] if detections.confidence is not None else None
+                stats = track_stats.get(track_id)
+                if stats is None:
+                    stats = track_stats[track_id] = TrackStats()
+                previous_run = stats.max_run
+                stats.update(frame_count, class_id, confidence)
+                track_length_sum += stats.max_run - previous_run
                 
                 # Подсчет классов
-                class_name = results.names[class_id]
+                class_name = get_class_name(detections, i)
+                class_names[class_id] = class_name
                 class_counts[class_name] += 1
-                
-                # Сохраняем значение уверенности
-                if detections.confidence is not None:
-                    confidence_history[track_id].append(detections.confidence[i])
             
             # Проверка на переключение ID (ID switch)
-            if previous_detections is not None and detections.tracker_id is not None:
-                # Проверяем IoU между предыдущими и текущими боксами
-                for prev_idx, prev_bbox in enumerate(previous_detections.xyxy):
-                    prev_id = previous_detections.tracker_id[prev_idx]
-                    if prev_id is None:
-                        continue
-                        
-                    # Проверяем, остался ли тот же ID для похожей позиции
-                    max_iou = 0
-                    max_iou_idx = -1
-                    
-                    for curr_idx, curr_bbox in enumerate(detections.xyxy):
-                        curr_id = detections.tracker_id[curr_idx]
-                        if curr_id is None:
-                            continue
-                            
-                        # Вычисляем IoU
-                        iou = calculate_iou(prev_bbox, curr_bbox)
-                        if iou > max_iou:
-                            max_iou = iou
-                            max_iou_idx = curr_idx
-                    
-                    # Если нашли соответствие с высоким IoU, но ID разные
-                    if max_iou > 0.5 and max_iou_idx != -1:
-                        curr_id = detections.tracker_id[max_iou_idx]
-                        if prev_id != curr_id:
-                            id_switches += 1
+            if previous_detections is not None and previous_detections.tracker_id is not None:
+                id_switches += count_id_switches(
+                    previous_detections.xyxy, previous_detections.tracker_id,
+                    detections.xyxy, detections.tracker_id
+                )
             
             previous_detections = detections
         
-        # Измерение времени обработки
+        # Измерение времени трекинга
         end_time = time.time()
-        processing_time += (end_time - start_time)
+        tracking_time += end_time - detected_time
+        start_time = end_time
+        
+        # Аннотация и запись кадра с текущими значениями метрик
+        # (время записи в скорость обработки не входит)
+        if visualizer is not None:
+            visualizer.write(frame, detections, {
+                "total_tracks": len(track_stats),
+                "id_switches": id_switches,
+                "avg_track_length": track_length_sum / len(track_stats) if track_stats else 0
+            })
+            start_time = time.time()
         
         frame_count += 1
         
         if frame_count % 100 == 0:
             print(f"Обработано {frame_count} кадров")
     
-    cap.release()
+    if frame_count == 0:
+        print(f"Ошибка: Не удалось получить кадры из {video_path}")
+        return None
     
-    # Анализ длительности треков
-    for track_id, frames in id_history.items():
-        # Проверяем непрерывность трека
-        track_length = len(frames)
-        consecutive_frames = 1
-        max_consecutive = 1
-        
-        for i in range(1, track_length):
-            if frames[i] == frames[i-1] + 1:
-                consecutive_frames += 1
-            else:
-                max_consecutive = max(max_consecutive, consecutive_frames)
-                consecutive_frames = 1
-        
-        max_consecutive = max(max_consecutive, consecutive_frames)
-        track_lengths.append(max_consecutive)
-        total_tracks += 1
-        
-        # Проверка консистентности классов
-        if len(set(id_class_consistency[track_id])) > 1:
-            print(f"ВНИМАНИЕ: Трек ID {track_id} имеет разные классы: {[results.names[c] for c in id_class_consistency[track_id]]}")
+    # Проверка консистентности классов
+    for track_id, stats in track_stats.items():
+        if len(stats.class_counts) > 1:
+            classes = {class_names.get(c, c): n for c, n in stats.class_counts.items()}
+            print(f"ВНИМАНИЕ: Трек ID {track_id} имеет разные классы: {classes}")
+    total_tracks = len(track_stats)
     
     # Вычисление потерянных треков
-    for track_id, frames in id_history.items():
-        if len(frames) < frame_count * 0.1:  # Трек считается потерянным, если он присутствует менее чем в 10% кадров
+    for stats in track_stats.values():
+        if stats.frames < frame_count * 0.1:  # Трек считается потерянным, если он присутствует менее чем в 10% кадров
             lost_tracks += 1
     
     # Расчет средней уверенности по трекам
-    confidence_averages = {}
-    for track_id, confidences in confidence_history.items():
-        if confidences:
-            confidence_averages[track_id] = np.mean(confidences)
-        else:
-            confidence_averages[track_id] = 0.0
+    confidence_averages = {
+        track_id: stats.mean_confidence
+        for track_id, stats in track_stats.items()
+        if stats.confidence_count > 0
+    }
+    frame_counts = {track_id: stats.frames for track_id, stats in track_stats.items()}
 
     # Расчет метрик
-    avg_track_length = np.mean(track_lengths) if track_lengths else 0
-    avg_processing_time = processing_time / frame_count if frame_count > 0 else 0
-    
-    # Формирование результатов
+    avg_track_length = track_length_sum / total_tracks if total_tracks else 0
+    processing_time = detection_time + tracking_time
+    
+    # Формирование результатов. fps - полный цикл (детекции + трекинг);
+    # если детекции взяты из кеша (detections_cached), он не отражает
+    # скорость модели и не сравним с прогоном без кеша - для этого есть
+    # detection_fps (только без кеша) и tracking_fps
+    cached_frames = source_stats.get("cached_frames", 0)
     metrics = {
         "total_frames": frame_count,
         "total_tracks": total_tracks,
         "lost_tracks": lost_tracks,
         "id_switches": id_switches,
         "avg_track_length": avg_track_length,
-        "fps": 1.0 / avg_processing_time if avg_processing_time > 0 else 0,
+        "fps": frame_count / processing_time if processing_time > 0 else 0,
+        "detection_fps": frame_count / detection_time if not cached_frames and detection_time > 0 else 0,
+        "tracking_fps": frame_count / tracking_time if tracking_time > 0 else 0,
+        "detection_time": detection_time,
+        "tracking_time": tracking_time,
+        "detections_cached": cached_frames > 0,
+        "cached_frames": cached_frames,
         "class_distribution": dict(class_counts),
         "confidence_averages": confidence_averages,
         "longest_tracks": sorted(frame_counts.items(), key=lambda x: x[1], reverse=True)[:10]
@@ -218,130 +321,121 @@ def evaluate_tracking(video_path, model_path, conf_threshold=0.25, iou_threshold
     
     return metrics
 
-def calculate_iou(box1, box2):
-    """Вычисление IoU между двумя ограничивающими рамками"""
-    x1_1, y1_1, x2_1, y2_1 = box1
-    x1_2, y1_2, x2_2, y2_2 = box2
-    
-    # Определение координат пересечения
-    x_left = max(x1_1, x1_2)
-    y_top = max(y1_1, y1_2)
-    x_right = min(x2_1, x2_2)
-    y_bottom = min(y2_1, y2_2)
-    
-    # Проверка на пересечение
-    if x_right < x_left or y_bottom < y_top:
-        return 0.0
-    
-    # Площадь пересечения
-    intersection_area = (x_right - x_left) * (y_bottom - y_top)
-    
-    # Площади обоих боксов
-    box1_area = (x2_1 - x1_1) * (y2_1 - y1_1)
-    box2_area = (x2_2 - x1_2) * (y2_2 - y1_2)
-    
-    # IoU
-    iou = intersection_area / float(box1_area + box2_area - intersection_area)
-    
-    return iou
+def get_class_name(detections, index):
+    """Название класса детекции (из данных supervision или по class_id)"""
+    class_names = detections.data.get('class_name') if detections.data else None
+    if class_names is not None:
+        return str(class_names[index])
+    return str(detections.class_id[index])
 
-def visualize_results(video_path, model_path, output_path, metrics, conf_threshold=0.25, iou_threshold=0.45):
+def calculate_iou_matrix(boxes1, boxes2):
     """
-    Создание визуализации с метриками трекинга
+    Матрица IoU между двумя наборами рамок
     
     Args:
-        video_path: путь к видеофайлу
-        model_path: путь к модели YOLO
-        output_path: путь для сохранения выходного видео
-        metrics: словарь с метриками
-        conf_threshold: порог уверенности для детекций
-        iou_threshold: порог IoU для детекций
+        boxes1: массив (N, 4) в формате xyxy
+        boxes2: массив (M, 4) в формате xyxy
+    
+    Returns:
+        np.ndarray: матрица (N, M), элемент [i, j] - IoU boxes1[i] и boxes2[j]
     """
-    # Загрузка видео
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"Ошибка: Не удалось открыть видео {video_path}")
-        return
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
     
-    # Параметры видео
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    # Координаты пересечения для всех пар сразу
+    x_left = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y_top = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x_right = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y_bottom = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
     
-    # Настройка записи видео
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    intersection_area = np.clip(x_right - x_left, 0, None) * np.clip(y_bottom - y_top, 0, None)
     
-    # Загрузка модели
-    try:
-        model = YOLO(model_path)
-    except Exception as e:
-        print(f"Ошибка загрузки модели: {e}")
-        return
+    box1_area = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    box2_area = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union_area = box1_area[:, None] + box2_area[None, :] - intersection_area
     
-    # Инициализация трекера и аннотаторов
-    tracker = sv.ByteTrack()
-    box_annotator = sv.BoundingBoxAnnotator()
-    label_annotator = sv.LabelAnnotator()
-    trace_annotator = sv.TraceAnnotator(
-        trace_length=20,  # Длина траектории
-        position=sv.Position.BOTTOM_CENTER
+    return np.divide(
+        intersection_area, union_area,
+        out=np.zeros_like(intersection_area), where=union_area > 0
     )
+
+def count_id_switches(prev_boxes, prev_ids, curr_boxes, curr_ids, iou_threshold=0.5):
+    """
+    Количество переключений ID между двумя соседними кадрами
     
-    # Структуры для хранения информации о треках
-    track_info = {}  # {track_id: {'start_frame': frame, 'frames_tracked': count}}
+    Для каждой рамки предыдущего кадра ищется текущая рамка с наибольшим IoU;
+    если IoU выше порога, а ID различаются, это считается переключением.
+    """
+    if len(prev_boxes) == 0 or len(curr_boxes) == 0:
+        return 0
     
-    frame_count = 0
+    iou = calculate_iou_matrix(prev_boxes, curr_boxes)
+    best_idx = np.argmax(iou, axis=1)
+    best_iou = iou[np.arange(len(best_idx)), best_idx]
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Детекция объектов
-        results = model.predict(
-            frame, 
-            conf=conf_threshold, 
-            iou=iou_threshold, 
-            verbose=False
-        )[0]
-        
-        # Конвертация результатов для трекера
-        detections = sv.Detections.from_ultralytics(results)
-        
-        # Применение трекинга
-        detections = tracker.update_with_detections(detections)
-        
-        # Создание меток с дополнительной информацией
-        labels = []
+    matched = best_iou > iou_threshold
+    switched = np.asarray(prev_ids)[matched] != np.asarray(curr_ids)[best_idx[matched]]
+    return int(np.count_nonzero(switched))
+
+class TrackingVisualizer:
+    """
+    Потоковая запись видео с результатами трекинга
+    
+    Каждый кадр аннотируется и сразу записывается, поэтому память не растет
+    с длительностью видео (хранится только число кадров каждого трека).
+    """
+    def __init__(self, output_path, fps, frame_size):
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.output_path = output_path
+        self.out = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+        self.box_annotator = sv.BoundingBoxAnnotator()
+        self.label_annotator = sv.LabelAnnotator()
+        self.trace_annotator = sv.TraceAnnotator(
+            trace_length=20,  # Длина траектории
+            position=sv.Position.BOTTOM_CENTER
+        )
+        self.frames_tracked = Counter()  # {track_id: количество кадров}
+        self.frame_count = 0
+    
+    @classmethod
+    def for_video(cls, video_path, output_path):
+        """Визуализатор с размером и частотой кадров исходного видео"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"Ошибка: Не удалось открыть видео {video_path}")
+            return None
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        return cls(output_path, fps, (width, height))
+    
+    def write(self, frame, detections, metrics):
+        """
+        Аннотирует кадр и записывает его в видео
         
+        Args:
+            frame: исходный кадр
+            detections: результаты трекинга кадра
+            metrics: словарь с total_tracks, id_switches и avg_track_length
+        """
         if detections.tracker_id is not None:
+            # Создание меток с дополнительной информацией
+            labels = []
             for i, track_id in enumerate(detections.tracker_id):
                 if track_id is None:
                     labels.append("")
                     continue
-                
-                # Обновляем или создаем информацию о треке
-                if track_id not in track_info:
-                    track_info[track_id] = {
-                        'start_frame': frame_count,
-                        'frames_tracked': 0
-                    }
-                
-                track_info[track_id]['frames_tracked'] += 1
+                self.frames_tracked[track_id] += 1
                 
                 # Формируем метку
-                class_id = detections.class_id[i]
-                class_name = results.names[class_id]
-                duration = track_info[track_id]['frames_tracked']
-                
-                label = f"#{track_id} {class_name} ({duration} frames)"
-                labels.append(label)
+                class_name = get_class_name(detections, i)
+                labels.append(f"#{track_id} {class_name} ({self.frames_tracked[track_id]} frames)")
             
             # Аннотируем кадр
-            annotated_frame = box_annotator.annotate(frame.copy(), detections=detections)
-            annotated_frame = label_annotator.annotate(annotated_frame, detections=detections, labels=labels)
-            annotated_frame = trace_annotator.annotate(annotated_frame, detections=detections)
+            annotated_frame = self.box_annotator.annotate(frame.copy(), detections=detections)
+            annotated_frame = self.label_annotator.annotate(annotated_frame, detections=detections, labels=labels)
+            annotated_frame = self.trace_annotator.annotate(annotated_frame, detections=detections)
             
             # Добавляем общую информацию о метриках
             cv2.putText(
@@ -355,17 +449,50 @@ def visualize_results(video_path, model_path, output_path, metrics, conf_thresho
             )
             
             # Записываем кадр
-            out.write(annotated_frame)
+            self.out.write(annotated_frame)
         
-        frame_count += 1
-        
-        if frame_count % 100 == 0:
-            print(f"Визуализировано {frame_count} кадров")
+        self.frame_count += 1
+        if self.frame_count % 100 == 0:
+            print(f"Визуализировано {self.frame_count} кадров")
+    
+    def close(self):
+        """Завершает запись видео"""
+        self.out.release()
+        print(f"Визуализация сохранена в {self.output_path}")
+
+def visualize_results(video_path, model_path, output_path, metrics, conf_threshold=0.25, iou_threshold=0.45,
+                      use_cache=True, max_frames=None, imgsz=None):
+    """
+    Создание визуализации с итоговыми метриками трекинга
+    
+    Второй этап после evaluate_tracking: детекции читаются из дискового
+    кеша, заполненного первым проходом, модель не запускается, трекинг
+    выполняется заново. Кадры записываются потоково, память не растет.
+    Без кеша визуализацию лучше писать в том же проходе, передав
+    TrackingVisualizer в evaluate_tracking (на кадрах - текущие метрики).
     
-    # Освобождаем ресурсы
-    cap.release()
-    out.release()
-    print(f"Визуализация сохранена в {output_path}")
+    Args:
+        video_path: путь к видеофайлу
+        model_path: путь к модели YOLO
+        output_path: путь для сохранения выходного видео
+        metrics: словарь с метриками
+        conf_threshold: порог уверенности для детекций
+        iou_threshold: порог IoU для детекций
+        use_cache: использовать дисковый кеш детекций
+        max_frames: максимальное количество кадров (как при оценке)
+        imgsz: размер входа модели (как при оценке)
+    """
+    visualizer = TrackingVisualizer.for_video(video_path, output_path)
+    if visualizer is None:
+        return
+    
+    tracker = sv.ByteTrack()
+    for _, frame, detections in iterate_detections(
+        video_path, model_path, conf_threshold, iou_threshold, max_frames,
+        use_cache=use_cache, need_frames=True, imgsz=imgsz
+    ):
+        visualizer.write(frame, tracker.update_with_detections(detections), metrics)
+    visualizer.close()
 
 def main():
     # Парсинг аргументов командной строки
@@ -377,6 +504,7 @@ def main():
     parser.add_argument('--frames', type=int, default=50000, help='Максимальное количество кадров для обработки')
     parser.add_argument('--visualize', action='store_true', help='Создать визуализацию с метриками')
     parser.add_argument('--output', type=str, default='tracking_visualization.mp4', help='Путь для сохранения визуализации')
+    parser.add_argument('--no-cache', action='store_true', help='Не использовать кеш детекций')
     
     args = parser.parse_args()
     
@@ -401,14 +529,33 @@ def main():
         print("Ошибка: Файл модели не найден или не указан")
         return
     
-    # Оценка эффективности трекинга
-    metrics = evaluate_tracking(
-        args.video,
-        args.model,
-        args.conf,
-        args.iou,
-        args.frames
-    )
+    # Оценка эффективности трекинга. Визуализация с итоговыми метриками
+    # строится вторым проходом по кешу детекций; без кеша она пишется
+    # в том же проходе (на кадрах - текущие значения метрик), чтобы
+    # не запускать модель повторно
+    visualizer = None
+    if args.visualize and args.no_cache:
+        visualizer = TrackingVisualizer.for_video(args.video, args.output)
+        if visualizer is None:
+            return
+    try:
+        metrics = evaluate_tracking(
+            args.video,
+            args.model,
+            args.conf,
+            args.iou,
+            args.frames,
+            use_cache=not args.no_cache,
+            visualizer=visualizer
+        )
+    finally:
+        if visualizer is not None:
+            visualizer.close()
+    
+    if metrics and args.visualize and not args.no_cache:
+        print("\nСоздание визуализации с итоговыми метриками...")
+        visualize_results(args.video, args.model, args.output, metrics, args.conf, args.iou,
+                          max_frames=args.frames)
     
     if metrics:
         # Вывод результатов
@@ -418,7 +565,14 @@ def main():
         print(f"Потеряно треков: {metrics['lost_tracks']} ({metrics['lost_tracks']/metrics['total_tracks']*100:.1f}%)")
         print(f"Переключений ID: {metrics['id_switches']}")
         print(f"Средняя длительность трека: {metrics['avg_track_length']:.1f} кадров")
-        print(f"Скорость обработки: {metrics['fps']:.1f} FPS")
+        print(f"Скорость обработки: {metrics['fps']:.1f} FPS "
+              f"(детекции: {metrics['detection_time']:.1f} с, трекинг: {metrics['tracking_time']:.1f} с)")
+        if metrics['detections_cached']:
+            print(f"  Детекции {metrics['cached_frames']} кадров взяты из кеша: "
+                  f"FPS не отражает скорость модели (запустите с --no-cache)")
+        else:
+            print(f"  Скорость детекции: {metrics['detection_fps']:.1f} FPS, "
+                  f"трекинга: {metrics['tracking_fps']:.1f} FPS")
         
         print("\nРаспределение по классам:")
         for cls, count in metrics['class_distribution'].items():
@@ -437,18 +591,6 @@ def main():
         for i, (track_id, length) in enumerate(metrics['longest_tracks']):
             confidence = metrics['confidence_averages'].get(track_id, 0.0)
             print(f"  {i+1}. ID {track_id}: {length} кадров (ср. уверенность: {confidence:.2f})")
-        
-        # Создание визуализации если указан флаг --visualize
-        if args.visualize:
-            print("\nСоздание визуализации...")
-            visualize_results(
-                args.video,
-                args.model,
-                args.output,
-                metrics,
-                args.conf,
-                args.iou
-            )
     
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+INT8-квантование модели YOLO для CPU и сравнение с FP32
+по скорости и метрикам трекинга на тестовых видео
+"""
+
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+from evaluate_tracking import load_config, evaluate_tracking, calculate_iou_matrix
+from src.core.inference_backend import InferenceBackend
+from src.core.quantization import ModelQuantizer
+
+
+def detection_agreement(reference_frames, frames, iou_threshold=0.5):
+    """
+    Совпадение детекций модели с эталонной (FP32) по кадрам
+
+    Рамка считается найденной, если у второй модели на том же кадре есть
+    рамка того же класса с IoU выше порога.
+
+    Returns:
+        dict: recall (доля эталонных рамок, найденных моделью) и
+        precision (доля рамок модели, совпавших с эталонными)
+    """
+    matched_reference = 0
+    matched_model = 0
+    total_reference = 0
+    total_model = 0
+    for reference, detections in zip(reference_frames, frames):
+        total_reference += len(reference)
+        total_model += len(detections)
+        if len(reference) == 0 or len(detections) == 0:
+            continue
+
+        iou = calculate_iou_matrix(reference.xyxy, detections.xyxy)
+        same_class = reference.class_id[:, None] == detections.class_id[None, :]
+        hits = (iou > iou_threshold) & same_class
+        matched_reference += int(np.count_nonzero(hits.any(axis=1)))
+        matched_model += int(np.count_nonzero(hits.any(axis=0)))
+
+    return {
+        "recall": matched_reference / total_reference if total_reference else 1.0,
+        "precision": matched_model / total_model if total_model else 1.0
+    }
+
+
+def mean_confidence(metrics):
+    """Средняя уверенность по всем трекам"""
+    values = list(metrics.get("confidence_averages", {}).values())
+    return float(np.mean(values)) if values else 0.0
+
+
+def print_report(rows):
+    """Печать таблицы сравнения моделей"""
+    columns = [
+        ("Модель", lambda r: r["label"], 22),
+        ("FPS", lambda r: f"{r['metrics']['fps']:.1f}", 8),
+        ("Ускорение", lambda r: f"x{r['speedup']:.2f}", 10),
+        ("Треки", lambda r: str(r['metrics']['total_tracks']), 7),
+        ("Потеряно", lambda r: str(r['metrics']['lost_tracks']), 9),
+        ("Смены ID", lambda r: str(r['metrics']['id_switches']), 9),
+        ("Длина трека", lambda r: f"{r['metrics']['avg_track_length']:.1f}", 12),
+        ("Уверенность", lambda r: f"{r['mean_confidence']:.3f}", 12),
+        ("Recall", lambda r: f"{r['agreement']['recall']:.3f}", 8),
+        ("Precision", lambda r: f"{r['agreement']['precision']:.3f}", 10)
+    ]
+    print("\n" + "".join(title.ljust(width) for title, _, width in columns))
+    print("-" * sum(width for _, _, width in columns))
+    for row in rows:
+        print("".join(value(row).ljust(width) for _, value, width in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='INT8-квантование модели YOLO')
+    parser.add_argument('--model', type=str, help='Путь к модели YOLO (.pt)')
+    parser.add_argument('--videos', type=str, default='videos', help='Каталог с видео для калибровки')
+    parser.add_argument('--calibration-frames', type=int, default=200, help='Количество калибровочных кадров')
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[InferenceBackend.DEFAULT_IMGSZ],
+                        help='Размеры входа модели (для адаптивного imgsz: 320 416 512 640)')
+    parser.add_argument('--backend', type=str, default='auto', choices=['auto', 'onnx', 'openvino'],
+                        help='Среда выполнения квантованной модели')
+    parser.add_argument('--eval-video', type=str, default=os.path.join('videos', 'birds.mp4'),
+                        help='Видео для сравнения FP32 и INT8')
+    parser.add_argument('--frames', type=int, default=500, help='Максимальное количество кадров для сравнения')
+    parser.add_argument('--conf', type=float, default=0.25, help='Порог уверенности')
+    parser.add_argument('--iou', type=float, default=0.45, help='Порог IoU')
+    parser.add_argument('--report', type=str, default='quantization_report.json', help='Путь для сохранения отчета')
+    args = parser.parse_args()
+
+    # Модель по умолчанию - из конфигурации
+    if args.model is None:
+        config = load_config()
+        if config and 'model' in config and 'path' in config['model']:
+            args.model = config['model']['path']
+        else:
+            print("Ошибка: Модель не указана и не найдена в конфигурации")
+            return
+
+    if not os.path.exists(args.model):
+        print(f"Ошибка: Модель {args.model} не найдена")
+        return
+
+    video_paths = sorted(glob.glob(os.path.join(args.videos, '*.mp4')))
+    if not video_paths:
+        print(f"Ошибка: В каталоге {args.videos} нет видео для калибровки")
+        return
+
+    # Калибровка и квантование для каждого размера входа: у экспортированных
+    # моделей вход статический, контроллер разрешения переключается между ними
+    sizes = sorted(set(args.imgsz))
+    quantized = {}
+    for size in sizes:
+        quantizer = ModelQuantizer(args.model, size)
+        frames = quantizer.sample_frames(video_paths, args.calibration_frames)
+        print(f"imgsz={size}: калибровочных кадров {len(frames)} из {len(video_paths)} видео")
+        try:
+            quantized[size] = quantizer.quantize(frames, args.backend)
+        except Exception as e:
+            print(f"Ошибка квантования: {e}")
+            return
+        del frames
+        print(f"INT8-модель сохранена: {quantized[size][2]}")
+
+    # Сравнение на наибольшем размере: исходная модель (torch), FP32-экспорт
+    # и INT8 в одной среде. Кеш детекций отключен, чтобы FPS отражал реальный инференс
+    imgsz = sizes[-1]
+    backend, fp32_path, int8_path = quantized[imgsz]
+    candidates = [
+        ("FP32 torch", args.model),
+        (f"FP32 {backend}", fp32_path),
+        (f"INT8 {backend}", int8_path)
+    ]
+    # Совпадение считается по детекциям модели до трекера, чтобы
+    # в сравнение FP32 и INT8 не попадали решения ByteTrack
+    rows = []
+    reference_frames = None
+    for label, path in candidates:
+        print(f"\n=== {label}: {path} ===")
+        raw_frames = []
+        metrics = evaluate_tracking(
+            args.eval_video, path, args.conf, args.iou, args.frames,
+            frame_detections=raw_frames, use_cache=False, imgsz=imgsz
+        )
+        if metrics is None:
+            return
+        if reference_frames is None:
+            reference_frames = raw_frames
+        rows.append({
+            "label": label,
+            "path": path,
+            "metrics": metrics,
+            "mean_confidence": mean_confidence(metrics),
+            "agreement": detection_agreement(reference_frames, raw_frames)
+        })
+
+    base_fps = rows[0]["metrics"]["fps"]
+    for row in rows:
+        row["speedup"] = row["metrics"]["fps"] / base_fps if base_fps > 0 else 0.0
+
+    print_report(rows)
+    print("\nRecall/Precision - совпадение детекций с FP32 torch (IoU > 0.5, тот же класс)")
+
+    # Сохраняем отчет
+    report = {
+        "model": args.model,
+        "backend": backend,
+        "imgsz": imgsz,
+        "quantized": {str(size): paths[2] for size, paths in quantized.items()},
+        "eval_video": args.eval_video,
+        "calibration_videos": video_paths,
+        "results": [
+            {
+                "label": row["label"],
+                "path": row["path"],
+                "speedup": row["speedup"],
+                "mean_confidence": row["mean_confidence"],
+                "agreement": row["agreement"],
+                "metrics": {
+                    key: row["metrics"][key]
+                    for key in ("total_frames", "total_tracks", "lost_tracks", "id_switches",
+                                "avg_track_length", "fps", "class_distribution")
+                }
+            }
+            for row in rows
+        ]
+    }
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Отчет сохранен в {args.report}")
+    print("Квантованную модель можно выбрать в настройках: Точность весов - INT8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import time
+import threading
+
+
+class ResolutionController:
+    """
+    Подбор размера входа модели (imgsz) под целевую частоту кадров.
+
+    Задержка инференса сглаживается экспоненциально. Если она дольше
+    patience вызовов подряд превышает бюджет кадра (1 / target_fps),
+    размер уменьшается на одну ступень. Размер увеличивается, только если
+    ожидаемая задержка на следующей ступени (пересчет по числу пикселей)
+    укладывается в долю headroom от бюджета в течение 2 * patience
+    вызовов. После каждого переключения cooldown вызовов решения не
+    принимаются. Разные пороги и выдержки не дают размеру колебаться.
+    """
+    DEFAULT_SIZES = (320, 416, 512, 640)
+
+    def __init__(self, target_fps=30, sizes=DEFAULT_SIZES, enabled=True, smoothing=0.2,
+                 headroom=0.75, patience=15, cooldown=30):
+        self.sizes = tuple(sorted(set(sizes)))
+        self.target_fps = target_fps
+        self.enabled = enabled
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.patience = patience
+        self.cooldown = cooldown
+
+        self.index = len(self.sizes) - 1  # начинаем с наибольшего размера
+        self.latency = None  # сглаженная задержка на текущем размере, с
+        self.switches = 0
+        self._over = 0
+        self._under = 0
+        self._cooldown = 0
+
+    @property
+    def imgsz(self):
+        return self.sizes[self.index]
+
+    @property
+    def budget(self):
+        """Бюджет времени на кадр, с."""
+        return 1.0 / max(self.target_fps, 1e-3)
+
+    def restrict(self, sizes):
+        """
+        Оставляет только указанные размеры (например, без динамического входа).
+        Текущий размер сохраняется, если он остался, иначе берется ближайший
+        меньший.
+        """
+        current = self.imgsz
+        self.sizes = tuple(sorted(set(sizes)))
+        smaller = [index for index, size in enumerate(self.sizes) if size <= current]
+        self.index = smaller[-1] if smaller else 0
+        self.latency = None
+
+    def _expected_latency(self, index):
+        """Ожидаемая задержка на ступени index: время растет с числом пикселей."""
+        return self.latency * (self.sizes[index] / self.imgsz) ** 2
+
+    def update(self, latency):
+        """
+        Учитывает задержку очередного вызова инференса.
+
+        Returns:
+            int или None: новый imgsz, если размер переключен
+        """
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        if not self.enabled or len(self.sizes) < 2:
+            return None
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return None
+
+        if self.latency > self.budget and self.index > 0:
+            self._over += 1
+            self._under = 0
+        elif (self.index < len(self.sizes) - 1
+                and self._expected_latency(self.index + 1) < self.budget * self.headroom):
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = 0
+            self._under = 0
+
+        if self._over >= self.patience:
+            return self._switch(-1)
+        if self._under >= 2 * self.patience:
+            return self._switch(1)
+        return None
+
+    def _switch(self, step):
+        self.index += step
+        self.latency = None
+        self._over = 0
+        self._under = 0
+        self._cooldown = self.cooldown
+        self.switches += 1
+        return self.imgsz
+
+    def stats(self):
+        """Текущий размер, задержка и бюджет: {imgsz, latency_ms, budget_ms, switches}."""
+        return {
+            'imgsz': self.imgsz,
+            'latency_ms': (self.latency or 0.0) * 1000,
+            'budget_ms': self.budget * 1000,
+            'switches': self.switches
+        }
+
+
+class AdaptiveResolutionPredictor:
+    """
+    Предиктор с интерфейсом BatchPredictor, переключающий imgsz по
+    решению ResolutionController.
+
+    Предикторы создаются функцией factory(imgsz) лениво: при запуске -
+    только для текущего размера, остальные - в фоновом потоке при первом
+    переключении контроллера на них (экспорт ONNX/OpenVINO и замер сред
+    выполнения занимают секунды). Пока предиктор нового размера не готов,
+    кадры обрабатываются на последнем готовом размере, а задержка
+    контроллеру не передается.
+
+    predictors - уже готовые предикторы {imgsz: предиктор}. Модель PyTorch
+    в пуле процессов принимает любой размер, и один предиктор может
+    обслуживать несколько размеров.
+    """
+    def __init__(self, controller, factory=None, release=None, predictors=None):
+        self.controller = controller
+        self.factory = factory
+        self.release = release  # освобождение предиктора, который больше не нужен
+        self.predictors = dict(predictors or {})
+        self._settings = {}  # настройки для предикторов, подготовленных позже
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._closed = False
+
+        if controller.imgsz not in self.predictors:
+            self.predictors[controller.imgsz] = factory(controller.imgsz)
+        self._active = controller.imgsz  # размер последнего вызова
+
+    def update_settings(self, settings):
+        with self._lock:
+            self._settings.update(settings)
+            predictors = self.unique_predictors()
+        for predictor in predictors:
+            predictor.update_settings(settings)
+
+    def unique_predictors(self):
+        """Предикторы без повторов (один предиктор может обслуживать несколько размеров)."""
+        unique = {}
+        for predictor in self.predictors.values():
+            unique[id(predictor)] = predictor
+        return list(unique.values())
+
+    def _prepare_async(self, imgsz):
+        """Запускает подготовку предиктора размера imgsz в фоновом потоке."""
+        if imgsz in self._pending or self.factory is None:
+            return
+        self._pending.add(imgsz)
+        threading.Thread(target=self._prepare, args=(imgsz,), name=f"prepare-{imgsz}", daemon=True).start()
+
+    def _prepare(self, imgsz):
+        try:
+            predictor = self.factory(imgsz)
+        except Exception as e:
+            print(f"Ошибка подготовки модели для imgsz={imgsz}: {e}")
+            with self._lock:
+                self._pending.discard(imgsz)
+                if not self._closed:
+                    # Размер недоступен - контроллер больше на него не переключается
+                    self.controller.restrict([size for size in self.controller.sizes if size != imgsz])
+            return
+
+        with self._lock:
+            self._pending.discard(imgsz)
+            if not self._closed:
+                predictor.update_settings(self._settings)
+                self.predictors[imgsz] = predictor
+                return
+        if self.release is not None:
+            self.release(predictor)
+
+    def predict_detections(self, frames):
+        """Детекция на текущем размере с замером задержки для контроллера."""
+        imgsz = self.controller.imgsz
+        with self._lock:
+            predictor = self.predictors.get(imgsz)
+            if predictor is None:
+                self._prepare_async(imgsz)
+                fallback = self.predictors[self._active]
+        if predictor is None:
+            # Новый размер еще готовится: кадр обрабатывается на прежнем
+            fallback.imgsz = self._active
+            return fallback.predict_detections(frames)
+
+        self._active = imgsz
+        predictor.imgsz = imgsz
+        start = time.perf_counter()
+        result = predictor.predict_detections(frames)
+        self.controller.update(time.perf_counter() - start)
+        return result
+
+    def close(self):
+        """Освобождает все предикторы, включая подготавливаемые в фоне."""
+        with self._lock:
+            self._closed = True
+            predictors = self.unique_predictors()
+            self.predictors = {}
+        if self.release is not None:
+            for predictor in predictors:
+                self.release(predictor)
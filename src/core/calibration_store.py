@@ -0,0 +1,137 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+class CalibrationStore:
+    """
+    Хранилище данных калибровки.
+
+    Небольшие параметры (K, D, R, P, T, Q, F) хранятся в calibration_data.json,
+    а карты ректификации - в бинарном файле .npy рядом с ним. Карты
+    открываются через memory-map, поэтому загрузка не требует разбора
+    сотен мегабайт текста. Старые JSON-файлы с картами в виде списков
+    по-прежнему читаются.
+    """
+    CALIBRATION_FILE = "calibration_data.json"
+    MAPS_DIR = "calibration_maps"
+    MAP_KEYS = ("mapx", "mapy")
+    CAMERA_KEYS = ("camera1", "camera2")
+
+    @staticmethod
+    def pair_key(camera1_url, camera2_url):
+        """Формирует ключ пары камер для имени файла карт."""
+        digest = hashlib.sha1(f"{camera1_url}|{camera2_url}".encode("utf-8")).hexdigest()
+        return digest[:12]
+
+    @staticmethod
+    def maps_key(camera1_url, camera2_url, image_size):
+        """Ключ карт: пара камер + разрешение кадра."""
+        w, h = image_size
+        return f"{CalibrationStore.pair_key(camera1_url, camera2_url)}_{w}x{h}"
+
+    @staticmethod
+    def save(calibration_data, path=CALIBRATION_FILE):
+        """
+        Сохраняет данные калибровки.
+        Карты mapx/mapy обеих камер записываются одним массивом .npy
+        формы (4, h, w), остальное - в JSON.
+        """
+        metadata = {
+            key: (dict(value) if isinstance(value, dict) else value)
+            for key, value in calibration_data.items()
+        }
+
+        maps = []
+        for camera_key in CalibrationStore.CAMERA_KEYS:
+            camera = metadata.get(camera_key, {})
+            for map_key in CalibrationStore.MAP_KEYS:
+                if map_key in camera:
+                    maps.append(np.asarray(camera.pop(map_key), dtype=np.float32))
+
+        info = metadata.setdefault("info", {})
+        if len(maps) == 2 * len(CalibrationStore.CAMERA_KEYS):
+            stacked = np.stack(maps)
+            image_size = [int(stacked.shape[2]), int(stacked.shape[1])]
+            info["image_size"] = image_size
+
+            key = CalibrationStore.maps_key(
+                info.get("camera1_url", ""), info.get("camera2_url", ""), image_size
+            )
+            base_dir = os.path.dirname(os.path.abspath(path))
+            os.makedirs(os.path.join(base_dir, CalibrationStore.MAPS_DIR), exist_ok=True)
+            relative_path = os.path.join(CalibrationStore.MAPS_DIR, f"{key}.npy")
+            maps_path = os.path.join(base_dir, relative_path)
+
+            # Записываем во временный файл, чтобы не повредить открытую memory-map
+            tmp_path = maps_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, stacked)
+            os.replace(tmp_path, maps_path)
+
+            metadata.setdefault("maps", {})[key] = {
+                "file": relative_path,
+                "image_size": image_size
+            }
+
+        with open(path, "w") as f:
+            json.dump(_to_serializable(metadata), f, indent=2)
+
+    @staticmethod
+    def load(path=CALIBRATION_FILE, load_maps=True):
+        """
+        Загружает данные калибровки.
+        Если есть бинарные карты, они подключаются к camera1/camera2
+        как memory-mapped массивы (без чтения всего файла в память).
+        """
+        if not os.path.exists(path):
+            return {}
+
+        with open(path, "r") as f:
+            calibration_data = json.load(f)
+
+        if load_maps:
+            CalibrationStore._attach_maps(calibration_data, path)
+        return calibration_data
+
+    @staticmethod
+    def _attach_maps(calibration_data, path):
+        """Подключает карты из .npy файла к данным калибровки."""
+        info = calibration_data.get("info", {})
+        image_size = info.get("image_size")
+        if not image_size:
+            return  # Старый формат - карты хранятся прямо в JSON
+
+        key = CalibrationStore.maps_key(
+            info.get("camera1_url", ""), info.get("camera2_url", ""), image_size
+        )
+        entry = calibration_data.get("maps", {}).get(key)
+        if not entry:
+            return
+
+        maps_path = os.path.join(os.path.dirname(os.path.abspath(path)), entry["file"])
+        if not os.path.exists(maps_path):
+            print(f"Файл карт ректификации не найден: {maps_path}")
+            return
+
+        maps = np.load(maps_path, mmap_mode="r")
+        index = 0
+        for camera_key in CalibrationStore.CAMERA_KEYS:
+            camera = calibration_data.setdefault(camera_key, {})
+            for map_key in CalibrationStore.MAP_KEYS:
+                camera[map_key] = maps[index]
+                index += 1
+
+
+def _to_serializable(value):
+    """Преобразует массивы numpy в списки для JSON."""
+    if isinstance(value, dict):
+        return {key: _to_serializable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_serializable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
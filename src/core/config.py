@@ -32,7 +32,12 @@ class Config:
                 "conf": 0.25,
                 "iou": 0.45,
                 "device": "cpu",
-                "half": False
+                "half": False,
+                "workers": 0,
+                "backend": "auto",
+                "precision": "fp32",
+                "adaptive_imgsz": True,
+                "imgsz_sizes": [320, 416, 512, 640]
             },
             "last_camera": "",
             "last_model": "",
@@ -58,7 +63,21 @@ class Config:
             "distance_measure": {
                 "enabled": False,
                 "baseline": 10.0,
-                "cameras": []
+                "cameras": [],
+                "sync_tolerance": None,  # допуск сборки стереопар, с; None - половина периода кадра
+                "point_undistortion": False,
+                "refine_disparity": False,
+                "dense_depth": False
+            },
+            "tracker": {
+                "fps": 30,
+                "detect_interval": 3,
+                "adaptive_cadence": True
+            },
+            "motion_gate": {
+                "enabled": True,
+                "min_pixels": 4,
+                "safety_interval": 2.0
             }
         }
         self._save_config(default_config)
@@ -196,11 +215,17 @@ class Config:
     
     def get_distance_measure_settings(self):
         """Возвращает настройки измерения расстояния."""
-        return self.config.get("distance_measure", {
+        settings = {
             "enabled": False,
             "baseline": 10.0,
-            "cameras": []
-        })
+            "cameras": [],
+            "sync_tolerance": None,
+            "point_undistortion": False,
+            "refine_disparity": False,
+            "dense_depth": False
+        }
+        settings.update(self.config.get("distance_measure", {}))
+        return settings
     
     def update_distance_measure_settings(self, enabled, baseline=None, cameras=None):
         """Обновляет настройки измерения расстояния."""
@@ -221,6 +246,74 @@ class Config:
             
         self.update_config()
     
+    def set_distance_measure_options(self, point_undistortion=None, refine_disparity=None, dense_depth=None):
+        """Устанавливает параметры обработки при измерении расстояния."""
+        if "distance_measure" not in self.config:
+            self.config["distance_measure"] = {}
+        
+        if point_undistortion is not None:
+            self.config["distance_measure"]["point_undistortion"] = point_undistortion
+        
+        if refine_disparity is not None:
+            self.config["distance_measure"]["refine_disparity"] = refine_disparity
+        
+        if dense_depth is not None:
+            self.config["distance_measure"]["dense_depth"] = dense_depth
+        
+        self.update_config()
+    
+    def get_tracker_settings(self):
+        """Возвращает настройки трекера и планировщика детекций."""
+        settings = {
+            "fps": 30,
+            "detect_interval": 3,
+            "adaptive_cadence": True
+        }
+        settings.update(self.config.get("tracker", {}))
+        return settings
+    
+    def set_tracker_settings(self, fps=None, detect_interval=None, adaptive_cadence=None):
+        """Устанавливает настройки трекера и планировщика детекций."""
+        if "tracker" not in self.config:
+            self.config["tracker"] = {}
+        
+        if fps is not None:
+            self.config["tracker"]["fps"] = fps
+        
+        if detect_interval is not None:
+            self.config["tracker"]["detect_interval"] = detect_interval
+        
+        if adaptive_cadence is not None:
+            self.config["tracker"]["adaptive_cadence"] = adaptive_cadence
+        
+        self.update_config()
+    
+    def get_motion_gate_settings(self):
+        """Возвращает настройки фильтра кадров по движению."""
+        settings = {
+            "enabled": True,
+            "min_pixels": 4,
+            "safety_interval": 2.0
+        }
+        settings.update(self.config.get("motion_gate", {}))
+        return settings
+    
+    def set_motion_gate_settings(self, enabled=None, min_pixels=None, safety_interval=None):
+        """Устанавливает настройки фильтра кадров по движению."""
+        if "motion_gate" not in self.config:
+            self.config["motion_gate"] = {}
+        
+        if enabled is not None:
+            self.config["motion_gate"]["enabled"] = enabled
+        
+        if min_pixels is not None:
+            self.config["motion_gate"]["min_pixels"] = min_pixels
+        
+        if safety_interval is not None:
+            self.config["motion_gate"]["safety_interval"] = safety_interval
+        
+        self.update_config()
+    
     def get_calibration_status(self):
         """Возвращает статус калибровки."""
         return self.config.get("cameras", {"calibrated": False})
@@ -255,10 +348,16 @@ class Config:
             "conf": 0.25,
             "iou": 0.45,
             "device": "cpu",
-            "half": False
+            "half": False,
+            "workers": 0,
+            "backend": "auto",
+            "precision": "fp32",
+            "adaptive_imgsz": True,
+            "imgsz_sizes": [320, 416, 512, 640]
         })
         
-    def set_model_settings(self, path=None, conf=None, iou=None, device=None, half=None):
+    def set_model_settings(self, path=None, conf=None, iou=None, device=None, half=None, workers=None,
+                           backend=None, precision=None, adaptive_imgsz=None):
         """Устанавливает настройки модели."""
         if "model" not in self.config:
             self.config["model"] = {
@@ -266,7 +365,12 @@ class Config:
                 "conf": 0.25,
                 "iou": 0.45,
                 "device": "cpu",
-                "half": False
+                "half": False,
+                "workers": 0,
+                "backend": "auto",
+                "precision": "fp32",
+                "adaptive_imgsz": True,
+                "imgsz_sizes": [320, 416, 512, 640]
             }
         
         if path is not None:
@@ -286,6 +390,18 @@ class Config:
         if half is not None:
             self.config["model"]["half"] = half
             
+        if workers is not None:
+            self.config["model"]["workers"] = workers
+            
+        if backend is not None:
+            self.config["model"]["backend"] = backend
+            
+        if precision is not None:
+            self.config["model"]["precision"] = precision
+            
+        if adaptive_imgsz is not None:
+            self.config["model"]["adaptive_imgsz"] = adaptive_imgsz
+            
         self.update_config()
 
 
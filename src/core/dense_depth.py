@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+class DenseDepthWorker:
+    """
+    Фоновый расчет плотной карты диспаритета низкого разрешения.
+
+    Каждая every_n-я пара кадров уменьшается и обрабатывается cv2.StereoSGBM
+    в пуле потоков (OpenCV отпускает GIL на время расчета). Если предыдущий
+    расчет еще не закончен, пара пропускается, поэтому вызывающий поток
+    никогда не ждет. Последняя готовая цветная карта доступна через latest().
+    """
+    def __init__(self, every_n=5, scale=0.25, num_disparities=64, block_size=5, workers=1, camera1_left=True):
+        self.every_n = max(1, every_n)
+        self.scale = scale
+        self.camera1_left = camera1_left  # камера 1 - левая (диспаритет x1 - x2 > 0)
+
+        channels = 1
+        self.matcher = cv2.StereoSGBM_create(
+            minDisparity=0,
+            numDisparities=num_disparities,
+            blockSize=block_size,
+            P1=8 * channels * block_size ** 2,
+            P2=32 * channels * block_size ** 2,
+            uniquenessRatio=10,
+            speckleWindowSize=50,
+            speckleRange=2,
+            mode=cv2.STEREO_SGBM_MODE_SGBM_3WAY
+        )
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._future = None
+        self._lock = threading.Lock()
+        self._latest = None
+        self._submitted = 0
+
+        self.maps_computed = 0
+        self.pairs_skipped = 0
+
+    def submit(self, frame1, frame2, rectify=None):
+        """
+        Передает пару кадров на расчет, если подошла ее очередь и пул свободен.
+
+        Args:
+            frame1, frame2: кадры камер (не должны изменяться после передачи)
+            rectify: функция (frame, camera) -> ректифицированный кадр, если
+                кадры еще не ректифицированы; выполняется в пуле
+        """
+        self._submitted += 1
+        if (self._submitted - 1) % self.every_n:
+            return False
+        if self._future is not None and not self._future.done():
+            self.pairs_skipped += 1
+            return False
+
+        self._future = self._executor.submit(self._compute, frame1, frame2, rectify)
+        return True
+
+    def _compute(self, frame1, frame2, rectify):
+        try:
+            if rectify is not None:
+                frame1 = rectify(frame1, 1)
+                frame2 = rectify(frame2, 2)
+
+            small1 = cv2.resize(frame1, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            small2 = cv2.resize(frame2, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            gray1 = cv2.cvtColor(small1, cv2.COLOR_BGR2GRAY)
+            gray2 = cv2.cvtColor(small2, cv2.COLOR_BGR2GRAY)
+
+            if self.camera1_left:
+                disparity = self.matcher.compute(gray1, gray2)
+            else:
+                # Камера 1 справа: зеркалим пару, чтобы карта осталась в координатах камеры 1
+                disparity = cv2.flip(self.matcher.compute(cv2.flip(gray1, 1), cv2.flip(gray2, 1)), 1)
+
+            disparity = disparity.astype(np.float32) / 16.0  # SGBM возвращает диспаритет * 16
+            valid = disparity > 0
+            normalized = np.zeros(disparity.shape, dtype=np.uint8)
+            if valid.any():
+                normalized[valid] = np.clip(
+                    disparity[valid] * 255.0 / self.matcher.getNumDisparities(), 0, 255
+                ).astype(np.uint8)
+            colored = cv2.applyColorMap(normalized, cv2.COLORMAP_JET)
+            colored[~valid] = 0
+
+            with self._lock:
+                self._latest = colored
+                self.maps_computed += 1
+        except Exception as e:
+            print(f"Ошибка расчета карты глубины: {e}")
+
+    def latest(self):
+        """Последняя готовая цветная карта диспаритета (BGR) или None."""
+        with self._lock:
+            return self._latest
+
+    def shutdown(self):
+        """Останавливает пул, не дожидаясь текущего расчета."""
+        self._executor.shutdown(wait=False)
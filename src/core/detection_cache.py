@@ -0,0 +1,171 @@
+import os
+import json
+import hashlib
+import numpy as np
+import supervision as sv
+
+from src.utils.file_hash import file_sha1
+
+
+class DetectionCache:
+    """
+    Дисковый кеш детекций модели для видеофайлов.
+
+    Хранит «сырые» детекции (до трекера): xyxy, confidence, class_id.
+    Ключ кеша - хеш содержимого видео, хеш весов модели и параметры
+    инференса, поэтому при изменении только настроек трекера модель
+    повторно не запускается.
+
+    Формат - колоночный .npz: все детекции видео лежат в общих массивах,
+    а frame_offsets[i]:frame_offsets[i + 1] задает срез кадра i.
+    """
+    CACHE_DIR = "detection_cache"
+    FORMAT_VERSION = 1
+
+    def __init__(self, video_path, model_path, conf=0.25, iou=0.45, imgsz=None, cache_dir=CACHE_DIR):
+        self.video_path = video_path
+        self.model_path = model_path
+        self.params = {"conf": float(conf), "iou": float(iou), "imgsz": imgsz}
+        self.key = self.make_key(video_path, model_path, self.params)
+        self.path = os.path.join(cache_dir, f"{self.key}.npz")
+
+        self.names = {}  # {class_id: class_name}
+        self.complete = False  # True, если закэшировано видео до конца
+
+        # Загруженные колонки
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._xyxy = np.empty((0, 4), dtype=np.float32)
+        self._confidence = np.empty(0, dtype=np.float32)
+        self._class_id = np.empty(0, dtype=np.int32)
+
+        # Новые кадры, добавленные через put (по порядку)
+        self._pending = []
+        self._dirty = False
+
+    @classmethod
+    def make_key(cls, video_path, model_path, params):
+        """Ключ кеша: видео + модель + параметры инференса."""
+        payload = json.dumps({
+            "version": cls.FORMAT_VERSION,
+            "video": file_sha1(video_path),
+            "model": file_sha1(model_path),
+            "params": params
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def frame_count(self):
+        """Количество кадров в кеше."""
+        return len(self._offsets) - 1 + len(self._pending)
+
+    def load(self):
+        """Загружает кеш с диска. Возвращает True, если кеш найден."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                self._offsets = data["frame_offsets"].astype(np.int64)
+                self._xyxy = data["xyxy"]
+                self._confidence = data["confidence"]
+                self._class_id = data["class_id"]
+        except Exception as e:
+            print(f"Ошибка чтения кеша детекций {self.path}: {e}")
+            return False
+
+        self.names = {int(k): v for k, v in meta.get("names", {}).items()}
+        self.complete = meta.get("complete", False)
+        self._pending = []
+        return True
+
+    def has_frame(self, frame_index):
+        """Есть ли в кеше детекции для кадра."""
+        return 0 <= frame_index < self.frame_count
+
+    def get(self, frame_index):
+        """Возвращает sv.Detections кадра или None, если кадра нет в кеше."""
+        stored = len(self._offsets) - 1
+        if 0 <= frame_index < stored:
+            start, end = self._offsets[frame_index], self._offsets[frame_index + 1]
+            xyxy = self._xyxy[start:end]
+            confidence = self._confidence[start:end]
+            class_id = self._class_id[start:end]
+        elif stored <= frame_index < self.frame_count:
+            xyxy, confidence, class_id = self._pending[frame_index - stored]
+        else:
+            return None
+        return self._to_detections(xyxy, confidence, class_id)
+
+    def _to_detections(self, xyxy, confidence, class_id):
+        class_names = np.array([self.names.get(int(c), str(c)) for c in class_id])
+        return sv.Detections(
+            xyxy=np.array(xyxy, dtype=np.float32).reshape(-1, 4),
+            confidence=np.array(confidence, dtype=np.float32),
+            class_id=np.array(class_id, dtype=int),
+            data={"class_name": class_names}
+        )
+
+    def put(self, frame_index, detections, names=None):
+        """
+        Добавляет детекции следующего кадра.
+        Кадры должны добавляться по порядку, без пропусков.
+        """
+        if frame_index != self.frame_count:
+            raise ValueError(
+                f"Ожидался кадр {self.frame_count}, получен {frame_index}"
+            )
+        if names:
+            self.names.update({int(k): v for k, v in names.items()})
+
+        count = len(detections)
+        confidence = detections.confidence
+        if confidence is None:
+            confidence = np.ones(count, dtype=np.float32)
+        self._pending.append((
+            np.asarray(detections.xyxy, dtype=np.float32).reshape(-1, 4),
+            np.asarray(confidence, dtype=np.float32),
+            np.asarray(detections.class_id, dtype=np.int32)
+        ))
+        self._dirty = True
+
+    def mark_complete(self):
+        """Отмечает, что в кеше все кадры видео."""
+        if not self.complete:
+            self.complete = True
+            self._dirty = True
+
+    def save(self):
+        """Сохраняет кеш на диск (атомарно)."""
+        if not self._dirty:
+            return
+
+        if self._pending:
+            counts = [len(xyxy) for xyxy, _, _ in self._pending]
+            offsets = self._offsets[-1] + np.cumsum(counts, dtype=np.int64)
+            self._offsets = np.concatenate([self._offsets, offsets])
+            self._xyxy = np.concatenate([self._xyxy] + [p[0] for p in self._pending])
+            self._confidence = np.concatenate([self._confidence] + [p[1] for p in self._pending])
+            self._class_id = np.concatenate([self._class_id] + [p[2] for p in self._pending])
+            self._pending = []
+
+        meta = json.dumps({
+            "version": self.FORMAT_VERSION,
+            "video_path": self.video_path,
+            "model_path": self.model_path,
+            "params": self.params,
+            "names": {str(k): v for k, v in self.names.items()},
+            "complete": self.complete
+        }, ensure_ascii=False)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(meta),
+            frame_offsets=self._offsets,
+            xyxy=self._xyxy.astype(np.float32),
+            confidence=self._confidence.astype(np.float32),
+            class_id=self._class_id.astype(np.int32)
+        )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,219 @@
+import time
+import threading
+import dataclasses
+from collections import deque
+
+import cv2
+import numpy as np
+import supervision as sv
+
+
+class DetectionScheduler:
+    """
+    Планировщик запусков детектора.
+
+    Детектор запускается раз в interval кадров. На промежуточных кадрах
+    рамки треков переносятся оптическим потоком Lucas-Kanade по точкам
+    внутри рамок (медианное смещение точек). Детекция запускается
+    досрочно, если рамки движутся быстрее motion_threshold (доля размера
+    рамки за кадр), накопленная неопределенность переноса (потеря точек,
+    разброс смещений) превышает uncertainty_threshold или рамка вышла
+    за кадр.
+
+    В адаптивном режиме интервал подстраивается по ошибке переноса: при
+    каждой детекции перенесенные рамки сравниваются с найденными
+    детектором (IoU по tracker_id).
+    """
+    POINTS_PER_BOX = 16
+    MIN_POINTS = 4
+    GRID_SIZE = 4  # сетка точек для рамок без выраженных углов
+    LK_PARAMS = dict(
+        winSize=(15, 15),
+        maxLevel=3,
+        criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+    )
+
+    def __init__(self, interval=3, adaptive=True, max_interval=10, motion_threshold=0.25,
+                 uncertainty_threshold=0.5, good_iou=0.7, poor_iou=0.5, rate_window=2.0):
+        self.interval = max(1, interval)
+        self.adaptive = adaptive
+        self.max_interval = max_interval
+        self.motion_threshold = motion_threshold
+        self.uncertainty_threshold = uncertainty_threshold
+        self.good_iou = good_iou  # перенос точный - интервал можно увеличить
+        self.poor_iou = poor_iou  # перенос неточный - интервал уменьшается
+        self.rate_window = rate_window  # окно расчета частот, с
+
+        self._lock = threading.Lock()
+        self._since_detection = 0
+        self._force = True
+
+        self._prev_gray = None
+        self._detections = None  # текущие рамки треков
+        self._uncertainty = np.zeros(0)
+
+        self._detect_times = deque()
+        self._frame_times = deque()
+        self.detections_run = 0
+        self.frames_propagated = 0
+        self.forced_detections = 0
+
+    def configure(self, interval=None, adaptive=None):
+        """Меняет базовый интервал и режим адаптации."""
+        with self._lock:
+            if interval is not None:
+                self.interval = max(1, interval)
+            if adaptive is not None:
+                self.adaptive = adaptive
+
+    def request_detection(self):
+        """Запрашивает детекцию на следующем кадре (без учета в forced_detections)."""
+        with self._lock:
+            self._force = True
+
+    @property
+    def active_tracks(self):
+        """True, если после последней детекции есть отслеживаемые объекты."""
+        detections = self._detections
+        return detections is not None and len(detections) > 0
+
+    def should_detect(self):
+        """Решает, запускать ли детектор на очередном кадре."""
+        with self._lock:
+            if self._force or self._since_detection >= self.interval - 1:
+                self._since_detection = 0
+                self._force = False
+                return True
+            self._since_detection += 1
+            return False
+
+    def on_detection(self, frame, detections):
+        """Принимает результат детекции (после трекера) и адаптирует интервал."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.adaptive:
+            accuracy = self._propagation_iou(detections)
+            if accuracy is not None:
+                with self._lock:
+                    if accuracy >= self.good_iou:
+                        self.interval = min(self.max_interval, self.interval + 1)
+                    elif accuracy < self.poor_iou:
+                        self.interval = max(1, self.interval // 2)
+
+        self._detections = detections
+        self._uncertainty = np.zeros(len(detections))
+        self._prev_gray = gray
+        self.detections_run += 1
+        now = time.monotonic()
+        self._detect_times.append(now)
+        self._frame_times.append(now)
+
+    def _propagation_iou(self, detections):
+        """Средний IoU перенесенных и найденных рамок одних и тех же треков."""
+        previous = self._detections
+        if (previous is None or len(previous) == 0 or len(detections) == 0
+                or previous.tracker_id is None or detections.tracker_id is None):
+            return None
+        index = {int(tid): i for i, tid in enumerate(detections.tracker_id)}
+        pairs = [(i, index[int(tid)]) for i, tid in enumerate(previous.tracker_id) if int(tid) in index]
+        if not pairs:
+            return None
+        predicted = previous.xyxy[[i for i, _ in pairs]]
+        detected = detections.xyxy[[j for _, j in pairs]]
+        return float(np.mean(sv.box_iou_batch(predicted, detected).diagonal()))
+
+    def _sample_points(self, gray, boxes):
+        """Точки для потока внутри каждой рамки: углы или равномерная сетка."""
+        h, w = gray.shape[:2]
+        points = []
+        owners = []
+        for index, (x1, y1, x2, y2) in enumerate(boxes):
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(w, int(np.ceil(x2))), min(h, int(np.ceil(y2)))
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.POINTS_PER_BOX, 0.01, 2)
+            if corners is not None and len(corners) >= self.MIN_POINTS:
+                box_points = corners.reshape(-1, 2) + (x1, y1)
+            else:
+                xs = np.linspace(x1, x2 - 1, self.GRID_SIZE + 2)[1:-1]
+                ys = np.linspace(y1, y2 - 1, self.GRID_SIZE + 2)[1:-1]
+                box_points = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+            points.append(box_points)
+            owners.append(np.full(len(box_points), index))
+        if not points:
+            return np.empty((0, 1, 2), np.float32), np.empty(0, int)
+        return np.concatenate(points).astype(np.float32).reshape(-1, 1, 2), np.concatenate(owners)
+
+    def propagate(self, frame):
+        """
+        Переносит рамки последней детекции на кадр без детекции.
+
+        Returns:
+            sv.Detections: рамки треков, сдвинутые по оптическому потоку
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        now = time.monotonic()
+        self._frame_times.append(now)
+        self.frames_propagated += 1
+
+        detections = self._detections
+        if detections is None:
+            detections = dataclasses.replace(sv.Detections.empty(), tracker_id=np.empty(0, dtype=int))
+        if len(detections) == 0 or self._prev_gray is None:
+            self._prev_gray = gray
+            return detections
+
+        boxes = detections.xyxy.astype(np.float32).copy()
+        sizes = np.maximum(np.hypot(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]), 1.0)
+        motion = np.zeros(len(boxes))
+        uncertainty = self._uncertainty.copy()
+
+        points, owners = self._sample_points(self._prev_gray, boxes)
+        if len(points):
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points, None, **self.LK_PARAMS)
+            status = status.reshape(-1).astype(bool)
+            shift = (moved - points).reshape(-1, 2)
+            for index in range(len(boxes)):
+                mine = owners == index
+                tracked = mine & status
+                total = np.count_nonzero(mine)
+                if np.count_nonzero(tracked) < self.MIN_POINTS:
+                    uncertainty[index] += 1.0  # точки потеряны
+                    continue
+                box_shift = np.median(shift[tracked], axis=0)
+                spread = np.median(np.abs(shift[tracked] - box_shift))
+                boxes[index] += np.tile(box_shift, 2)
+                motion[index] = np.hypot(*box_shift) / sizes[index]
+                uncertainty[index] += spread / sizes[index] + (1.0 - np.count_nonzero(tracked) / total)
+        else:
+            uncertainty += 1.0
+
+        h, w = gray.shape[:2]
+        outside = (boxes[:, 2] <= 0) | (boxes[:, 3] <= 0) | (boxes[:, 0] >= w) | (boxes[:, 1] >= h)
+        if (np.any(motion > self.motion_threshold) or np.any(uncertainty > self.uncertainty_threshold)
+                or np.any(outside)):
+            with self._lock:
+                if not self._force:
+                    self._force = True
+                    self.forced_detections += 1
+
+        self._uncertainty = uncertainty
+        self._prev_gray = gray
+        self._detections = dataclasses.replace(detections, xyxy=boxes)
+        return self._detections
+
+    def rates(self):
+        """
+        Частоты за последние rate_window секунд.
+
+        Returns:
+            tuple: (запусков детектора в секунду, отображаемых кадров в секунду)
+        """
+        now = time.monotonic()
+        for times in (self._detect_times, self._frame_times):
+            while times and now - times[0] > self.rate_window:
+                times.popleft()
+        span = self.rate_window
+        if self._frame_times:
+            span = min(span, max(now - self._frame_times[0], 1e-3))
+        return len(self._detect_times) / span, len(self._frame_times) / span
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+
+class DisparityRefiner:
+    """
+    Уточнение диспаритета сопоставленных объектов с субпиксельной точностью.
+
+    Для каждого объекта его рамка на ректифицированном кадре камеры 1
+    используется как шаблон и ищется нормированной корреляцией
+    (cv2.TM_CCOEFF_NORMED) в полосе тех же строк кадра камеры 2 вокруг
+    грубой оценки по центрам рамок. Положение пика уточняется параболой
+    по трем соседним значениям. Обрабатываются только вырезанные области,
+    а отбор и субпиксельная интерполяция выполняются сразу для всех
+    объектов кадра.
+    """
+    def __init__(self, search_margin=16, padding=4, min_score=0.6, min_size=4):
+        self.search_margin = search_margin  # запас поиска вокруг грубой оценки, пикс
+        self.padding = padding  # расширение рамки для контекста, пикс
+        self.min_score = min_score  # минимальная корреляция для принятия уточнения
+        self.min_size = min_size  # минимальный размер шаблона, пикс
+        self.refined_count = 0  # уточнено объектов на последнем кадре
+
+    def refine(self, frame1, frame2, boxes1, centers1, centers2):
+        """
+        Уточняет центры объектов камеры 2 по корреляции с камерой 1.
+
+        Args:
+            frame1, frame2: ректифицированные кадры
+            boxes1: рамки объектов камеры 1 (N, 4)
+            centers1, centers2: центры сопоставленных объектов (N, 2)
+
+        Returns:
+            Уточненные центры камеры 2 (N, 2); для объектов без надежного
+            пика корреляции остаются исходные значения
+        """
+        centers1 = np.asarray(centers1, dtype=np.float64).reshape(-1, 2)
+        centers2 = np.array(centers2, dtype=np.float64).reshape(-1, 2)
+        boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+        count = len(boxes1)
+        self.refined_count = 0
+        if count == 0:
+            return centers2
+
+        height, width = frame1.shape[:2]
+        width2 = frame2.shape[1]
+
+        # Рамки шаблонов и полосы поиска для всех объектов
+        x1 = np.clip(np.floor(boxes1[:, 0]) - self.padding, 0, width).astype(int)
+        y1 = np.clip(np.floor(boxes1[:, 1]) - self.padding, 0, height).astype(int)
+        x2 = np.clip(np.ceil(boxes1[:, 2]) + self.padding, 0, width).astype(int)
+        y2 = np.clip(np.ceil(boxes1[:, 3]) + self.padding, 0, height).astype(int)
+        shift = centers1[:, 0] - centers2[:, 0]
+        strip_x1 = np.clip(np.floor(x1 - shift) - self.search_margin, 0, width2).astype(int)
+        strip_x2 = np.clip(np.ceil(x2 - shift) + self.search_margin, 0, width2).astype(int)
+
+        usable = (x2 - x1 >= self.min_size) & (y2 - y1 >= self.min_size)
+        usable &= strip_x2 - strip_x1 >= (x2 - x1) + 2
+
+        scores = np.zeros((count, 3))
+        peaks = np.zeros(count)
+        for k in np.flatnonzero(usable):
+            template = cv2.cvtColor(frame1[y1[k]:y2[k], x1[k]:x2[k]], cv2.COLOR_BGR2GRAY)
+            strip = cv2.cvtColor(frame2[y1[k]:y2[k], strip_x1[k]:strip_x2[k]], cv2.COLOR_BGR2GRAY)
+            response = cv2.matchTemplate(strip, template, cv2.TM_CCOEFF_NORMED)[0]
+
+            best = int(np.argmax(response))
+            if best == 0 or best == len(response) - 1:
+                # Пик на краю полосы - истинный максимум может быть за ее пределами
+                usable[k] = False
+                continue
+            scores[k] = response[best - 1:best + 2]
+            peaks[k] = strip_x1[k] + best
+
+        valid = usable & (scores[:, 1] >= self.min_score)
+        left, center, right = scores[valid].T
+        curvature = left - 2 * center + right
+        offset = np.zeros_like(center)
+        np.divide(0.5 * (left - right), curvature, out=offset, where=np.abs(curvature) > 1e-9)
+
+        disparity = x1[valid] - (peaks[valid] + offset)
+        centers2[valid, 0] = centers1[valid, 0] - disparity
+        self.refined_count = int(valid.sum())
+        return centers2
@@ -1,17 +1,16 @@
 import os
 import json
 from PySide6.QtWidgets import QMessageBox
+from src.core.calibration_store import CalibrationStore
 
 class DistanceLogic:
     @staticmethod
     def load_calibration_data():
         calibration_data = {}
-        if os.path.exists("calibration_data.json"):
-            try:
-                with open("calibration_data.json", "r") as f:
-                    calibration_data = json.load(f)
-            except Exception as e:
-                print(f"Ошибка при загрузке данных калибровки: {e}")
+        try:
+            calibration_data = CalibrationStore.load()
+        except Exception as e:
+            print(f"Ошибка при загрузке данных калибровки: {e}")
         return calibration_data
 
     @staticmethod
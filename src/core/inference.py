@@ -0,0 +1,76 @@
+import threading
+
+import supervision as sv
+
+
+class BatchPredictor:
+    """
+    Пакетный инференс YOLO для нескольких камер.
+
+    Кадры всех камер передаются в модель одним вызовом, результаты
+    возвращаются в том же порядке, что и кадры. Подходит как для
+    стереопары, так и для N камер (с ограничением max_batch).
+
+    Модель может быть общей для нескольких потоков (ModelRegistry), поэтому
+    вызовы predict выполняются под блокировкой lock этой модели.
+    """
+    def __init__(self, model, conf=0.25, iou=0.45, device='cpu', half=False, max_batch=None, imgsz=None,
+                 lock=None):
+        self.model = model
+        self.lock = lock or threading.Lock()
+        self.conf = conf
+        self.iou = iou
+        self.device = device
+        self.half = half
+        self.max_batch = max_batch  # None - все кадры одним пакетом
+        self.imgsz = imgsz  # None - размер по умолчанию модели
+
+    def update_settings(self, settings):
+        """
+        Обновляет пороги и размер пакета. Устройство и точность выбираются
+        при подготовке модели (InferenceBackend.prepare), для их смены
+        предиктор создается заново.
+        """
+        for key in ('conf', 'iou', 'max_batch'):
+            if key in settings:
+                setattr(self, key, settings[key])
+
+    def predict(self, frames):
+        """
+        Выполняет детекцию на списке кадров.
+
+        Args:
+            frames: список кадров (по одному на камеру)
+
+        Returns:
+            list: результаты ultralytics, по одному на каждый кадр
+        """
+        frames = list(frames)
+        if not frames:
+            return []
+
+        params = {'imgsz': self.imgsz} if self.imgsz else {}
+        batch_size = self.max_batch or len(frames)
+        results = []
+        for start in range(0, len(frames), batch_size):
+            with self.lock:
+                results.extend(self.model.predict(
+                    frames[start:start + batch_size],
+                    conf=self.conf,
+                    iou=self.iou,
+                    device=self.device,
+                    half=self.half,
+                    verbose=False,
+                    **params
+                ))
+        return results
+
+    def predict_detections(self, frames):
+        """
+        Выполняет детекцию и конвертирует результаты в sv.Detections.
+
+        Returns:
+            tuple: (список sv.Detections, список результатов ultralytics)
+        """
+        results = self.predict(frames)
+        return [sv.Detections.from_ultralytics(result) for result in results], results
@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import shutil
+import threading
+import importlib.util
+from collections import namedtuple
+
+import numpy as np
+
+from src.utils.file_hash import file_sha1
+from src.core.model_registry import ModelRegistry
+from src.core.inference import BatchPredictor
+from src.core.process_inference import ProcessInferencePool
+from src.core.adaptive_resolution import AdaptiveResolutionPredictor
+
+
+# Подготовленная модель: путь к загружаемому файлу и параметры инференса
+BackendSpec = namedtuple("BackendSpec", ["path", "backend", "device", "half", "imgsz"])
+
+
+class InferenceBackend:
+    """
+    Выбор среды выполнения модели YOLO.
+
+    На CPU веса .pt однократно экспортируются в ONNX и OpenVINO IR
+    (если установлены onnxruntime / openvino). Экспорт - с динамическим
+    размером пакета, поэтому стереопара и пакеты нескольких камер идут
+    одним вызовом. Экспортированные модели кешируются рядом с весами
+    под именем, содержащим хеш весов и imgsz. Среда выбирается замером
+    скорости на пакете пустых кадров того размера, с которым работает
+    вызывающий код; результат замера тоже кешируется, поэтому при
+    следующем запуске выбор мгновенный.
+
+    Квантованные модели (INT8, см. ModelQuantizer) лежат в том же кеше
+    с суффиксом .int8 и выбираются настройкой точности весов.
+    """
+    TORCH = "torch"
+    ONNX = "onnx"
+    OPENVINO = "openvino"
+    BACKENDS = (TORCH, ONNX, OPENVINO)
+
+    FP32 = "fp32"
+    INT8 = "int8"
+
+    RUNTIME_MODULES = {ONNX: "onnxruntime", OPENVINO: "openvino"}
+    EXPORT_SUFFIXES = {ONNX: ".onnx", OPENVINO: "_openvino_model"}
+
+    DEFAULT_IMGSZ = 640
+    BENCHMARK_RUNS = 5
+
+    _lock = threading.Lock()  # экспорт и замер выполняются один раз
+
+    @staticmethod
+    def resolve_device(device, half):
+        """
+        Проверяет доступность устройства. Недоступные cuda/mps заменяются
+        на cpu, половинная точность на CPU отключается.
+        """
+        try:
+            import torch
+            if str(device).startswith("cuda") and not torch.cuda.is_available():
+                print(f"Устройство {device} недоступно, используется cpu")
+                device = "cpu"
+            elif device == "mps" and not torch.backends.mps.is_available():
+                print("Устройство mps недоступно, используется cpu")
+                device = "cpu"
+        except Exception as e:
+            print(f"Ошибка проверки устройства {device}: {e}")
+            device = "cpu"
+        return device, bool(half) and device != "cpu"
+
+    @classmethod
+    def available_runtimes(cls):
+        """Среды выполнения, для которых установлены пакеты."""
+        return [
+            backend for backend, module in cls.RUNTIME_MODULES.items()
+            if importlib.util.find_spec(module) is not None
+        ]
+
+    @classmethod
+    def artifact_path(cls, model_path, backend, imgsz, precision=FP32):
+        """Путь к экспортированной модели в кеше рядом с весами."""
+        stem, _ = os.path.splitext(os.path.abspath(model_path))
+        tag = ".int8" if precision == cls.INT8 else ""
+        # .dyn - динамический размер пакета (экспорты со статической формой не используются)
+        return f"{stem}.{file_sha1(model_path)[:12]}.{imgsz}.dyn{tag}{cls.EXPORT_SUFFIXES[backend]}"
+
+    @classmethod
+    def quantized_artifacts(cls, model_path, imgsz=DEFAULT_IMGSZ):
+        """Квантованные модели из кеша для установленных сред: {backend: путь}."""
+        if not model_path or not os.path.isfile(model_path):
+            return {}
+        artifacts = {}
+        for backend in cls.available_runtimes():
+            path = cls.artifact_path(model_path, backend, imgsz, cls.INT8)
+            if os.path.exists(path):
+                artifacts[backend] = path
+        return artifacts
+
+    @classmethod
+    def export(cls, model_path, backend, imgsz):
+        """
+        Экспортирует веса в формат backend, если в кеше его еще нет.
+
+        Returns:
+            str: путь к экспортированной модели
+        """
+        target = cls.artifact_path(model_path, backend, imgsz)
+        if os.path.exists(target):
+            return target
+
+        from ultralytics import YOLO
+        print(f"Экспорт модели {model_path} в {backend} (imgsz={imgsz})...")
+        exported = YOLO(model_path).export(format=backend, imgsz=imgsz, half=False, dynamic=True)
+        # ultralytics сохраняет результат рядом с весами под их именем,
+        # переносим его под ключ кеша
+        shutil.move(str(exported), target)
+        return target
+
+    @classmethod
+    def _benchmark(cls, path, imgsz, batch=1):
+        """Медианное время инференса модели на пакете из batch пустых кадров, с."""
+        from ultralytics import YOLO
+        model = YOLO(path, task="detect")
+        frames = [np.zeros((imgsz, imgsz, 3), dtype=np.uint8) for _ in range(max(1, batch))]
+        model.predict(frames, imgsz=imgsz, device="cpu", verbose=False)  # прогрев
+        timings = []
+        for _ in range(cls.BENCHMARK_RUNS):
+            start = time.perf_counter()
+            model.predict(frames, imgsz=imgsz, device="cpu", verbose=False)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings))
+
+    @classmethod
+    def _choose_fastest(cls, model_path, candidates, imgsz, precision=FP32, batch=1):
+        """
+        Выбирает самую быструю среду среди кандидатов {backend: путь}
+        на пакетах по batch кадров. Результат замера хранится в JSON рядом с весами.
+        """
+        if len(candidates) == 1:
+            return next(iter(candidates))
+        stem, _ = os.path.splitext(os.path.abspath(model_path))
+        tag = ".int8" if precision == cls.INT8 else ""
+        choice_path = f"{stem}.{file_sha1(model_path)[:12]}.{imgsz}.b{batch}{tag}.backend.json"
+        try:
+            with open(choice_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("candidates") == sorted(candidates) and cached.get("backend") in candidates:
+                return cached["backend"]
+        except (OSError, ValueError):
+            pass
+
+        timings = {}
+        for backend, path in candidates.items():
+            try:
+                timings[backend] = cls._benchmark(path, imgsz, batch)
+            except Exception as e:
+                print(f"Ошибка замера среды {backend}: {e}")
+        if not timings:
+            return cls.TORCH
+
+        fastest = min(timings, key=timings.get)
+        print(f"Время инференса на CPU (пакет {batch}): " + ", ".join(
+            f"{backend} {seconds * 1000:.1f} мс" for backend, seconds in timings.items()
+        ))
+        try:
+            with open(choice_path, 'w', encoding='utf-8') as f:
+                json.dump({"backend": fastest, "candidates": sorted(candidates), "timings": timings}, f, indent=2)
+        except OSError as e:
+            print(f"Ошибка сохранения выбора среды выполнения: {e}")
+        return fastest
+
+    @classmethod
+    def prepare(cls, model_path, device='cpu', half=False, imgsz=DEFAULT_IMGSZ, backend='auto',
+                precision=FP32, batch=1):
+        """
+        Подготавливает модель к инференсу.
+
+        Args:
+            model_path: путь к весам (.pt) или к уже экспортированной модели
+            device, half: запрошенные устройство и точность
+            imgsz: размер входа модели
+            backend: 'auto', 'torch', 'onnx' или 'openvino'
+            precision: 'fp32' или 'int8' (квантованная модель из кеша, только CPU)
+            batch: сколько кадров вызывающий код передает за один вызов
+                (по нему замеряется скорость сред)
+
+        Returns:
+            BackendSpec: путь для загрузки и итоговые параметры инференса
+        """
+        if precision == cls.INT8:
+            quantized = cls.quantized_artifacts(model_path, imgsz)
+            if backend in quantized:
+                quantized = {backend: quantized[backend]}
+            if quantized:
+                with cls._lock:
+                    chosen = cls._choose_fastest(model_path, quantized, imgsz, cls.INT8, batch)
+                return BackendSpec(quantized[chosen], chosen, "cpu", False, imgsz)
+            print(f"Квантованная модель для {model_path} не найдена, используется FP32")
+
+        device, half = cls.resolve_device(device, half)
+        torch_spec = BackendSpec(model_path, cls.TORCH, device, half, imgsz)
+        if backend == cls.TORCH or device != "cpu" or not model_path.endswith(".pt"):
+            return torch_spec
+
+        runtimes = cls.available_runtimes()
+        if backend != 'auto':
+            if backend not in runtimes:
+                print(f"Среда {backend} не установлена, используется torch")
+                return torch_spec
+            runtimes = [backend]
+
+        with cls._lock:
+            candidates = {}
+            for runtime in runtimes:
+                try:
+                    candidates[runtime] = cls.export(model_path, runtime, imgsz)
+                except Exception as e:
+                    print(f"Ошибка экспорта модели в {runtime}: {e}")
+            if not candidates:
+                return torch_spec
+
+            if backend == 'auto':
+                candidates[cls.TORCH] = model_path
+                chosen = cls._choose_fastest(model_path, candidates, imgsz, batch=batch)
+            else:
+                chosen = backend
+
+        if chosen == cls.TORCH:
+            return torch_spec
+        return BackendSpec(candidates[chosen], chosen, "cpu", False, imgsz)
+
+    @classmethod
+    def create_predictor(cls, model_path, conf=0.25, iou=0.45, device='cpu', half=False,
+                         workers=0, backend='auto', imgsz=DEFAULT_IMGSZ, max_batch=None, precision=FP32,
+                         batch=1):
+        """
+        Создает предиктор с интерфейсом BatchPredictor: в текущем процессе
+        (модель из ModelRegistry) или в пуле процессов (workers > 0).
+        batch - типичное число кадров за вызов (1 - одна камера, 2 - стереопара).
+        """
+        if workers > 0:
+            batch = 1  # процессы получают кадры по одному
+        spec = cls.prepare(model_path, device, half, imgsz, backend, precision, batch)
+        if workers > 0:
+            return ProcessInferencePool(
+                spec.path, workers, conf=conf, iou=iou,
+                device=spec.device, half=spec.half, imgsz=spec.imgsz
+            )
+        registry = ModelRegistry.instance()
+        model = registry.acquire(spec.path, spec.device, spec.half)
+        return BatchPredictor(
+            model, conf=conf, iou=iou, device=spec.device, half=spec.half,
+            max_batch=max_batch, imgsz=spec.imgsz, lock=registry.model_lock(model)
+        )
+
+    @classmethod
+    def create_adaptive_predictor(cls, model_path, controller, conf=0.25, iou=0.45, device='cpu', half=False,
+                                  workers=0, backend='auto', max_batch=None, precision=FP32, batch=1):
+        """
+        Создает предиктор, переключающий imgsz по решению ResolutionController.
+
+        Сразу готовится модель только для текущего размера, остальные -
+        в фоне при первом переключении на них (см. AdaptiveResolutionPredictor).
+        Пул процессов создается один: если его модель не принимает
+        произвольный размер входа, контроллер ограничивается одним размером.
+        С precision='int8' контроллер ограничивается размерами, для которых
+        есть квантованные модели.
+        """
+        kwargs = dict(conf=conf, iou=iou, device=device, half=half, backend=backend,
+                      max_batch=max_batch, precision=precision, batch=batch)
+        if precision == cls.INT8:
+            quantized = [size for size in controller.sizes if cls.quantized_artifacts(model_path, size)]
+            if quantized and len(quantized) < len(controller.sizes):
+                print(f"Квантованные модели есть для imgsz {quantized}, "
+                      f"размер входа переключается только между ними")
+                controller.restrict(quantized)
+
+        if workers > 0:
+            imgsz = controller.imgsz
+            predictor = cls.create_predictor(model_path, workers=workers, imgsz=imgsz, **kwargs)
+            if not predictor.model_path.endswith(".pt"):
+                controller.restrict((imgsz,))
+            return AdaptiveResolutionPredictor(
+                controller, release=cls.release_predictor,
+                predictors={size: predictor for size in controller.sizes}
+            )
+
+        # Предикторы всех размеров остаются в реестре при смене камеры или режима
+        ModelRegistry.instance().reserve_idle(len(controller.sizes))
+        return AdaptiveResolutionPredictor(
+            controller,
+            factory=lambda size: cls.create_predictor(model_path, imgsz=size, **kwargs),
+            release=cls.release_predictor
+        )
+
+    @staticmethod
+    def release_predictor(predictor):
+        """Останавливает процессы инференса или освобождает модель в реестре."""
+        if isinstance(predictor, AdaptiveResolutionPredictor):
+            predictor.close()
+        elif isinstance(predictor, ProcessInferencePool):
+            predictor.close()
+        elif predictor is not None:
+            ModelRegistry.instance().release(predictor.model)
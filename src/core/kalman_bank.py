@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class KalmanFilterBank:
+    """
+    Набор фильтров Калмана для 3D-треков стереопар.
+
+    Состояние каждого трека - [x, y, z, vx, vy, vz] (метры, м/с), модель -
+    постоянная скорость с белым шумом ускорения. Состояния и ковариации
+    всех треков лежат в общих массивах (N, 6) и (N, 6, 6), поэтому
+    предсказание и обновление выполняются одним векторным шагом на кадр.
+    Трек адресуется идентификатором стереопары (tracker_id камеры 1).
+    """
+    def __init__(self, process_noise=3.0, measurement_noise=0.3, initial_velocity_std=5.0, max_age=2.0):
+        self.process_noise = process_noise  # СКО ускорения, м/с^2
+        self.measurement_noise = measurement_noise  # СКО измерения координаты, м
+        self.initial_velocity_std = initial_velocity_std  # СКО начальной скорости, м/с
+        self.max_age = max_age  # время без измерений до удаления трека, с
+
+        self.track_ids = np.empty(0, dtype=np.int64)
+        self.state = np.empty((0, 6))
+        self.covariance = np.empty((0, 6, 6))
+        self.last_update = np.empty(0)
+        self._slots = {}  # {track_id: индекс в массивах}
+        self.timestamp = None
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def _lookup(self, track_ids):
+        """Индексы треков в массивах (-1, если трека нет)."""
+        return np.array([self._slots.get(int(t), -1) for t in track_ids], dtype=int)
+
+    def predict(self, timestamp):
+        """Продвигает все треки к моменту timestamp и удаляет устаревшие."""
+        if self.timestamp is None:
+            self.timestamp = timestamp
+            return
+
+        dt = timestamp - self.timestamp
+        self.timestamp = timestamp
+        if dt <= 0 or len(self) == 0:
+            return
+
+        transition = np.eye(6)
+        transition[:3, 3:] = np.eye(3) * dt
+
+        q = self.process_noise ** 2
+        noise = np.zeros((6, 6))
+        noise[:3, :3] = np.eye(3) * q * dt ** 4 / 4
+        noise[:3, 3:] = noise[3:, :3] = np.eye(3) * q * dt ** 3 / 2
+        noise[3:, 3:] = np.eye(3) * q * dt ** 2
+
+        self.state = self.state @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + noise
+
+        stale = timestamp - self.last_update > self.max_age
+        if stale.any():
+            self._remove(stale)
+
+    def _remove(self, mask):
+        keep = ~mask
+        self.track_ids = self.track_ids[keep]
+        self.state = self.state[keep]
+        self.covariance = self.covariance[keep]
+        self.last_update = self.last_update[keep]
+        self._slots = {int(t): i for i, t in enumerate(self.track_ids)}
+
+    def _add(self, track_ids, positions):
+        count = len(track_ids)
+        state = np.hstack([positions, np.zeros((count, 3))])
+        covariance = np.zeros((count, 6, 6))
+        covariance[:, :3, :3] = np.eye(3) * self.measurement_noise ** 2
+        covariance[:, 3:, 3:] = np.eye(3) * self.initial_velocity_std ** 2
+
+        start = len(self)
+        self.track_ids = np.concatenate([self.track_ids, track_ids])
+        self.state = np.concatenate([self.state, state])
+        self.covariance = np.concatenate([self.covariance, covariance])
+        self.last_update = np.concatenate([self.last_update, np.full(count, self.timestamp)])
+        for offset, track_id in enumerate(track_ids):
+            self._slots[int(track_id)] = start + offset
+
+    def update(self, track_ids, positions):
+        """
+        Обновляет треки измерениями положения (N, 3), м.
+        Новые идентификаторы заводятся как новые треки.
+        """
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if len(track_ids) == 0:
+            return
+
+        slots = self._lookup(track_ids)
+        known = slots >= 0
+        if known.any():
+            slots_known = slots[known]
+            covariance = self.covariance[slots_known]
+            innovation_cov = covariance[:, :3, :3] + np.eye(3) * self.measurement_noise ** 2
+            gain = covariance[:, :, :3] @ np.linalg.inv(innovation_cov)
+            innovation = positions[known] - self.state[slots_known, :3]
+
+            self.state[slots_known] += (gain @ innovation[:, :, None])[:, :, 0]
+            self.covariance[slots_known] = covariance - gain @ covariance[:, :3, :]
+            self.last_update[slots_known] = self.timestamp
+
+        if (~known).any():
+            self._add(track_ids[~known], positions[~known])
+
+    def estimate(self, track_ids):
+        """
+        Текущие оценки для треков.
+
+        Returns:
+            (positions (N, 3), velocities (N, 3), found (N,)) - для
+            отсутствующих треков положение и скорость равны NaN
+        """
+        slots = self._lookup(track_ids)
+        found = slots >= 0
+        positions = np.full((len(slots), 3), np.nan)
+        velocities = np.full((len(slots), 3), np.nan)
+        positions[found] = self.state[slots[found], :3]
+        velocities[found] = self.state[slots[found], 3:]
+        return positions, velocities, found
+
+    @staticmethod
+    def time_to_approach(positions, velocities):
+        """
+        Время до сближения с камерой, с: расстояние, деленное на скорость
+        сближения. Для удаляющихся объектов - inf.
+        """
+        distances = np.linalg.norm(positions, axis=1)
+        closing_speed = -np.sum(positions * velocities, axis=1) / np.maximum(distances, 1e-9)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(closing_speed > 0, distances / closing_speed, np.inf)
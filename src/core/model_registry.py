@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+
+from ultralytics import YOLO
+from src.utils.file_hash import file_sha1
+
+
+class ModelRegistry:
+    """
+    Общий для процесса реестр загруженных моделей YOLO.
+
+    Модели хранятся по ключу (путь, хеш файла, устройство, half) и выдаются
+    с подсчетом ссылок. Модели без активных пользователей остаются
+    загруженными и вытесняются по принципу LRU, когда их становится больше
+    max_idle. Поэтому переключение камер и режимов не перезагружает веса.
+    Потребители, которые держат сразу несколько моделей (по одной на размер
+    входа), увеличивают max_idle через reserve_idle.
+
+    Предсказание ultralytics не потокобезопасно, поэтому у каждой модели
+    есть своя блокировка (model_lock): потоки, получившие одну модель,
+    выполняют predict по очереди.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_idle=2):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: {"model": YOLO, "refs": int, "lock": Lock}}
+        self._keys_by_model = {}  # {id(model): key}
+        self._loading = {}  # {key: Event} - модели, которые сейчас загружаются
+
+    @classmethod
+    def instance(cls):
+        """Возвращает общий экземпляр реестра."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def reserve_idle(self, count):
+        """Гарантирует, что без вытеснения остаются хотя бы count моделей без ссылок."""
+        with self._lock:
+            self.max_idle = max(self.max_idle, count)
+
+    def make_key(self, model_path, device='cpu', half=False):
+        """Ключ модели в реестре."""
+        # Экспорт OpenVINO - каталог; его имя уже содержит хеш исходных весов
+        digest = file_sha1(model_path) if os.path.isfile(model_path) else None
+        return (os.path.abspath(model_path), digest, device, bool(half))
+
+    def acquire(self, model_path, device='cpu', half=False):
+        """
+        Возвращает загруженную модель, при необходимости загружая её.
+        Каждый вызов acquire должен сопровождаться вызовом release.
+
+        Загрузка идет вне общей блокировки реестра, чтобы release и
+        model_lock работающих потоков её не ждали; одновременные запросы
+        той же модели ждут завершения первой загрузки.
+        """
+        key = self.make_key(model_path, device, half)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["refs"] += 1
+                    self._entries.move_to_end(key)
+                    return entry["model"]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            model = YOLO(model_path)
+        except Exception:
+            with self._lock:
+                self._loading.pop(key).set()
+            raise
+
+        with self._lock:
+            self._entries[key] = {"model": model, "refs": 1, "lock": threading.Lock()}
+            self._keys_by_model[id(model)] = key
+            self._loading.pop(key).set()
+        return model
+
+    def model_lock(self, model):
+        """Блокировка, под которой выполняется predict модели из реестра."""
+        with self._lock:
+            key = self._keys_by_model.get(id(model))
+            if key is None:
+                return threading.Lock()  # модель загружена не через реестр
+            return self._entries[key]["lock"]
+
+    def release(self, model):
+        """Освобождает ссылку на модель, полученную через acquire."""
+        if model is None:
+            return
+        with self._lock:
+            key = self._keys_by_model.get(id(model))
+            if key is None:
+                return
+            entry = self._entries[key]
+            entry["refs"] = max(0, entry["refs"] - 1)
+            self._evict_idle()
+
+    def _evict_idle(self):
+        """Выгружает самые давно использованные модели без ссылок."""
+        idle = [key for key, entry in self._entries.items() if entry["refs"] == 0]
+        for key in idle[:max(0, len(idle) - self.max_idle)]:
+            entry = self._entries.pop(key)
+            self._keys_by_model.pop(id(entry["model"]), None)
+
+    def clear(self):
+        """Выгружает все модели без активных пользователей."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry["refs"] == 0]:
+                entry = self._entries.pop(key)
+                self._keys_by_model.pop(id(entry["model"]), None)
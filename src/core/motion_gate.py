@@ -0,0 +1,92 @@
+import time
+
+import cv2
+
+
+class MotionGate:
+    """
+    Фильтр кадров перед инференсом по наличию движения.
+
+    Кадр уменьшается до width пикселей по ширине, движение ищется
+    вычитанием фона (MOG2). Если движения нет и активных треков нет,
+    детектор не запускается; раз в safety_interval секунд детекция
+    выполняется в любом случае - на случай объектов, неподвижных
+    относительно камеры.
+
+    Чувствительность задается min_pixels - минимальным числом
+    изменившихся пикселей уменьшенного кадра (меньше - чувствительнее).
+    Дальние БПЛА занимают на уменьшенном кадре единицы пикселей,
+    поэтому морфологическая фильтрация шума не применяется.
+    """
+    def __init__(self, enabled=True, min_pixels=4, safety_interval=2.0, width=320,
+                 var_threshold=16, warmup_frames=30):
+        self.enabled = enabled
+        self.min_pixels = min_pixels
+        self.safety_interval = safety_interval  # период страховочной детекции, с
+        self.width = width
+        self.var_threshold = var_threshold
+        self.warmup_frames = warmup_frames  # кадры обучения модели фона
+
+        self._subtractor = None
+        self._frames_seen = 0
+        self._last_run = 0.0
+
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.safety_runs = 0
+
+    def configure(self, enabled=None, min_pixels=None, safety_interval=None):
+        """Меняет параметры фильтра."""
+        if enabled is not None:
+            self.enabled = enabled
+        if min_pixels is not None:
+            self.min_pixels = min_pixels
+        if safety_interval is not None:
+            self.safety_interval = safety_interval
+
+    def has_motion(self, frame):
+        """True, если на кадре есть движение (или модель фона еще обучается)."""
+        if not self.enabled:
+            return True
+        if self._subtractor is None:
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=500, varThreshold=self.var_threshold, detectShadows=False
+            )
+
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.width / w)
+        small = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        mask = self._subtractor.apply(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+
+        self._frames_seen += 1
+        if self._frames_seen <= self.warmup_frames:
+            return True
+        return cv2.countNonZero(mask) >= self.min_pixels
+
+    def allow(self, motion, active_tracks):
+        """
+        Решает, пропускать ли кадр к детектору.
+
+        Returns:
+            tuple: (запускать ли детектор, страховочная ли это детекция)
+        """
+        self.frames_checked += 1
+        now = time.monotonic()
+        if not self.enabled or motion or active_tracks:
+            self._last_run = now
+            return True, False
+        if now - self._last_run >= self.safety_interval:
+            self._last_run = now
+            self.safety_runs += 1
+            return True, True
+        self.frames_skipped += 1
+        return False, False
+
+    def stats(self):
+        """Счетчики фильтра: {checked, skipped, safety_runs, skip_ratio}."""
+        return {
+            'checked': self.frames_checked,
+            'skipped': self.frames_skipped,
+            'safety_runs': self.safety_runs,
+            'skip_ratio': self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+        }
@@ -0,0 +1,233 @@
+import threading
+import multiprocessing as mp
+from collections import namedtuple
+from multiprocessing import shared_memory
+from queue import Empty
+
+import numpy as np
+import supervision as sv
+
+
+# Результат инференса в рабочем процессе: достаточно имен классов
+# (совместим с результатами ultralytics по атрибуту names)
+ProcessResult = namedtuple("ProcessResult", ["names"])
+
+
+def _inference_worker(model_path, device, half, request_queue, result_queue):
+    """
+    Рабочий процесс: загружает модель и обрабатывает кадры из общей памяти.
+    Кадры не сериализуются - в очереди передаются только имя блока памяти,
+    смещение и форма кадра.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    memory = None
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+
+        request_id, memory_name, offset, shape, params = request
+        frame = None
+        try:
+            if memory is None or memory.name != memory_name:
+                # Кольцевой буфер пересоздан с большим размером слота
+                if memory is not None:
+                    memory.close()
+                memory = shared_memory.SharedMemory(name=memory_name)
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf, offset=offset)
+
+            result = model.predict(frame, device=device, half=half, verbose=False, **params)[0]
+            boxes = result.boxes
+            payload = (
+                boxes.xyxy.cpu().numpy().astype(np.float32),
+                boxes.conf.cpu().numpy().astype(np.float32),
+                boxes.cls.cpu().numpy().astype(int),
+                result.names
+            )
+            result_queue.put((request_id, payload, None))
+        except Exception as e:
+            result_queue.put((request_id, None, str(e)))
+        finally:
+            # Представление кадра держит ссылку на буфер: без его удаления
+            # memory.close() при пересоздании буфера завершится BufferError
+            del frame
+
+    if memory is not None:
+        memory.close()
+
+
+class SharedFrameRing:
+    """Кольцевой буфер кадров в общей памяти: slots слотов по slot_bytes байт."""
+    def __init__(self, slots, slot_bytes):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.memory = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self._next = 0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def write(self, frame):
+        """Копирует кадр в следующий слот. Возвращает смещение слота."""
+        offset = self._next * self.slot_bytes
+        self._next = (self._next + 1) % self.slots
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.memory.buf, offset=offset)
+        view[...] = frame
+        del view
+        return offset
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+class ProcessInferencePool:
+    """
+    Инференс YOLO в нескольких рабочих процессах.
+
+    Модель загружается в каждом процессе, поэтому постобработка ultralytics
+    и NumPy не конкурирует с GIL и циклом событий Qt основного процесса.
+    Кадры передаются через кольцевой буфер multiprocessing.shared_memory,
+    обратно возвращаются только рамки, уверенности и классы.
+
+    Интерфейс совпадает с BatchPredictor (predict_detections, update_settings).
+    """
+    DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+    FIRST_RESULT_TIMEOUT = 120.0  # загрузка модели в процессах
+    RESULT_TIMEOUT = 10.0
+
+    def __init__(self, model_path, workers=2, conf=0.25, iou=0.45, device='cpu', half=False, imgsz=None):
+        self.model_path = model_path
+        self.workers = max(1, workers)
+        self.conf = conf
+        self.iou = iou
+        self.device = device
+        self.half = half
+        self.imgsz = imgsz
+
+        context = mp.get_context("spawn")
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(
+                target=_inference_worker,
+                args=(model_path, device, half, self._requests, self._results),
+                name=f"inference-{index}",
+                daemon=True
+            )
+            for index in range(self.workers)
+        ]
+        # Слотов с запасом: кадры одного вызова распределяются по всем процессам
+        self._ring = SharedFrameRing(self.workers * 2, self.DEFAULT_SLOT_BYTES)
+        self._lock = threading.Lock()
+        self._next_request = 0
+        self._warmed_up = False
+
+        for process in self._processes:
+            process.start()
+
+    def update_settings(self, settings):
+        """Обновляет параметры инференса (передаются с каждым кадром)."""
+        for key in ('conf', 'iou'):
+            if key in settings:
+                setattr(self, key, settings[key])
+
+    def _ensure_capacity(self, frames):
+        largest = max(frame.nbytes for frame in frames)
+        if largest > self._ring.slot_bytes:
+            # Между вызовами кадров в обработке нет, буфер можно пересоздать
+            self._replace_ring(largest)
+
+    def _replace_ring(self, slot_bytes=None):
+        """
+        Заменяет кольцевой буфер новым блоком общей памяти.
+        Процессы, еще читающие старый блок, держат свое отображение,
+        поэтому их кадры не перезаписываются.
+        """
+        slots = self._ring.slots
+        slot_bytes = slot_bytes or self._ring.slot_bytes
+        self._ring.close()
+        self._ring = SharedFrameRing(slots, slot_bytes)
+
+    def predict_detections(self, frames):
+        """
+        Выполняет детекцию на списке кадров в рабочих процессах.
+
+        Returns:
+            tuple: (список sv.Detections, список ProcessResult)
+        """
+        frames = [np.ascontiguousarray(frame, dtype=np.uint8) for frame in frames]
+        if not frames:
+            return [], []
+
+        with self._lock:
+            self._ensure_capacity(frames)
+            params = {'conf': self.conf, 'iou': self.iou}
+            if self.imgsz:
+                params['imgsz'] = self.imgsz
+            payloads = {}
+            for start in range(0, len(frames), self._ring.slots):
+                chunk = frames[start:start + self._ring.slots]
+                pending = {}
+                for index, frame in enumerate(chunk, start=start):
+                    offset = self._ring.write(frame)
+                    request_id = self._next_request
+                    self._next_request += 1
+                    pending[request_id] = index
+                    self._requests.put((request_id, self._ring.name, offset, frame.shape, params))
+                payloads.update(self._collect(pending))
+            self._warmed_up = True
+
+        detections = []
+        results = []
+        for index in range(len(frames)):
+            xyxy, confidence, class_id, names = payloads[index]
+            detections.append(sv.Detections(
+                xyxy=xyxy.reshape(-1, 4),
+                confidence=confidence,
+                class_id=class_id,
+                data={'class_name': np.array([names[int(c)] for c in class_id])}
+            ))
+            results.append(ProcessResult(names))
+        return detections, results
+
+    def _collect(self, pending):
+        """
+        Ожидает результаты запросов {request_id: индекс кадра}.
+
+        При ошибке инференса остальные ответы пакета дочитываются, чтобы
+        следующий вызов не перезаписал слоты, которые процессы еще читают.
+        Если процессы не ответили, буфер заменяется новым.
+        """
+        timeout = self.RESULT_TIMEOUT if self._warmed_up else self.FIRST_RESULT_TIMEOUT
+        payloads = {}
+        first_error = None
+        while pending:
+            try:
+                request_id, payload, error = self._results.get(timeout=timeout)
+            except Empty:
+                self._replace_ring()
+                raise RuntimeError("Рабочие процессы инференса не отвечают")
+            index = pending.pop(request_id, None)
+            if index is None:
+                continue  # ответ на запрос, для которого истек таймаут
+            if error is not None:
+                first_error = first_error or error
+                continue
+            payloads[index] = payload
+        if first_error is not None:
+            raise RuntimeError(f"Ошибка инференса в рабочем процессе: {first_error}")
+        return payloads
+
+    def close(self):
+        """Останавливает рабочие процессы и освобождает общую память."""
+        for _ in self._processes:
+            self._requests.put(None)
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self._ring.close()
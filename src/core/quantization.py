@@ -0,0 +1,161 @@
+import os
+import glob
+import shutil
+
+import cv2
+import numpy as np
+
+from src.core.inference_backend import InferenceBackend
+
+
+class ModelQuantizer:
+    """
+    Пост-тренировочное квантование модели YOLO в INT8 для CPU.
+
+    Калибровочные кадры равномерно выбираются из видеозаписей и
+    приводятся ко входу модели (letterbox до imgsz). Квантуется
+    FP32-экспорт из кеша InferenceBackend: OpenVINO IR через NNCF или
+    ONNX через onnxruntime.quantization. Результат сохраняется в тот же
+    кеш с суффиксом .int8 и доступен в настройках точности весов.
+    """
+    PAD_VALUE = 114  # цвет полей letterbox, как в ultralytics
+
+    def __init__(self, model_path, imgsz=InferenceBackend.DEFAULT_IMGSZ):
+        self.model_path = model_path
+        self.imgsz = imgsz
+
+    @classmethod
+    def letterbox(cls, frame, imgsz):
+        """Масштабирует кадр с сохранением пропорций и дополняет до imgsz x imgsz."""
+        h, w = frame.shape[:2]
+        scale = min(imgsz / h, imgsz / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        image = np.full((imgsz, imgsz, 3), cls.PAD_VALUE, dtype=np.uint8)
+        top = (imgsz - new_h) // 2
+        left = (imgsz - new_w) // 2
+        image[top:top + new_h, left:left + new_w] = resized
+        return image
+
+    @staticmethod
+    def to_tensor(image):
+        """BGR uint8 (H, W, 3) -> RGB float32 (1, 3, H, W) в диапазоне [0, 1]."""
+        tensor = image[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+        return np.ascontiguousarray(tensor[None])
+
+    def sample_frames(self, video_paths, count=200):
+        """
+        Равномерно выбирает count калибровочных кадров из видеозаписей.
+        Кадры хранятся уже приведенными к imgsz (uint8), чтобы не держать
+        в памяти полноразмерные изображения.
+        """
+        video_paths = list(video_paths)
+        if not video_paths:
+            return []
+
+        frames = []
+        per_video = max(1, count // len(video_paths))
+        for video_path in video_paths:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                print(f"Ошибка: Не удалось открыть видео {video_path}")
+                continue
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if total <= 0:
+                cap.release()
+                continue
+            for index in np.linspace(0, total - 1, min(per_video, total)).astype(int):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+                ret, frame = cap.read()
+                if ret:
+                    frames.append(self.letterbox(frame, self.imgsz))
+            cap.release()
+        return frames
+
+    def quantize(self, frames, backend='auto'):
+        """
+        Квантует модель по калибровочным кадрам.
+
+        Args:
+            frames: кадры из sample_frames
+            backend: 'auto' (OpenVINO, если установлен, иначе ONNX), 'onnx' или 'openvino'
+
+        Returns:
+            tuple: (среда выполнения, путь к FP32-экспорту, путь к INT8-модели)
+        """
+        if not frames:
+            raise ValueError("Нет калибровочных кадров")
+
+        runtimes = InferenceBackend.available_runtimes()
+        if backend == 'auto':
+            backend = InferenceBackend.OPENVINO if InferenceBackend.OPENVINO in runtimes else InferenceBackend.ONNX
+        if backend not in runtimes:
+            raise RuntimeError(f"Среда {backend} не установлена")
+
+        fp32_path = InferenceBackend.export(self.model_path, backend, self.imgsz)
+        target = InferenceBackend.artifact_path(self.model_path, backend, self.imgsz, InferenceBackend.INT8)
+        print(f"Квантование {fp32_path} в INT8 по {len(frames)} кадрам...")
+        if backend == InferenceBackend.OPENVINO:
+            self._quantize_openvino(fp32_path, target, frames)
+        else:
+            self._quantize_onnx(fp32_path, target, frames)
+        return backend, fp32_path, target
+
+    def _quantize_openvino(self, fp32_dir, target_dir, frames):
+        import nncf
+        import openvino as ov
+
+        xml_path = glob.glob(os.path.join(fp32_dir, "*.xml"))[0]
+        model = ov.Core().read_model(xml_path)
+        dataset = nncf.Dataset(frames, self.to_tensor)
+        # Декодирование рамок (DFL, сигмоиды) оставляем в FP32 - это
+        # дешевые операции, а их квантование заметно сдвигает рамки
+        quantized = nncf.quantize(
+            model, dataset,
+            preset=nncf.QuantizationPreset.MIXED,
+            subset_size=len(frames),
+            ignored_scope=nncf.IgnoredScope(types=["Sigmoid"], patterns=[".*dfl.*"], validate=False)
+        )
+
+        os.makedirs(target_dir, exist_ok=True)
+        ov.save_model(quantized, os.path.join(target_dir, os.path.basename(xml_path)), compress_to_fp16=False)
+        # metadata.yaml с именами классов и imgsz нужен ultralytics для загрузки
+        for name in os.listdir(fp32_dir):
+            if name.endswith(".yaml"):
+                shutil.copy(os.path.join(fp32_dir, name), target_dir)
+
+    def _quantize_onnx(self, fp32_path, target_path, frames):
+        import onnx
+        import onnxruntime as ort
+        from onnxruntime.quantization import (
+            CalibrationDataReader, QuantFormat, QuantType, quantize_static
+        )
+
+        input_name = ort.InferenceSession(
+            fp32_path, providers=["CPUExecutionProvider"]
+        ).get_inputs()[0].name
+
+        to_tensor = self.to_tensor
+
+        class FrameReader(CalibrationDataReader):
+            def __init__(self):
+                self._frames = iter(frames)
+
+            def get_next(self):
+                image = next(self._frames, None)
+                return None if image is None else {input_name: to_tensor(image)}
+
+        quantize_static(
+            fp32_path, target_path, FrameReader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8
+        )
+
+        # Метаданные ultralytics (имена классов, imgsz, задача) переносим из FP32
+        source = onnx.load(fp32_path)
+        quantized = onnx.load(target_path)
+        del quantized.metadata_props[:]
+        quantized.metadata_props.extend(source.metadata_props)
+        onnx.save(quantized, target_path)
@@ -0,0 +1,170 @@
+import cv2
+import numpy as np
+
+
+class StereoRectifier:
+    """
+    Ректификация кадров стереопары по заранее построенным картам.
+
+    Карты преобразования (формат CV_16SC2) строятся один раз для каждой
+    камеры и разрешения кадра, далее на каждом кадре выполняется только
+    cv2.remap вместо полного cv2.undistort. Если в данных калибровки есть
+    готовые карты mapx/mapy (memory-map из CalibrationStore) для нужного
+    разрешения, они только переводятся в CV_16SC2 без пересчета дисторсии.
+    """
+    def __init__(self, calibration_data=None, camera1_url=None, camera2_url=None):
+        self.params = {
+            1: self._extract_camera_params(calibration_data, "camera1", camera1_url),
+            2: self._extract_camera_params(calibration_data, "camera2", camera2_url)
+        }
+        self._maps = {}  # {(camera, width, height): (map1, map2)}
+        self._rectifications = {}  # {(camera, width, height): (R, P)}
+
+    @staticmethod
+    def _extract_camera_params(calibration_data, camera_key, camera_url):
+        """Извлекает матрицу камеры, дисторсию и матрицы ректификации."""
+        if not calibration_data:
+            return None
+
+        try:
+            # Формат CameraCalibrationThread: camera1 / camera2
+            if camera_key in calibration_data:
+                camera = calibration_data[camera_key]
+                maps = None
+                if "mapx" in camera and "mapy" in camera:
+                    maps = (
+                        np.asarray(camera["mapx"], dtype=np.float32),
+                        np.asarray(camera["mapy"], dtype=np.float32)
+                    )
+                return {
+                    "matrix": np.array(camera["matrix"], dtype=np.float64),
+                    "distortion": np.array(camera["distortion"], dtype=np.float64),
+                    "R": np.array(camera["R"], dtype=np.float64) if "R" in camera else None,
+                    "P": np.array(camera["P"], dtype=np.float64) if "P" in camera else None,
+                    "maps": maps
+                }
+
+            # Старый формат с ключами по URL камеры
+            if camera_url and camera_url in calibration_data:
+                camera = calibration_data[camera_url]
+                return {
+                    "matrix": np.array(camera["camera_matrix"], dtype=np.float64),
+                    "distortion": np.array(camera["dist_coeffs"], dtype=np.float64),
+                    "R": None,
+                    "P": None,
+                    "maps": None
+                }
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Ошибка доступа к данным калибровки: {e}")
+
+        return None
+
+    def is_calibrated(self, camera):
+        """Возвращает True, если для камеры есть данные калибровки."""
+        return self.params.get(camera) is not None
+
+    def get_rectification(self, camera, size):
+        """
+        Возвращает (R, P) камеры для кадра размера (width, height).
+        Если данных стереоректификации нет, R - единичная матрица,
+        а P - оптимальная матрица камеры для устранения дисторсии.
+        """
+        key = (camera, size[0], size[1])
+        rectification = self._rectifications.get(key)
+        if rectification is None:
+            params = self.params[camera]
+            rotation = params["R"]
+            projection = params["P"]
+
+            if rotation is None or projection is None:
+                # Нет данных стереоректификации - только устранение дисторсии
+                rotation = np.eye(3)
+                projection, _ = cv2.getOptimalNewCameraMatrix(
+                    params["matrix"], params["distortion"], size, 0, size
+                )
+
+            rectification = (rotation, projection)
+            self._rectifications[key] = rectification
+        return rectification
+
+    def _build_maps(self, camera, size):
+        """Строит карты ректификации для камеры и разрешения кадра."""
+        params = self.params[camera]
+        stored = params.get("maps")
+        if (stored is not None and params["R"] is not None and params["P"] is not None
+                and stored[0].shape == (size[1], size[0])):
+            # Карты калибровки построены с теми же R и P для этого разрешения
+            return cv2.convertMaps(stored[0], stored[1], cv2.CV_16SC2)
+
+        rotation, projection = self.get_rectification(camera, size)
+        return cv2.initUndistortRectifyMap(
+            params["matrix"], params["distortion"], rotation, projection,
+            size, cv2.CV_16SC2
+        )
+
+    def get_maps(self, camera, size):
+        """Возвращает (map1, map2) для камеры и размера (width, height)."""
+        key = (camera, size[0], size[1])
+        maps = self._maps.get(key)
+        if maps is None:
+            maps = self._build_maps(camera, size)
+            self._maps[key] = maps
+        return maps
+
+    def rectify(self, frame, camera):
+        """
+        Ректифицирует кадр указанной камеры (1 или 2).
+        Если данных калибровки нет, кадр возвращается без изменений.
+        """
+        if frame is None or not self.is_calibrated(camera):
+            return frame
+
+        h, w = frame.shape[:2]
+        map1, map2 = self.get_maps(camera, (w, h))
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
+
+    def rectify_points(self, points, camera, size):
+        """
+        Переводит точки (N, 2) исходного кадра в координаты
+        ректифицированного кадра без ректификации самого кадра.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0 or not self.is_calibrated(camera):
+            return points
+
+        params = self.params[camera]
+        rotation, projection = self.get_rectification(camera, size)
+        rectified = cv2.undistortPoints(
+            points.reshape(-1, 1, 2), params["matrix"], params["distortion"],
+            R=rotation, P=projection
+        )
+        return rectified.reshape(-1, 2)
+
+    def rectify_boxes(self, boxes, camera, size):
+        """
+        Переводит рамки (N, 4) xyxy исходного кадра в ректифицированный кадр:
+        корректируются все четыре угла, результат - описывающий их прямоугольник.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if len(boxes) == 0 or not self.is_calibrated(camera):
+            return boxes.astype(np.float32)
+
+        corners = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 2)
+        corners = self.rectify_points(corners, camera, size).reshape(-1, 4, 2)
+        return np.hstack([corners.min(axis=1), corners.max(axis=1)]).astype(np.float32)
+
+    def focal_length(self, camera=1, size=None):
+        """
+        Фокусное расстояние (в пикселях) ректифицированного кадра.
+        Возвращает None, если камера не откалибрована.
+        """
+        if not self.is_calibrated(camera):
+            return None
+
+        if size is not None:
+            return float(self.get_rectification(camera, size)[1][0, 0])
+
+        projection = self.params[camera]["P"]
+        if projection is None:
+            projection = self.params[camera]["matrix"]
+        return float(projection[0, 0])
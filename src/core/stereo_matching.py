@@ -0,0 +1,226 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class StereoMatcher:
+    """
+    Сопоставление объектов левой и правой камер стереопары.
+
+    Для всех пар объектов сразу строится матрица стоимости из трех частей:
+    - эпиполярное ограничение: на ректифицированных кадрах (есть P обеих
+      камер) это разница строк центров, иначе - расстояние до эпиполярной
+      линии по фундаментальной матрице F;
+    - совпадение класса (пары разных классов запрещены);
+    - сходство размеров рамок (на ректифицированных кадрах высота объекта
+      в обеих камерах почти одинакова).
+    Пары, нарушающие ограничения, получают стоимость INVALID_COST.
+    Итоговое соответствие - глобально оптимальное назначение
+    (венгерский алгоритм, scipy.optimize.linear_sum_assignment).
+    """
+    INVALID_COST = 1e6
+
+    def __init__(self, calibration_data=None, max_row_distance=15.0, size_weight=0.5, min_disparity=1.0):
+        self.max_row_distance = max_row_distance  # допуск по строке / эпиполярной линии, пикс
+        self.size_weight = size_weight  # вес различия размеров рамок
+        self.min_disparity = min_disparity  # минимальный модуль диспаритета, пикс
+
+        self.fundamental = None
+        self.rectified = False
+        self.disparity_sign = 0  # ожидаемый знак x1 - x2 (0 - не проверяется)
+        self._extract_geometry(calibration_data)
+
+    def _extract_geometry(self, calibration_data):
+        """Извлекает P1/P2 и F из данных калибровки."""
+        if not calibration_data:
+            return
+
+        try:
+            camera1 = calibration_data.get("camera1") or {}
+            camera2 = calibration_data.get("camera2") or {}
+            if "P" in camera1 and "P" in camera2:
+                self.rectified = True
+                # P2[0, 3] = Tx * f: при Tx < 0 правая камера видит объект левее
+                tx = float(np.asarray(camera2["P"], dtype=np.float64)[0, 3])
+                self.disparity_sign = -int(np.sign(tx))
+
+            stereo = calibration_data.get("stereo") or {}
+            if "F" in stereo:
+                self.fundamental = np.asarray(stereo["F"], dtype=np.float64)
+        except (AttributeError, TypeError, ValueError, IndexError) as e:
+            print(f"Ошибка чтения стереогеометрии для сопоставления: {e}")
+
+    @staticmethod
+    def _centers_and_sizes(boxes):
+        centers = (boxes[..., :2] + boxes[..., 2:]) / 2
+        sizes = np.maximum(boxes[..., 2:] - boxes[..., :2], 1.0)
+        return centers, sizes
+
+    def _epipolar_distance(self, centers1, centers2):
+        """
+        Отклонение от эпиполярного ограничения, пикс.
+        centers1 и centers2 должны транслироваться друг на друга
+        (например, (n, 1, 2) и (1, m, 2) или (k, 2) и (k, 2)).
+        """
+        if self.rectified or self.fundamental is None:
+            return np.abs(centers1[..., 1] - centers2[..., 1])
+
+        # Расстояние точки камеры 2 до эпиполярной линии l = F * p1
+        ones1 = np.ones(centers1.shape[:-1] + (1,))
+        ones2 = np.ones(centers2.shape[:-1] + (1,))
+        lines = np.concatenate([centers1, ones1], axis=-1) @ self.fundamental.T
+        points2 = np.concatenate([centers2, ones2], axis=-1)
+        norms = np.maximum(np.hypot(lines[..., 0], lines[..., 1]), 1e-12)
+        return np.abs(np.sum(lines * points2, axis=-1)) / norms
+
+    def _costs(self, boxes1, class_ids1, boxes2, class_ids2):
+        """Стоимость и эпиполярная невязка для транслируемых массивов рамок."""
+        centers1, sizes1 = self._centers_and_sizes(boxes1)
+        centers2, sizes2 = self._centers_and_sizes(boxes2)
+
+        residual = self._epipolar_distance(centers1, centers2)
+        log_ratio = np.abs(np.log(sizes1 / sizes2))
+        size_cost = log_ratio[..., 1] + 0.5 * log_ratio[..., 0]
+
+        cost = residual / self.max_row_distance + self.size_weight * size_cost
+
+        disparity = centers1[..., 0] - centers2[..., 0]
+        invalid = residual > self.max_row_distance
+        invalid |= class_ids1 != class_ids2
+        invalid |= np.abs(disparity) < self.min_disparity
+        if self.disparity_sign:
+            invalid |= np.sign(disparity) != self.disparity_sign
+
+        cost[invalid] = self.INVALID_COST
+        return cost, residual
+
+    def cost_matrix(self, boxes1, class_ids1, boxes2, class_ids2):
+        """
+        Матрица стоимости сопоставления (n, m).
+        Запрещенные пары имеют стоимость INVALID_COST.
+        """
+        boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+        cost, _ = self._costs(
+            boxes1[:, None, :], np.asarray(class_ids1)[:, None],
+            boxes2[None, :, :], np.asarray(class_ids2)[None, :]
+        )
+        return cost
+
+    def pair_costs(self, boxes1, class_ids1, boxes2, class_ids2):
+        """
+        Стоимость и эпиполярная невязка для заданных пар:
+        объект i камеры 1 сопоставлен объекту i камеры 2.
+        """
+        boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+        return self._costs(boxes1, np.asarray(class_ids1), boxes2, np.asarray(class_ids2))
+
+    def match(self, boxes1, class_ids1, boxes2, class_ids2):
+        """
+        Сопоставляет объекты двух камер.
+
+        Returns:
+            (indices1, indices2, costs) - массивы индексов сопоставленных
+            объектов в камере 1 и камере 2 и стоимость каждой пары
+        """
+        empty = np.empty(0, dtype=int)
+        if len(boxes1) == 0 or len(boxes2) == 0:
+            return empty, empty, np.empty(0)
+
+        cost = self.cost_matrix(boxes1, class_ids1, boxes2, class_ids2)
+        indices1, indices2 = linear_sum_assignment(cost)
+
+        valid = cost[indices1, indices2] < self.INVALID_COST
+        indices1, indices2 = indices1[valid], indices2[valid]
+        return indices1, indices2, cost[indices1, indices2]
+
+
+class StereoTrackMatcher:
+    """
+    Таблица соответствий треков двух камер (tracker_id камеры 1 ↔ tracker_id
+    камеры 2) поверх StereoMatcher.
+
+    Установленные пары сохраняются между кадрами и только проверяются:
+    пара сохраняется, пока ограничения StereoMatcher выполняются, а
+    эпиполярная невязка не превышает max_residual. Если трек пропал только
+    в одной камере, пара остается в таблице до его возвращения.
+    Полное сопоставление выполняется только для новых и несопоставленных
+    треков, поэтому его стоимость зависит от смены треков, а не от числа
+    объектов в сцене.
+    """
+    def __init__(self, matcher, max_residual=8.0):
+        self.matcher = matcher
+        self.max_residual = max_residual  # допустимый дрейф невязки установленной пары, пикс
+        self.pairs = {}  # {tracker_id камеры 1: tracker_id камеры 2}
+
+        # Статистика последнего кадра
+        self.pairs_kept = 0
+        self.tracks_rematched = 0
+
+    def match(self, boxes1, class_ids1, tracker_ids1, boxes2, class_ids2, tracker_ids2):
+        """
+        Сопоставляет объекты двух камер с учетом установленных пар.
+
+        Returns:
+            (indices1, indices2, costs) - как у StereoMatcher.match
+        """
+        if tracker_ids1 is None or tracker_ids2 is None:
+            self.pairs = {}
+            indices1, indices2, costs = self.matcher.match(boxes1, class_ids1, boxes2, class_ids2)
+            self.pairs_kept = 0
+            self.tracks_rematched = len(boxes1)
+            return indices1, indices2, costs
+
+        boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+        class_ids1 = np.asarray(class_ids1)
+        class_ids2 = np.asarray(class_ids2)
+        tracker_ids1 = np.asarray(tracker_ids1)
+        tracker_ids2 = np.asarray(tracker_ids2)
+
+        # Установленные пары, оба трека которых есть в текущем кадре
+        index2 = {int(tracker_id): j for j, tracker_id in enumerate(tracker_ids2)}
+        kept1, kept2 = [], []
+        for i, tracker_id in enumerate(tracker_ids1):
+            j = index2.get(self.pairs.get(int(tracker_id)))
+            if j is not None:
+                kept1.append(i)
+                kept2.append(j)
+        kept1 = np.array(kept1, dtype=int)
+        kept2 = np.array(kept2, dtype=int)
+
+        # Проверяем их одним векторным проходом
+        kept_costs, residuals = self.matcher.pair_costs(
+            boxes1[kept1], class_ids1[kept1], boxes2[kept2], class_ids2[kept2]
+        )
+        valid = (kept_costs < self.matcher.INVALID_COST) & (residuals <= self.max_residual)
+        kept1, kept2, kept_costs = kept1[valid], kept2[valid], kept_costs[valid]
+
+        # Полное сопоставление только для оставшихся объектов
+        free1 = np.setdiff1d(np.arange(len(boxes1)), kept1)
+        free2 = np.setdiff1d(np.arange(len(boxes2)), kept2)
+        new1, new2, new_costs = self.matcher.match(
+            boxes1[free1], class_ids1[free1], boxes2[free2], class_ids2[free2]
+        )
+
+        indices1 = np.concatenate([kept1, free1[new1]])
+        indices2 = np.concatenate([kept2, free2[new2]])
+        costs = np.concatenate([kept_costs, new_costs])
+
+        pairs = {
+            int(tracker_ids1[i]): int(tracker_ids2[j]) for i, j in zip(indices1, indices2)
+        }
+
+        # Пара сохраняется, если ее трек пропал только в одной из камер
+        present1 = set(tracker_ids1.tolist())
+        present2 = set(tracker_ids2.tolist())
+        used2 = set(pairs.values())
+        for tracker_id1, tracker_id2 in self.pairs.items():
+            if tracker_id1 in pairs or tracker_id2 in used2:
+                continue
+            if (tracker_id1 in present1) != (tracker_id2 in present2):
+                pairs[tracker_id1] = tracker_id2
+        self.pairs = pairs
+        self.pairs_kept = len(kept1)
+        self.tracks_rematched = len(free1)
+        return indices1, indices2, costs
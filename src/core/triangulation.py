@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+
+
+class StereoTriangulator:
+    """
+    Триангуляция сопоставленных точек стереопары.
+
+    Если в калибровке есть матрицы проекции P1/P2 ректифицированных камер,
+    все точки кадра триангулируются одним вызовом cv2.triangulatePoints.
+    Калибровка выполняется в сантиметрах (размер клетки шахматной доски),
+    поэтому результат переводится в метры.
+
+    Без P1/P2 используется модель параллельных камер с базисом из настроек:
+    Z = baseline * f / disparity, X и Y - по матрице камеры.
+    """
+    DEFAULT_FOCAL_LENGTH = 800.0  # пикс, если камера не откалибрована
+    CM_TO_M = 0.01
+
+    def __init__(self, calibration_data=None, baseline=10.0):
+        self.baseline = baseline  # в сантиметрах
+        self.P1 = None
+        self.P2 = None
+        self._extract_projections(calibration_data)
+
+    def _extract_projections(self, calibration_data):
+        """Извлекает P1/P2 из данных калибровки."""
+        if not calibration_data:
+            return
+        try:
+            camera1 = calibration_data.get("camera1") or {}
+            camera2 = calibration_data.get("camera2") or {}
+            if "P" in camera1 and "P" in camera2:
+                self.P1 = np.asarray(camera1["P"], dtype=np.float64)
+                self.P2 = np.asarray(camera2["P"], dtype=np.float64)
+        except (AttributeError, TypeError, ValueError) as e:
+            print(f"Ошибка чтения матриц проекции: {e}")
+
+    @property
+    def has_projections(self):
+        """True, если триангуляция выполняется по P1/P2 калибровки."""
+        return self.P1 is not None and self.P2 is not None
+
+    def triangulate(self, points1, points2, camera_matrix=None, size=None):
+        """
+        Координаты XYZ (N, 3) в метрах в системе ректифицированной камеры 1.
+
+        Args:
+            points1, points2: центры объектов (N, 2) в ректифицированных кадрах
+            camera_matrix: матрица камеры 1 для режима без P1/P2
+            size: (width, height) кадра, если нет и матрицы камеры
+        """
+        points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 2)
+        points2 = np.asarray(points2, dtype=np.float64).reshape(-1, 2)
+        if len(points1) == 0:
+            return np.empty((0, 3))
+
+        if self.has_projections:
+            homogeneous = cv2.triangulatePoints(
+                self.P1, self.P2, np.ascontiguousarray(points1.T), np.ascontiguousarray(points2.T)
+            )
+            xyz = (homogeneous[:3] / homogeneous[3]).T
+            return xyz * self.CM_TO_M
+
+        if camera_matrix is not None:
+            focal_length = camera_matrix[0, 0]
+            principal_point = camera_matrix[:2, 2]
+        else:
+            focal_length = self.DEFAULT_FOCAL_LENGTH
+            principal_point = np.asarray(size, dtype=np.float64) / 2 if size else np.zeros(2)
+
+        disparity = np.maximum(np.abs(points1[:, 0] - points2[:, 0]), 1e-6)
+        z = self.baseline * self.CM_TO_M * focal_length / disparity
+        xy = (points1 - principal_point) * (z / focal_length)[:, None]
+        return np.column_stack([xy, z])
+
+    @staticmethod
+    def distances(xyz):
+        """Расстояние от камеры 1 до каждой точки, м."""
+        return np.linalg.norm(xyz, axis=1)
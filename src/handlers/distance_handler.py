@@ -23,6 +23,9 @@ class DistanceHandler(QObject):
     def set_active_camera(self, index):
         """Set the active camera for display."""
         self.active_camera_index = index
+        # В режиме коррекции по точкам поток ректифицирует только отображаемый кадр
+        if self.distance_thread:
+            self.distance_thread.display_camera = index + 1
         # Если есть сохраненные кадры, сразу обновляем отображение
         self.update_current_frame()
         
@@ -82,6 +85,17 @@ class DistanceHandler(QObject):
         self.distance_thread.iou = model_settings['iou']
         self.distance_thread.device = model_settings['device']
         self.distance_thread.half = model_settings['half']
+        self.distance_thread.workers = model_settings.get('workers', 0)
+        self.distance_thread.backend = model_settings.get('backend', 'auto')
+        self.distance_thread.precision = model_settings.get('precision', 'fp32')
+        self.distance_thread.adaptive_imgsz = model_settings.get('adaptive_imgsz', True)
+        self.distance_thread.imgsz_sizes = model_settings.get('imgsz_sizes', [320, 416, 512, 640])
+        self.distance_thread.target_fps = self.config.get_tracker_settings()['fps']
+        self.distance_thread.sync_tolerance = distance_settings.get('sync_tolerance')
+        self.distance_thread.point_undistortion = distance_settings.get('point_undistortion', False)
+        self.distance_thread.refine_disparity = distance_settings.get('refine_disparity', False)
+        self.distance_thread.dense_depth = distance_settings.get('dense_depth', False)
+        self.distance_thread.display_camera = self.active_camera_index + 1
         
         # Connect signals
         self.distance_thread.frame_signal.connect(self.process_frames)
@@ -101,6 +115,15 @@ class DistanceHandler(QObject):
         
         return True
         
+    def apply_settings(self, settings):
+        """Apply processing options that the running thread reads on every frame."""
+        if self.distance_thread is None:
+            return
+        if 'refine_disparity' in settings:
+            self.distance_thread.refine_disparity = settings['refine_disparity']
+        if 'dense_depth' in settings:
+            self.distance_thread.dense_depth = settings['dense_depth']
+        
     def stop_measurement(self):
         """Stop the distance measurement thread."""
         if self.distance_thread and self.distance_thread.isRunning():
@@ -123,12 +146,10 @@ class DistanceHandler(QObject):
         self.cam1_frame = original_frame.copy()
         self.cam2_frame = processed_frame.copy()
         
-        # Отправляем сигнал с кадрами для обработки в Widget
+        # Отправляем сигнал с кадрами в Widget: он показывает кадр выбранной
+        # камеры (с картой глубины), поэтому отдельно кадр здесь не выводится
         self.frame_signal.emit(original_frame, processed_frame, info)
         
-        # Обновляем текущий отображаемый кадр в зависимости от выбранной камеры
-        self.update_current_frame()
-        
         self.debug_counter += 1
         
         # Process detection info every 30 frames
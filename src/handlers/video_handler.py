@@ -1,7 +1,7 @@
 import cv2
 from PySide6.QtCore import Signal, QObject
 from PySide6.QtGui import QPixmap
-from src.utils.camera_utils import convert_cv_qt, VideoThread
+from src.utils.camera_utils import convert_cv_qt, VideoThread, MultiStreamThread
 
 class VideoHandler(QObject):
     change_pixmap_signal = Signal(QPixmap)
@@ -20,6 +20,8 @@ class VideoHandler(QObject):
             
         # Загружаем настройки из секции model вместо detection
         model_settings = self.config.get_model_settings()
+        tracker_settings = self.config.get_tracker_settings()
+        motion_settings = self.config.get_motion_gate_settings()
         
         # Создаем новый поток для обработки видео
         self.thread = VideoThread(
@@ -28,25 +30,65 @@ class VideoHandler(QObject):
             iou=model_settings['iou'],
             device=model_settings['device'],
             half=model_settings['half'],
-            fps=30
+            fps=tracker_settings['fps'],
+            workers=model_settings.get('workers', 0),
+            backend=model_settings.get('backend', 'auto'),
+            precision=model_settings.get('precision', 'fp32'),
+            detect_interval=tracker_settings['detect_interval'],
+            adaptive_cadence=tracker_settings['adaptive_cadence'],
+            motion_gate=motion_settings['enabled'],
+            motion_min_pixels=motion_settings['min_pixels'],
+            safety_interval=motion_settings['safety_interval'],
+            adaptive_imgsz=model_settings.get('adaptive_imgsz', True),
+            imgsz_sizes=model_settings.get('imgsz_sizes', [320, 416, 512, 640])
         )
         
         # Подключаем сигналы
         self.thread.change_pixmap_signal.connect(self.update_video_frame)
         self.thread.detection_signal.connect(self.log_detection)
         
-        # Загружаем модель, если путь задан
+        # Задаем модель, если путь задан: экспорт и загрузка выполняются
+        # в потоке обработки, ошибки приходят через detection_signal
         model_path = self.config.get_model_path()
         if model_path:
-            if not self.thread.set_model(model_path):
-                self.log_detection(f"Ошибка загрузки модели из {model_path}", "red")
-                return False
+            self.thread.set_model(model_path)
         
         # Запускаем поток
         self.thread.start()
         self.log_detection(f"Выбрана камера: {camera_url}", "blue")
         return True
 
+    def select_all_cameras(self, camera_urls, camera_names=None):
+        """Starts detection on all cameras at once with a shared batched model."""
+        if self.thread and self.thread.isRunning():
+            self.thread.stop()
+            
+        model_settings = self.config.get_model_settings()
+        
+        # One capture thread per camera, one inference worker for all of them
+        self.thread = MultiStreamThread(
+            camera_urls,
+            camera_names,
+            conf=model_settings['conf'],
+            iou=model_settings['iou'],
+            device=model_settings['device'],
+            half=model_settings['half'],
+            workers=model_settings.get('workers', 0),
+            backend=model_settings.get('backend', 'auto'),
+            precision=model_settings.get('precision', 'fp32')
+        )
+        
+        self.thread.change_pixmap_signal.connect(self.update_video_frame)
+        self.thread.detection_signal.connect(self.log_detection)
+        
+        model_path = self.config.get_model_path()
+        if model_path:
+            self.thread.set_model(model_path)  # prepared on the worker thread
+        
+        self.thread.start()
+        self.log_detection(f"Запущено камер: {len(camera_urls)}", "blue")
+        return True
+
     def stop_video_stream(self):
         """Stop the current video stream if running."""
         if self.thread and self.thread.isRunning():
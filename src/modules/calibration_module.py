@@ -13,6 +13,7 @@ from PySide6.QtCore import QThread, Signal, Qt
 from PySide6.QtGui import QImage, QPixmap
 from src.utils.camera_utils import convert_cv_qt
 from src.core.config import Config
+from src.core.calibration_store import CalibrationStore
 
 
 class CameraCalibrationThread(QThread):
@@ -179,16 +180,16 @@ class CameraCalibrationThread(QThread):
                 "distortion": dist1.tolist(),
                 "R": R1.tolist(),
                 "P": P1.tolist(),
-                "mapx": map1x.tolist(),
-                "mapy": map1y.tolist()
+                "mapx": map1x,
+                "mapy": map1y
             },
             "camera2": {
                 "matrix": mtx2.tolist(),
                 "distortion": dist2.tolist(),
                 "R": R2.tolist(),
                 "P": P2.tolist(),
-                "mapx": map2x.tolist(),
-                "mapy": map2y.tolist()
+                "mapx": map2x,
+                "mapy": map2y
             },
             "stereo": {
                 "R": R.tolist(),
@@ -202,6 +203,7 @@ class CameraCalibrationThread(QThread):
                 "camera2_url": self.camera2_url,
                 "chessboard_size": self.chessboard_size,
                 "square_size": self.square_size,
+                "image_size": list(gray1.shape[::-1]),
                 "date": time.strftime("%Y-%m-%d %H:%M:%S")
             }
         }
@@ -580,9 +582,8 @@ class CalibrationDialog(QDialog):
             return
         
         try:
-            # Сохранение в файл
-            with open("calibration_data.json", "w") as f:
-                json.dump(self.calibration_data, f, indent=2)
+            # Сохранение параметров в JSON и карт в бинарный файл
+            CalibrationStore.save(self.calibration_data)
             
             # Обновление статуса калибровки в Config
             camera1_url = self.camera1_combo.currentData()
@@ -10,9 +10,20 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, Signal, QThread, QMutex, QTimer
 from PySide6.QtGui import QImage, QPixmap, QFont
-from ultralytics import YOLO
 import math
+import dataclasses
 import supervision as sv
+from src.core.rectification import StereoRectifier
+from src.core.calibration_store import CalibrationStore
+from src.core.inference_backend import InferenceBackend
+from src.core.adaptive_resolution import ResolutionController
+from src.core.stereo_matching import StereoMatcher, StereoTrackMatcher
+from src.core.triangulation import StereoTriangulator
+from src.core.kalman_bank import KalmanFilterBank
+from src.core.disparity_refinement import DisparityRefiner
+from src.core.dense_depth import DenseDepthWorker
+from src.utils.stereo_sync import StereoPairAssembler
+from src.utils.pipeline import Pipeline, StageQueue
 
 class DistanceCalculationThread(QThread):
     frame_signal = Signal(object, object, dict)  # Кадр, обработанный кадр с расстояниями, метаданные
@@ -35,306 +46,402 @@ class DistanceCalculationThread(QThread):
         self.iou = 0.45   # Значение по умолчанию
         self.device = 'cpu'  # По умолчанию CPU
         self.half = False  # По умолчанию без half-precision
+        self.workers = 0  # процессов инференса, 0 - в текущем процессе
+        self.backend = 'auto'  # среда выполнения: auto, torch, onnx, openvino
+        self.precision = 'fp32'  # точность весов: fp32 или int8 (квантованная модель)
+        
+        # Размер входа модели подбирается под целевой FPS (tracker.fps)
+        self.target_fps = 30
+        self.adaptive_imgsz = True
+        self.imgsz_sizes = ResolutionController.DEFAULT_SIZES
+        self.resolution = None
+        
+        # Допуск сборки стереопар, с (None - половина периода кадра источников)
+        self.sync_tolerance = None
+        
+        # Коррекция по точкам: инференс на исходных кадрах, ректифицируются
+        # только рамки объектов и отображаемый кадр
+        self.point_undistortion = False
+        self.display_camera = 1  # камера, кадр которой сейчас отображается
+        
+        # Субпиксельное уточнение диспаритета корреляцией в областях объектов
+        self.refine_disparity = False
+        
+        # Плотная карта глубины низкого разрешения (считается в фоне)
+        self.dense_depth = False
+        
+        # Очереди перед стадиями конвейера: {стадия: (размер, политика переполнения)}.
+        # Перед измерением кадры не выбрасываются, чтобы трекеры получали каждый
+        # распознанный кадр; перед инференсом и отрисовкой остаются только свежие
+        self.queue_policies = {
+            'infer': (1, StageQueue.DROP_OLDEST),
+            'measure': (1, StageQueue.BLOCK),
+            'render': (2, StageQueue.DROP_OLDEST)
+        }
         
     def run(self):
         self.running = True
         
-        # Загружаем YOLO модель
+        # Пакетный инференс для обеих камер: модель из общего реестра (с экспортом
+        # под самую быструю среду выполнения на CPU) либо пул процессов.
+        # Размер входа переключается контроллером, бюджет - одна стереопара
+        sizes = self.imgsz_sizes if self.adaptive_imgsz else (max(self.imgsz_sizes),)
+        self.resolution = ResolutionController(self.target_fps, sizes)
         try:
-            model = YOLO(self.model_path)
+            self.predictor = InferenceBackend.create_adaptive_predictor(
+                self.model_path, self.resolution, conf=self.conf, iou=self.iou, device=self.device,
+                half=self.half, workers=self.workers, backend=self.backend, precision=self.precision,
+                batch=2
+            )
         except Exception as e:
             self.error_signal.emit(f"Ошибка загрузки модели: {e}")
             self.running = False
             return
         
-        # Открываем видеопотоки
-        cap1 = cv2.VideoCapture(self.camera1_url)
-        cap2 = cv2.VideoCapture(self.camera2_url)
+        # Открываем видеопотоки: каждый источник читается в своем потоке,
+        # пары собираются по меткам времени с учетом time_diff синхронизации
+        self.assembler = StereoPairAssembler.from_sync_data(
+            self.camera1_url, self.camera2_url, self.sync_data, tolerance=self.sync_tolerance
+        )
         
-        if not cap1.isOpened() or not cap2.isOpened():
+        if not self.assembler.start():
+            self._release_predictor()
             self.error_signal.emit("Не удалось открыть одну или обе камеры")
             self.running = False
             return
         
-        # Загружаем матрицы калибровки, если есть
-        camera_matrix1 = None
-        camera_matrix2 = None
-        dist_coeffs1 = None
-        dist_coeffs2 = None
-        
-        if self.calibration_data:
-            # Проверяем формат данных калибровки
-            if 'camera1' in self.calibration_data and 'camera2' in self.calibration_data:
-                # Используем данные калибровки из структуры с camera1 и camera2
-                try:
-                    camera_matrix1 = np.array(self.calibration_data['camera1']['matrix'])
-                    dist_coeffs1 = np.array(self.calibration_data['camera1']['distortion'])
-                    
-                    camera_matrix2 = np.array(self.calibration_data['camera2']['matrix'])
-                    dist_coeffs2 = np.array(self.calibration_data['camera2']['distortion'])
-                except (KeyError, TypeError) as e:
-                    print(f"Ошибка доступа к данным калибровки: {e}")
-            # Проверяем старый формат по URL
-            elif self.camera1_url in self.calibration_data and self.camera2_url in self.calibration_data:
-                camera_matrix1 = np.array(self.calibration_data[self.camera1_url]['camera_matrix'])
-                dist_coeffs1 = np.array(self.calibration_data[self.camera1_url]['dist_coeffs'])
-                
-                camera_matrix2 = np.array(self.calibration_data[self.camera2_url]['camera_matrix'])
-                dist_coeffs2 = np.array(self.calibration_data[self.camera2_url]['dist_coeffs'])
-            # Если ничего подходящего не найдено, выводим информацию
-            else:
-                print("Данные калибровки имеются, но не соответствуют ожидаемому формату")
-        
-        drift_rate = 0
-        if self.sync_data:
-            drift_rate = self.sync_data.get('drift_rate', 0)
-        
-        # Инициализация аннотаторов supervision
-        tracker1 = sv.ByteTrack()
-        tracker2 = sv.ByteTrack()
-        box_annotator1 = sv.BoundingBoxAnnotator()
-        box_annotator2 = sv.BoundingBoxAnnotator()
-        label_annotator1 = sv.LabelAnnotator()
-        label_annotator2 = sv.LabelAnnotator()
-        trace_annotator1 = sv.TraceAnnotator()
-        trace_annotator2 = sv.TraceAnnotator()
-        
-        frame_count = 0
-        start_time = time.time()
-        
-        # Основной цикл обработки
-        while self.running:
-            # Захват кадров
-            ret1, frame1 = cap1.read()
-            if not ret1:
-                continue
-                
-            # Компенсация расхождения камер
-            frames_to_skip = int(drift_rate * (time.time() - start_time))
-            if frames_to_skip > 0:
-                for _ in range(frames_to_skip):
-                    cap2.read()  # Пропускаем кадры для синхронизации
-            
-            ret2, frame2 = cap2.read()
-            if not ret2:
-                continue
+        # Подготавливаем ректификацию: карты строятся один раз на разрешение
+        self.rectifier = StereoRectifier(self.calibration_data, self.camera1_url, self.camera2_url)
+        if self.calibration_data and not (self.rectifier.is_calibrated(1) and self.rectifier.is_calibrated(2)):
+            print("Данные калибровки имеются, но не соответствуют ожидаемому формату")
+        
+        # Сопоставление объектов по стереогеометрии калибровки
+        self.matcher = StereoTrackMatcher(StereoMatcher(self.calibration_data))
+        self.triangulator = StereoTriangulator(self.calibration_data, self.baseline)
+        self.kalman = KalmanFilterBank()
+        self.refiner = DisparityRefiner()
+        self.depth_worker = None  # создается при первом включении карты глубины
+        
+        # Трекеры и аннотаторы supervision
+        self.trackers = (sv.ByteTrack(), sv.ByteTrack())
+        self.box_annotators = (sv.BoundingBoxAnnotator(), sv.BoundingBoxAnnotator())
+        self.label_annotators = (sv.LabelAnnotator(), sv.LabelAnnotator())
+        self.trace_annotators = (sv.TraceAnnotator(), sv.TraceAnnotator())
+        
+        self.frame_count = 0
+        self.start_time = time.time()
+        
+        # Конвейер: захват -> инференс -> измерение -> отрисовка, каждая стадия
+        # в своем потоке, между стадиями ограниченные очереди
+        self.pipeline = Pipeline(error_handler=self._on_stage_error)
+        for name, function in (
+            ('capture', self._capture_stage),
+            ('infer', self._infer_stage),
+            ('measure', self._measure_stage),
+            ('render', self._render_stage)
+        ):
+            queue_size, policy = self.queue_policies.get(name, (1, StageQueue.DROP_OLDEST))
+            self.pipeline.add_stage(name, function, queue_size, policy)
+        self.pipeline.start()
+        
+        while self.running and not self.pipeline.finished:
+            self.msleep(50)
             
-            # Коррекция искажений, если есть данные калибровки
-            if camera_matrix1 is not None and dist_coeffs1 is not None:
-                try:
-                    h, w = frame1.shape[:2]
-                    newcameramtx1, roi1 = cv2.getOptimalNewCameraMatrix(camera_matrix1, dist_coeffs1, (w,h), 0, (w,h))
-                    frame1 = cv2.undistort(frame1, camera_matrix1, dist_coeffs1, None, newcameramtx1)
-                except Exception as e:
-                    print(f"Ошибка коррекции искажений камеры 1: {e}")
+        # Освобождаем ресурсы
+        self.pipeline.stop()
+        self.assembler.stop()
+        self._release_predictor()
+        if self.depth_worker is not None:
+            self.depth_worker.shutdown()
+    
+    def _release_predictor(self):
+        """Освобождает модель в реестре или останавливает процессы инференса."""
+        InferenceBackend.release_predictor(self.predictor)
+        self.predictor = None
+    
+    def _on_stage_error(self, stage, error):
+        print(f"Ошибка стадии {stage.name}: {error}")
+    
+    def _capture_stage(self):
+        """Захват синхронной пары и ректификация кадров."""
+        pair = self.assembler.read(timeout=0.1)
+        if pair is None:
+            return Pipeline.END if self.assembler.finished else None
+        frame1 = pair.frame1
+        frame2 = pair.frame2
+        
+        point_mode = (
+            self.point_undistortion
+            and self.rectifier.is_calibrated(1) and self.rectifier.is_calibrated(2)
+        )
+        
+        if not point_mode:
+            # Ректификация кадров по предвычисленным картам
+            try:
+                frame1 = self.rectifier.rectify(frame1, 1)
+            except Exception as e:
+                print(f"Ошибка коррекции искажений камеры 1: {e}")
                 
-            if camera_matrix2 is not None and dist_coeffs2 is not None:
-                try:
-                    h, w = frame2.shape[:2]
-                    newcameramtx2, roi2 = cv2.getOptimalNewCameraMatrix(camera_matrix2, dist_coeffs2, (w,h), 0, (w,h))
-                    frame2 = cv2.undistort(frame2, camera_matrix2, dist_coeffs2, None, newcameramtx2)
-                except Exception as e:
-                    print(f"Ошибка коррекции искажений камеры 2: {e}")
-            
-            # Создаем копии для отображения
+            try:
+                frame2 = self.rectifier.rectify(frame2, 2)
+            except Exception as e:
+                print(f"Ошибка коррекции искажений камеры 2: {e}")
+        
+        return {'pair': pair, 'frame1': frame1, 'frame2': frame2, 'point_mode': point_mode}
+    
+    def _infer_stage(self, item):
+        """Распознавание объектов на обоих кадрах одним пакетом."""
+        item['detections'], item['results'] = self.predictor.predict_detections(
+            [item['frame1'], item['frame2']]
+        )
+        return item
+    
+    def _measure_stage(self, item):
+        """Трекинг, сопоставление объектов, триангуляция и фильтрация."""
+        frame1 = item['frame1']
+        frame2 = item['frame2']
+        point_mode = item['point_mode']
+        rectifier = self.rectifier
+        matcher = self.matcher
+        kalman = self.kalman
+        
+        sv_detections1, sv_detections2 = item['detections']
+        result1, result2 = item['results']
+        
+        # Обрабатываем результаты
+        detections = {}
+        
+        # Обновляем трекеры
+        sv_detections1 = self.trackers[0].update_with_detections(sv_detections1)
+        sv_detections2 = self.trackers[1].update_with_detections(sv_detections2)
+        
+        # Координаты рамок и центров в ректифицированных кадрах
+        size1 = (frame1.shape[1], frame1.shape[0])
+        size2 = (frame2.shape[1], frame2.shape[0])
+        boxes1 = sv_detections1.xyxy
+        boxes2 = sv_detections2.xyxy
+        centers1 = (boxes1[:, :2] + boxes1[:, 2:]) / 2
+        centers2 = (boxes2[:, :2] + boxes2[:, 2:]) / 2
+        if point_mode:
+            # Кадры не ректифицированы - корректируем только точки
+            try:
+                centers1 = rectifier.rectify_points(centers1, 1, size1)
+                centers2 = rectifier.rectify_points(centers2, 2, size2)
+                boxes1 = rectifier.rectify_boxes(boxes1, 1, size1)
+                boxes2 = rectifier.rectify_boxes(boxes2, 2, size2)
+            except Exception as e:
+                print(f"Ошибка коррекции координат объектов: {e}")
+        
+        # Создаем структуры данных для сопоставления объектов
+        objects_cam1 = []
+        objects_cam2 = []
+        
+        # Наполняем список объектов с камеры 1
+        for i, (class_id, tracker_id, box) in enumerate(zip(sv_detections1.class_id, sv_detections1.tracker_id, boxes1)):
+            conf = sv_detections1.confidence[i] if sv_detections1.confidence is not None else 1.0
+            center_x, center_y = centers1[i]
+            objects_cam1.append({
+                'camera': 1,
+                'class_id': class_id,
+                'tracker_id': tracker_id,
+                'class_name': result1.names[class_id],
+                'confidence': conf,
+                'box': box,
+                'center_x': center_x,
+                'center_y': center_y
+            })
+            
+        # Наполняем список объектов с камеры 2
+        for i, (class_id, tracker_id, box) in enumerate(zip(sv_detections2.class_id, sv_detections2.tracker_id, boxes2)):
+            conf = sv_detections2.confidence[i] if sv_detections2.confidence is not None else 1.0
+            center_x, center_y = centers2[i]
+            objects_cam2.append({
+                'camera': 2,
+                'class_id': class_id,
+                'tracker_id': tracker_id,
+                'class_name': result2.names[class_id],
+                'confidence': conf,
+                'box': box,
+                'center_x': center_x,
+                'center_y': center_y
+            })
+        
+        # Метки для аннотаций: ID и класс, расстояние добавляется ниже
+        labels1 = [f"#{obj['tracker_id']} {obj['class_name']}" for obj in objects_cam1]
+        labels2 = [f"#{obj['tracker_id']} {obj['class_name']}" for obj in objects_cam2]
+        
+        # Сопоставление объектов: установленные пары треков только проверяются,
+        # глобально оптимальное назначение - для новых и несопоставленных
+        indices1, indices2, _ = matcher.match(
+            boxes1, sv_detections1.class_id, sv_detections1.tracker_id,
+            boxes2, sv_detections2.class_id, sv_detections2.tracker_id
+        )
+        
+        # Триангуляция всех сопоставленных центров одним вызовом
+        camera_matrix = None
+        if rectifier.is_calibrated(1):
+            camera_matrix = rectifier.get_rectification(1, size1)[1]
+        matched_centers2 = centers2[indices2]
+        if self.refine_disparity and not point_mode:
+            # Уточнение требует ректифицированных кадров
+            try:
+                matched_centers2 = self.refiner.refine(
+                    frame1, frame2, boxes1[indices1], centers1[indices1], matched_centers2
+                )
+            except Exception as e:
+                print(f"Ошибка уточнения диспаритета: {e}")
+        positions = self.triangulator.triangulate(
+            centers1[indices1], matched_centers2, camera_matrix, size1
+        )
+        raw_distances = self.triangulator.distances(positions)
+        
+        # Сглаживание фильтрами Калмана: один векторный шаг на кадр,
+        # трек стереопары адресуется tracker_id камеры 1
+        pair_ids = sv_detections1.tracker_id[indices1]
+        kalman.predict(item['pair'].timestamp)
+        kalman.update(pair_ids, positions)
+        
+        # Объекты, видимые только одной камерой: расстояние по прогнозу фильтра
+        unmatched1 = np.setdiff1d(np.arange(len(objects_cam1)), indices1)
+        unmatched2 = np.setdiff1d(np.arange(len(objects_cam2)), indices2)
+        reverse_pairs = {id2: id1 for id1, id2 in matcher.pairs.items()}
+        predicted_ids2 = np.array(
+            [reverse_pairs.get(int(t), -1) for t in sv_detections2.tracker_id[unmatched2]],
+            dtype=np.int64
+        )
+        track_ids = np.concatenate([pair_ids, sv_detections1.tracker_id[unmatched1], predicted_ids2])
+        estimates, velocities, found = kalman.estimate(track_ids)
+        distances = np.linalg.norm(estimates, axis=1)
+        times_to_approach = KalmanFilterBank.time_to_approach(estimates, velocities)
+        
+        for k, (i, j) in enumerate(zip(indices1, indices2)):
+            obj1 = objects_cam1[i]
+            obj2 = objects_cam2[j]
+            distance = distances[k]
+            
+            # Обновляем метки объектов обеих камер
+            labels1[i] = f"#{obj1['tracker_id']} {obj1['class_name']} {distance:.2f}m"
+            labels2[j] = f"#{obj2['tracker_id']} {obj2['class_name']} {distance:.2f}m"
+            
+            # Добавляем в общий список детекций для интерфейса
+            detections[f"{obj1['class_name']}_{obj1['tracker_id']}"] = {
+                'class': obj1['class_name'],
+                'distance': float(distance),  # в метрах, после фильтра
+                'distance_raw': float(raw_distances[k]),  # в метрах, по триангуляции
+                'position_3d': tuple(estimates[k].tolist()),  # XYZ в метрах относительно камеры 1
+                'velocity': tuple(velocities[k].tolist()),  # м/с
+                'time_to_approach': float(times_to_approach[k]),  # с
+                'predicted': False,
+                'position_cam1': (obj1['center_x'], obj1['center_y']),
+                'position_cam2': (obj2['center_x'], obj2['center_y']),
+                'bbox_cam1': obj1['box'],
+                'bbox_cam2': obj2['box'],
+                'confidence': obj1['confidence'] * obj2['confidence']  # комбинированная уверенность
+            }
+        
+        single_camera = (
+            [(objects_cam1[i], labels1, i) for i in unmatched1]
+            + [(objects_cam2[j], labels2, j) for j in unmatched2]
+        )
+        for k, (obj, labels, index) in enumerate(single_camera, start=len(indices1)):
+            if not found[k]:
+                continue
+            distance = distances[k]
+            labels[index] = f"#{obj['tracker_id']} {obj['class_name']} ~{distance:.2f}m"
+            detections[f"{obj['class_name']}_{track_ids[k]}"] = {
+                'class': obj['class_name'],
+                'distance': float(distance),  # в метрах, прогноз фильтра
+                'position_3d': tuple(estimates[k].tolist()),
+                'velocity': tuple(velocities[k].tolist()),
+                'time_to_approach': float(times_to_approach[k]),
+                'predicted': True,
+                f"position_cam{obj['camera']}": (obj['center_x'], obj['center_y']),
+                f"bbox_cam{obj['camera']}": obj['box'],
+                'confidence': obj['confidence']
+            }
+        
+        item['tracked'] = (sv_detections1, sv_detections2)
+        item['boxes'] = (boxes1, boxes2)
+        item['labels'] = (labels1, labels2)
+        item['objects'] = detections
+        item['stereo_stats'] = (matcher.pairs_kept, matcher.tracks_rematched, self.refiner.refined_count)
+        return item
+    
+    def _render_stage(self, item):
+        """Подготовка кадров для отображения, аннотация и отправка в интерфейс."""
+        frame1 = item['frame1']
+        frame2 = item['frame2']
+        point_mode = item['point_mode']
+        rectifier = self.rectifier
+        sv_detections1, sv_detections2 = item['tracked']
+        boxes1, boxes2 = item['boxes']
+        labels1, labels2 = item['labels']
+        
+        # Плотная карта глубины: пара уходит в фоновый пул, здесь не ждем
+        depth_map = None
+        if self.dense_depth:
+            if self.depth_worker is None:
+                self.depth_worker = DenseDepthWorker(camera1_left=self.matcher.matcher.disparity_sign >= 0)
+            self.depth_worker.submit(frame1, frame2, rectifier.rectify if point_mode else None)
+            depth_map = self.depth_worker.latest()
+        
+        # Кадры для отображения
+        if point_mode:
+            # Ректифицируется только отображаемый кадр, рамки на нем -
+            # скорректированные; второй кадр остается исходным
+            if self.display_camera == 1:
+                display_frame1 = rectifier.rectify(frame1, 1)
+                display_frame2 = frame2.copy()
+                sv_detections1 = dataclasses.replace(sv_detections1, xyxy=boxes1)
+            else:
+                display_frame1 = frame1.copy()
+                display_frame2 = rectifier.rectify(frame2, 2)
+                sv_detections2 = dataclasses.replace(sv_detections2, xyxy=boxes2)
+        else:
             display_frame1 = frame1.copy()
             display_frame2 = frame2.copy()
-            
-            # Добавляем маркеры на кадры, чтобы их можно было отличить
-            cv2.putText(display_frame1, "CAM 1", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-            cv2.putText(display_frame2, "CAM 2", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-            
-            # Обрабатываем результаты
-            detections = {}
-            
-            # Список всех обнаруженных объектов для поиска соответствий
-            all_detected_objects = []
-            
-            # Распознавание объектов на обоих кадрах
-            results1 = model(
-                display_frame1,
-                conf=self.conf,
-                iou=self.iou,
-                device=self.device,
-                half=self.half
-            )
-            
-            results2 = model(
-                display_frame2,
-                conf=self.conf,
-                iou=self.iou,
-                device=self.device,
-                half=self.half
-            )
-            
-            # Конвертируем результаты для камеры 1
-            sv_detections1 = sv.Detections.from_ultralytics(results1[0])
-            # Обновляем трекер
-            sv_detections1 = tracker1.update_with_detections(sv_detections1)
-            
-            # Конвертируем результаты для камеры 2
-            sv_detections2 = sv.Detections.from_ultralytics(results2[0])
-            # Обновляем трекер
-            sv_detections2 = tracker2.update_with_detections(sv_detections2)
-            
-            # Создаем структуры данных для сопоставления объектов
-            objects_cam1 = []
-            objects_cam2 = []
-            
-            # Наполняем список объектов с камеры 1
-            for i, (class_id, tracker_id, box) in enumerate(zip(sv_detections1.class_id, sv_detections1.tracker_id, sv_detections1.xyxy)):
-                conf = sv_detections1.confidence[i] if sv_detections1.confidence is not None else 1.0
-                cls_name = results1[0].names[class_id]
-                x1, y1, x2, y2 = box
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                
-                obj = {
-                    'camera': 1,
-                    'class_id': class_id,
-                    'tracker_id': tracker_id,
-                    'class_name': cls_name,
-                    'confidence': conf,
-                    'box': box,
-                    'center_x': center_x,
-                    'center_y': center_y
-                }
-                
-                objects_cam1.append(obj)
-                all_detected_objects.append(obj)
-                
-            # Наполняем список объектов с камеры 2
-            for i, (class_id, tracker_id, box) in enumerate(zip(sv_detections2.class_id, sv_detections2.tracker_id, sv_detections2.xyxy)):
-                conf = sv_detections2.confidence[i] if sv_detections2.confidence is not None else 1.0
-                cls_name = results2[0].names[class_id]
-                x1, y1, x2, y2 = box
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                
-                obj = {
-                    'camera': 2,
-                    'class_id': class_id,
-                    'tracker_id': tracker_id,
-                    'class_name': cls_name,
-                    'confidence': conf,
-                    'box': box,
-                    'center_x': center_x,
-                    'center_y': center_y
-                }
-                
-                objects_cam2.append(obj)
-                all_detected_objects.append(obj)
-            
-            # Находим соответствия между объектами и вычисляем расстояния
-            matched_pairs = []
-            
-            # Подготовка labels для аннотаций
-            labels1 = []
-            labels2 = []
-            
-            # Сначала добавляем стандартные метки с ID и классом
-            for obj in objects_cam1:
-                labels1.append(f"#{obj['tracker_id']} {obj['class_name']}")
-            
-            for obj in objects_cam2:
-                labels2.append(f"#{obj['tracker_id']} {obj['class_name']}")
-            
-            # Находим соответствия и рассчитываем расстояния
-            for obj1 in objects_cam1:
-                best_match = None
-                min_distance = float('inf')
-                
-                for obj2 in objects_cam2:
-                    # Проверяем, что это тот же класс объекта
-                    if obj1['class_id'] == obj2['class_id']:
-                        # Диспаритет - это разница в x-координатах центра объекта
-                        disparity = abs(obj1['center_x'] - obj2['center_x'])
-                        
-                        # Вычисляем расстояние по формуле: distance = (baseline * focal_length) / disparity
-                        if disparity > 0:
-                            # Используем фокусное расстояние из калибровки или приблизительное значение
-                            focal_length = 800  # примерное значение
-                            if camera_matrix1 is not None:
-                                focal_length = camera_matrix1[0, 0]
-                                
-                            # Расстояние в сантиметрах
-                            distance = (self.baseline * focal_length) / disparity
-                            
-                            # Находим лучшее соответствие по минимальному расстоянию
-                            if distance < min_distance:
-                                min_distance = distance
-                                best_match = obj2
-                                best_match['distance'] = distance
-                
-                # Если найдено соответствие, сохраняем пару и обновляем метки
-                if best_match:
-                    matched_pairs.append((obj1, best_match))
-                    distance = best_match['distance'] / 100  # Преобразуем в метры
-                    
-                    # Обновляем метку для объекта из камеры 1
-                    idx = objects_cam1.index(obj1)
-                    labels1[idx] = f"#{obj1['tracker_id']} {obj1['class_name']} {distance:.2f}m"
-                    
-                    # Обновляем метку для объекта из камеры 2
-                    idx = objects_cam2.index(best_match)
-                    labels2[idx] = f"#{best_match['tracker_id']} {best_match['class_name']} {distance:.2f}m"
-                    
-                    # Добавляем в общий список детекций для интерфейса
-                    detections[f"{obj1['class_name']}_{obj1['tracker_id']}"] = {
-                        'class': obj1['class_name'],
-                        'distance': distance,  # в метрах
-                        'position_cam1': (obj1['center_x'], obj1['center_y']),
-                        'position_cam2': (best_match['center_x'], best_match['center_y']),
-                        'bbox_cam1': obj1['box'],
-                        'bbox_cam2': best_match['box'],
-                        'confidence': obj1['confidence'] * best_match['confidence']  # комбинированная уверенность
-                    }
-            
-            # Аннотируем кадры с помощью supervision
-            annotated_frame1 = box_annotator1.annotate(
-                display_frame1.copy(),
-                detections=sv_detections1
-            )
-            annotated_frame1 = label_annotator1.annotate(
-                annotated_frame1,
-                detections=sv_detections1,
-                labels=labels1
-            )
-            annotated_frame1 = trace_annotator1.annotate(
-                annotated_frame1,
-                detections=sv_detections1
-            )
-            
-            annotated_frame2 = box_annotator2.annotate(
-                display_frame2.copy(),
-                detections=sv_detections2
-            )
-            annotated_frame2 = label_annotator2.annotate(
-                annotated_frame2,
-                detections=sv_detections2,
-                labels=labels2
-            )
-            annotated_frame2 = trace_annotator2.annotate(
-                annotated_frame2,
-                detections=sv_detections2
+        
+        # Добавляем маркеры на кадры, чтобы их можно было отличить
+        cv2.putText(display_frame1, "CAM 1", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
+        cv2.putText(display_frame2, "CAM 2", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
+        
+        # Аннотируем кадры с помощью supervision
+        annotated = []
+        for index, (display_frame, sv_detections, labels) in enumerate((
+            (display_frame1, sv_detections1, labels1),
+            (display_frame2, sv_detections2, labels2)
+        )):
+            annotated_frame = self.box_annotators[index].annotate(display_frame, detections=sv_detections)
+            annotated_frame = self.label_annotators[index].annotate(
+                annotated_frame, detections=sv_detections, labels=labels
             )
-            
-            # Добавляем информацию о кадре
-            frame_info = {
-                'frame_count': frame_count,
-                'timestamp': time.time() - start_time,
-                'num_detections': len(detections),
-                'detections': detections
-            }
-            
-            # Отправляем данные в основной поток - оба обработанных кадра
-            self.frame_signal.emit(annotated_frame1, annotated_frame2, frame_info)
-            
-            frame_count += 1
-            
-        # Освобождаем ресурсы
-        cap1.release()
-        cap2.release()
+            annotated_frame = self.trace_annotators[index].annotate(annotated_frame, detections=sv_detections)
+            annotated.append(annotated_frame)
+        
+        pairs_kept, tracks_rematched, disparity_refined = item['stereo_stats']
+        detections = item['objects']
+        
+        # Добавляем информацию о кадре
+        frame_info = {
+            'frame_count': self.frame_count,
+            'timestamp': time.time() - self.start_time,
+            'dropped_frames': self.assembler.frames_dropped,
+            'pair_skew': item['pair'].skew,
+            'stereo_pairs_kept': pairs_kept,
+            'stereo_tracks_rematched': tracks_rematched,
+            'disparity_refined': disparity_refined,
+            'depth_map': depth_map,
+            'pipeline': self.pipeline.stats(),
+            'resolution': self.resolution.stats(),
+            'num_detections': len(detections),
+            'detections': detections
+        }
+        
+        # Отправляем данные в основной поток - оба обработанных кадра
+        self.frame_signal.emit(annotated[0], annotated[1], frame_info)
+        
+        self.frame_count += 1
+        return item
         
     def stop(self):
         self.running = False
@@ -429,6 +536,24 @@ class DistanceCalculatorDialog(QDialog):
         self.show_distances_check.setChecked(True)
         settings_layout.addWidget(self.show_distances_check, 1, 4, 1, 2)
         
+        # Коррекция искажений только для координат объектов
+        self.point_undistortion_check = QCheckBox("Коррекция по точкам (быстрее)")
+        self.point_undistortion_check.setToolTip(
+            "Распознавание на исходных кадрах, коррекция искажений только для рамок объектов "
+            "и отображаемого кадра"
+        )
+        settings_layout.addWidget(self.point_undistortion_check, 2, 4, 1, 2)
+        
+        # Субпиксельное уточнение диспаритета
+        self.refine_disparity_check = QCheckBox("Уточнять диспаритет")
+        self.refine_disparity_check.setToolTip(
+            "Субпиксельный поиск объекта камеры 1 на кадре камеры 2 корреляцией "
+            "в области рамки (не используется при коррекции по точкам)"
+        )
+        settings_layout.addWidget(self.refine_disparity_check, 2, 6, 1, 2)
+        
+        self.display_combo.currentIndexChanged.connect(self.on_display_camera_changed)
+        
         # Кнопки управления
         self.start_btn = QPushButton("Запустить измерение")
         self.start_btn.clicked.connect(self.start_distance_calculation)
@@ -573,8 +698,7 @@ class DistanceCalculatorDialog(QDialog):
         calibration_file = "calibration_data.json"
         if os.path.exists(calibration_file):
             try:
-                with open(calibration_file, "r") as f:
-                    self.calibration_data = json.load(f)
+                self.calibration_data = CalibrationStore.load(calibration_file)
                 if self.calibration_data:
                     self.is_calibrated = True
                     print(f"Загружены данные калибровки из {calibration_file}")
@@ -590,8 +714,7 @@ class DistanceCalculatorDialog(QDialog):
             for path in alt_paths:
                 if os.path.exists(path):
                     try:
-                        with open(path, "r") as f:
-                            self.calibration_data = json.load(f)
+                        self.calibration_data = CalibrationStore.load(path)
                         if self.calibration_data:
                             self.is_calibrated = True
                             print(f"Загружены данные калибровки из {path}")
@@ -669,6 +792,20 @@ class DistanceCalculatorDialog(QDialog):
             cam1_url, cam2_url, model_path, baseline, 
             self.calibration_data, self.sync_data
         )
+        self.calculation_thread.point_undistortion = self.point_undistortion_check.isChecked()
+        self.calculation_thread.display_camera = self.display_combo.currentIndex() + 1
+        self.calculation_thread.refine_disparity = self.refine_disparity_check.isChecked()
+        if self.parent() and hasattr(self.parent(), 'config'):
+            model_settings = self.parent().config.get_model_settings()
+            self.calculation_thread.workers = model_settings.get('workers', 0)
+            self.calculation_thread.backend = model_settings.get('backend', 'auto')
+            self.calculation_thread.precision = model_settings.get('precision', 'fp32')
+            tracker_settings = self.parent().config.get_tracker_settings()
+            self.calculation_thread.target_fps = tracker_settings['fps']
+            self.calculation_thread.adaptive_imgsz = model_settings.get('adaptive_imgsz', True)
+            self.calculation_thread.imgsz_sizes = model_settings.get('imgsz_sizes', ResolutionController.DEFAULT_SIZES)
+            distance_settings = self.parent().config.get_distance_measure_settings()
+            self.calculation_thread.sync_tolerance = distance_settings.get('sync_tolerance')
         self.calculation_thread.frame_signal.connect(self.update_display)
         self.calculation_thread.error_signal.connect(self.on_error)
         
@@ -692,7 +829,7 @@ class DistanceCalculatorDialog(QDialog):
         if self.is_calibrated:
             self.stats_text.append("✅ Камеры откалиброваны")
         if self.is_synced:
-            self.stats_text.append(f"✅ Камеры синхронизированы (drift_rate: {self.sync_data.get('drift_rate', 0):.2f})")
+            self.stats_text.append(f"✅ Камеры синхронизированы (time_diff: {self.sync_data.get('time_diff', 0):.3f} с)")
     
     def stop_distance_calculation(self):
         if self.calculation_thread and self.calculation_thread.isRunning():
@@ -708,10 +845,15 @@ class DistanceCalculatorDialog(QDialog):
         # Очищаем дисплей
         self.video_label.setText("Нажмите 'Запустить измерение' для начала работы")
     
+    def on_display_camera_changed(self, index):
+        """Сообщает потоку расчета, кадр какой камеры отображается."""
+        if self.calculation_thread:
+            self.calculation_thread.display_camera = index + 1
+    
     def update_display(self, original_frame, processed_frame, info):
         # Определяем, какую камеру показывать
         display_index = self.display_combo.currentIndex()
-        frame_to_display = processed_frame if display_index == 0 else original_frame
+        frame_to_display = original_frame if display_index == 0 else processed_frame
         
         # Конвертируем кадр для отображения
         rgb_image = cv2.cvtColor(frame_to_display, cv2.COLOR_BGR2RGB)
@@ -729,6 +871,7 @@ class DistanceCalculatorDialog(QDialog):
                 cls_name = obj_data['class']
                 distance = obj_data['distance']
                 confidence = obj_data['confidence']
+                time_to_approach = obj_data.get('time_to_approach', float('inf'))
                 
                 # Разный цвет для разных расстояний
                 if distance < 2:  # ближе 2 метров
@@ -738,9 +881,15 @@ class DistanceCalculatorDialog(QDialog):
                 else:
                     color = "green"
                     
+                details = f"уверенность: {confidence:.2f}"
+                if math.isfinite(time_to_approach):
+                    details += f", сближение через {time_to_approach:.1f} с"
+                if obj_data.get('predicted'):
+                    details += ", прогноз"
+                    
                 self.objects_text.append(
                     f"<span style='color:{color};'><b>{cls_name}</b>: "
-                    f"{distance:.2f} м (уверенность: {confidence:.2f})</span>"
+                    f"{distance:.2f} м ({details})</span>"
                 )
         else:
             self.objects_text.append("Объекты не обнаружены")
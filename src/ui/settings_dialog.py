@@ -4,9 +4,11 @@ from PySide6.QtWidgets import (
     QPushButton, QGroupBox, QFormLayout
 )
 from PySide6.QtCore import Qt
+from src.core.inference_backend import InferenceBackend
+from src.core.adaptive_resolution import ResolutionController
 
 class SettingsDialog(QDialog):
-    def __init__(self, parent=None, model_path=None):
+    def __init__(self, parent=None, model_path=None, imgsz_sizes=None):
         super().__init__(parent)
         self.setWindowTitle("Настройки")
         self.setMinimumWidth(500)
@@ -191,6 +193,38 @@ class SettingsDialog(QDialog):
         self.half_check = QCheckBox("Половинная точность (FP16)")
         yolo_layout.addRow("", self.half_check)
         
+        # Inference worker processes
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, 8)
+        self.workers_spin.setValue(0)
+        self.workers_spin.setSpecialValueText("Нет (в основном процессе)")
+        self.workers_spin.setToolTip(
+            "Одна камера использует не более одного процесса, стереопара - до двух, "
+            "несколько камер - до размера пакета"
+        )
+        yolo_layout.addRow("Процессы инференса:", self.workers_spin)
+        
+        # Inference runtime (auto picks the fastest one on CPU)
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(['auto', 'torch', 'onnx', 'openvino'])
+        yolo_layout.addRow("Среда выполнения:", self.backend_combo)
+        
+        # Weights precision: INT8 is available once quantize_model.py has been run
+        # for one of the configured input sizes
+        self.precision_combo = QComboBox()
+        self.precision_combo.addItem("FP32", InferenceBackend.FP32)
+        self.precision_combo.addItem("INT8 (квантованная, CPU)", InferenceBackend.INT8)
+        if not any(InferenceBackend.quantized_artifacts(model_path, size)
+                   for size in imgsz_sizes or ResolutionController.DEFAULT_SIZES):
+            self.precision_combo.model().item(1).setEnabled(False)
+            self.precision_combo.setToolTip("Квантованная модель не найдена, запустите quantize_model.py")
+        yolo_layout.addRow("Точность весов:", self.precision_combo)
+        
+        # Adaptive input size: holds the target FPS from the tracker settings
+        self.adaptive_imgsz_check = QCheckBox("Адаптивный размер входа (под целевой FPS)")
+        self.adaptive_imgsz_check.setChecked(True)
+        yolo_layout.addRow("", self.adaptive_imgsz_check)
+        
         yolo_group.setLayout(yolo_layout)
         layout.addWidget(yolo_group)
         
@@ -205,9 +239,73 @@ class SettingsDialog(QDialog):
         self.fps_spin.setValue(30)
         tracker_layout.addRow("Частота кадров (FPS):", self.fps_spin)
         
+        # Detection cadence: tracks are propagated by optical flow in between
+        self.detect_interval_spin = QSpinBox()
+        self.detect_interval_spin.setRange(1, 30)
+        self.detect_interval_spin.setValue(3)
+        self.detect_interval_spin.setToolTip("1 - детекция на каждом кадре")
+        tracker_layout.addRow("Интервал детекции (кадров):", self.detect_interval_spin)
+        
+        self.adaptive_cadence_check = QCheckBox("Адаптивный интервал детекции")
+        self.adaptive_cadence_check.setChecked(True)
+        tracker_layout.addRow("", self.adaptive_cadence_check)
+        
         tracker_group.setLayout(tracker_layout)
         layout.addWidget(tracker_group)
         
+        # Motion gate: skip inference on static empty frames
+        motion_group = QGroupBox("Фильтр по движению")
+        motion_layout = QFormLayout()
+        motion_layout.setSpacing(10)
+        
+        self.motion_gate_check = QCheckBox("Пропускать кадры без движения")
+        self.motion_gate_check.setChecked(True)
+        motion_layout.addRow("", self.motion_gate_check)
+        
+        self.motion_pixels_spin = QSpinBox()
+        self.motion_pixels_spin.setRange(1, 1000)
+        self.motion_pixels_spin.setValue(4)
+        self.motion_pixels_spin.setToolTip("Меньше - чувствительнее")
+        motion_layout.addRow("Порог движения (пикс.):", self.motion_pixels_spin)
+        
+        self.safety_interval_spin = QDoubleSpinBox()
+        self.safety_interval_spin.setRange(0.1, 60.0)
+        self.safety_interval_spin.setSingleStep(0.5)
+        self.safety_interval_spin.setValue(2.0)
+        motion_layout.addRow("Контрольная детекция (с):", self.safety_interval_spin)
+        
+        motion_group.setLayout(motion_layout)
+        layout.addWidget(motion_group)
+        
+        # Stereo distance measurement options (applied on the next start)
+        distance_group = QGroupBox("Измерение расстояния")
+        distance_layout = QFormLayout()
+        distance_layout.setSpacing(10)
+        
+        self.point_undistortion_check = QCheckBox("Коррекция по точкам (быстрее)")
+        self.point_undistortion_check.setToolTip(
+            "Модель работает на исходных кадрах, исправляются только рамки объектов "
+            "и отображаемый кадр"
+        )
+        distance_layout.addRow("", self.point_undistortion_check)
+        
+        self.refine_disparity_check = QCheckBox("Уточнять диспаритет")
+        self.refine_disparity_check.setToolTip(
+            "Субпиксельное уточнение диспаритета корреляцией в областях объектов "
+            "(точнее для далеких объектов, дороже по времени)"
+        )
+        distance_layout.addRow("", self.refine_disparity_check)
+        
+        self.dense_depth_check = QCheckBox("Карта глубины")
+        self.dense_depth_check.setToolTip(
+            "Плотная карта глубины низкого разрешения поверх кадра камеры 1 "
+            "(считается в фоне)"
+        )
+        distance_layout.addRow("", self.dense_depth_check)
+        
+        distance_group.setLayout(distance_layout)
+        layout.addWidget(distance_group)
+        
         # Кнопки
         buttons_layout = QHBoxLayout()
         buttons_layout.setSpacing(10)
@@ -229,7 +327,19 @@ class SettingsDialog(QDialog):
             'iou': self.iou_spin.value(),
             'device': self.device_combo.currentText(),
             'half': self.half_check.isChecked(),
-            'fps': self.fps_spin.value()
+            'workers': self.workers_spin.value(),
+            'backend': self.backend_combo.currentText(),
+            'precision': self.precision_combo.currentData(),
+            'adaptive_imgsz': self.adaptive_imgsz_check.isChecked(),
+            'fps': self.fps_spin.value(),
+            'detect_interval': self.detect_interval_spin.value(),
+            'adaptive_cadence': self.adaptive_cadence_check.isChecked(),
+            'motion_gate': self.motion_gate_check.isChecked(),
+            'motion_min_pixels': self.motion_pixels_spin.value(),
+            'safety_interval': self.safety_interval_spin.value(),
+            'point_undistortion': self.point_undistortion_check.isChecked(),
+            'refine_disparity': self.refine_disparity_check.isChecked(),
+            'dense_depth': self.dense_depth_check.isChecked()
         }
     
     def set_settings(self, settings):
@@ -238,7 +348,20 @@ class SettingsDialog(QDialog):
         self.iou_spin.setValue(settings.get('iou', 0.45))
         self.device_combo.setCurrentText(settings.get('device', 'cpu'))
         self.half_check.setChecked(settings.get('half', False))
+        self.workers_spin.setValue(settings.get('workers', 0))
+        self.backend_combo.setCurrentText(settings.get('backend', 'auto'))
+        index = self.precision_combo.findData(settings.get('precision', InferenceBackend.FP32))
+        self.precision_combo.setCurrentIndex(max(0, index))
+        self.adaptive_imgsz_check.setChecked(settings.get('adaptive_imgsz', True))
         self.fps_spin.setValue(settings.get('fps', 30))
+        self.detect_interval_spin.setValue(settings.get('detect_interval', 3))
+        self.adaptive_cadence_check.setChecked(settings.get('adaptive_cadence', True))
+        self.motion_gate_check.setChecked(settings.get('motion_gate', True))
+        self.motion_pixels_spin.setValue(settings.get('motion_min_pixels', 4))
+        self.safety_interval_spin.setValue(settings.get('safety_interval', 2.0))
+        self.point_undistortion_check.setChecked(settings.get('point_undistortion', False))
+        self.refine_disparity_check.setChecked(settings.get('refine_disparity', False))
+        self.dense_depth_check.setChecked(settings.get('dense_depth', False))
     
     def update_model_path(self, path):
         """Обновляет отображаемый путь к модели."""
@@ -1,9 +1,17 @@
 import cv2
+import math
+import time
 import numpy as np
 from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QImage
-from ultralytics import YOLO
 import supervision as sv
+from src.utils.frame_grabber import LatestFrameGrabber
+from src.utils.multi_stream import MultiStreamBatcher
+from src.utils.pipeline import Pipeline, StageQueue
+from src.core.inference_backend import InferenceBackend
+from src.core.detection_scheduler import DetectionScheduler
+from src.core.motion_gate import MotionGate
+from src.core.adaptive_resolution import ResolutionController
 
 
 def convert_cv_qt(cv_img):
@@ -19,7 +27,15 @@ class VideoThread(QThread):
     change_pixmap_signal = Signal(np.ndarray)
     detection_signal = Signal(str, str)
 
-    def __init__(self, camera_url, conf=0.25, iou=0.45, device='cpu', half=False, fps=30):
+    RATE_REPORT_PERIOD = 2.0  # период сообщений о частоте инференса, с
+    # Стадия инференса отправляет по одному кадру и ждет результат,
+    # поэтому больше одного процесса инференса одна камера не загрузит
+    MAX_WORKERS = 1
+
+    def __init__(self, camera_url, conf=0.25, iou=0.45, device='cpu', half=False, fps=30, workers=0,
+                 backend='auto', precision='fp32', detect_interval=3, adaptive_cadence=True,
+                 motion_gate=True, motion_min_pixels=4, safety_interval=2.0,
+                 adaptive_imgsz=True, imgsz_sizes=ResolutionController.DEFAULT_SIZES):
         super().__init__()
         self.camera_url = camera_url
         self.running = True
@@ -30,25 +46,77 @@ class VideoThread(QThread):
         self.device = device
         self.half = half
         self.fps = fps
+        self.workers = min(workers, self.MAX_WORKERS)  # 0 - инференс в текущем процессе
+        self.backend = backend  # среда выполнения: auto, torch, onnx, openvino
+        self.precision = precision  # точность весов: fp32 или int8 (квантованная модель)
+        
+        # Детектор запускается раз в detect_interval кадров, между детекциями
+        # рамки треков переносятся оптическим потоком
+        self.detect_interval = detect_interval
+        self.adaptive_cadence = adaptive_cadence
+        self.scheduler = None
+        self.names = {}  # имена классов последней детекции
+        
+        # Фильтр по движению: пустые неподвижные кадры не передаются детектору
+        self.motion_gate = MotionGate(motion_gate, motion_min_pixels, safety_interval)
+        
+        # Размер входа модели подбирается под целевой FPS
+        self.adaptive_imgsz = adaptive_imgsz
+        self.imgsz_sizes = tuple(imgsz_sizes)
+        self.resolution = None
+        self._next_rate_report = 0.0
+        
+        # Поток захвата кадров
+        self.grabber = None
         
-        # Аннотаторы
-        self.model = None
+        # Конвейер обработки и очереди перед его стадиями:
+        # {стадия: (размер, политика переполнения)}
+        self.pipeline = None
+        self.queue_policies = {
+            'infer': (1, StageQueue.DROP_OLDEST),
+            'track': (1, StageQueue.BLOCK),
+            'render': (2, StageQueue.DROP_OLDEST)
+        }
+        self._next_capture = 0.0
+        
+        # Инференс и аннотаторы
+        self.model_path = None
+        self.predictor = None
+        self._reload_model = False  # подготовить предиктор заново в потоке инференса
         self.tracker = None
         self.box_annotator = None
         self.label_annotator = None
         self.trace_annotator = None
 
     def set_model(self, model_path):
-        """Загружает модель YOLO и инициализирует аннотаторы."""
+        """
+        Задает модель YOLO и инициализирует аннотаторы. Сама модель
+        готовится (экспорт, замер сред выполнения, загрузка) в потоке
+        обработки, чтобы не блокировать интерфейс.
+        """
+        self.model_path = model_path
+        self.tracker = sv.ByteTrack()
+        self.box_annotator = sv.BoundingBoxAnnotator()
+        self.label_annotator = sv.LabelAnnotator()
+        self.trace_annotator = sv.TraceAnnotator()
+        self._reload_model = self.isRunning()
+        return True
+
+    def _load_predictor(self):
+        """Готовит предиктор для текущих настроек. Ошибки отправляются сигналом."""
+        self._close_predictor()
         try:
-            self.model = YOLO(model_path)
-            self.tracker = sv.ByteTrack()
-            self.box_annotator = sv.BoundingBoxAnnotator()
-            self.label_annotator = sv.LabelAnnotator()
-            self.trace_annotator = sv.TraceAnnotator()
+            # Экспорт под выбранную среду выполнения кешируется рядом с весами,
+            # модель берется из общего реестра или загружается в процессах инференса
+            sizes = self.imgsz_sizes if self.adaptive_imgsz else (max(self.imgsz_sizes),)
+            self.resolution = ResolutionController(self.fps, sizes)
+            self.predictor = InferenceBackend.create_adaptive_predictor(
+                self.model_path, self.resolution, conf=self.conf, iou=self.iou, device=self.device,
+                half=self.half, workers=self.workers, backend=self.backend, precision=self.precision
+            )
             return True
         except Exception as e:
-            self.detection_signal.emit(f"Ошибка загрузки модели: {e}", "red")
+            self.detection_signal.emit(f"Ошибка загрузки модели {self.model_path}: {e}", "red")
             return False
 
     def update_settings(self, settings):
@@ -57,95 +125,392 @@ class VideoThread(QThread):
             self.conf = settings['conf']
         if 'iou' in settings:
             self.iou = settings['iou']
-        if 'device' in settings:
-            self.device = settings['device']
-        if 'half' in settings:
-            self.half = settings['half']
+        if settings.get('device', self.device) != self.device or settings.get('half', self.half) != self.half:
+            # Устройство и точность определяют подготовленную модель
+            self.device = settings.get('device', self.device)
+            self.half = settings.get('half', self.half)
+            self._reload_model = self.model_path is not None
         if 'fps' in settings:
             self.fps = settings['fps']
+            if self.resolution is not None:
+                self.resolution.target_fps = self.fps
+        if 'detect_interval' in settings:
+            self.detect_interval = settings['detect_interval']
+        if 'adaptive_cadence' in settings:
+            self.adaptive_cadence = settings['adaptive_cadence']
+        if self.scheduler is not None:
+            self.scheduler.configure(settings.get('detect_interval'), settings.get('adaptive_cadence'))
+        self.motion_gate.configure(
+            settings.get('motion_gate'), settings.get('motion_min_pixels'), settings.get('safety_interval')
+        )
+        if self.predictor is not None:
+            self.predictor.update_settings(settings)
+
+    def _close_predictor(self):
+        """Освобождает модель в реестре или останавливает процессы инференса."""
+        InferenceBackend.release_predictor(self.predictor)
+        self.predictor = None
 
     def run(self):
         """Запускает обработку видеопотока."""
-        cap = cv2.VideoCapture(self.camera_url)
-        frame_delay = 1.0 / self.fps
+        if self.model_path:
+            self.detection_signal.emit(f"Подготовка модели {self.model_path}...", "gray")
+            if not self._load_predictor():
+                return
+        grabber = LatestFrameGrabber(self.camera_url)
+        if not grabber.start():
+            self.detection_signal.emit(f"Не удалось открыть камеру {self.camera_url}", "red")
+            return
+        self.grabber = grabber
+        self.scheduler = DetectionScheduler(self.detect_interval, self.adaptive_cadence)
+        self._next_capture = time.monotonic()
+        self._next_rate_report = self._next_capture + self.RATE_REPORT_PERIOD
 
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
+        # Конвейер: захват -> инференс -> трекинг -> отрисовка, каждая стадия
+        # в своем потоке, между стадиями ограниченные очереди
+        self.pipeline = Pipeline(error_handler=self._on_stage_error)
+        for name, function in (
+            ('capture', self._capture_stage),
+            ('infer', self._infer_stage),
+            ('track', self._track_stage),
+            ('render', self._render_stage)
+        ):
+            queue_size, policy = self.queue_policies.get(name, (1, StageQueue.DROP_OLDEST))
+            self.pipeline.add_stage(name, function, queue_size, policy)
+        self.pipeline.start()
+
+        while self.running and not self.pipeline.finished:
+            self.msleep(50)
+
+        self.pipeline.stop()
+        grabber.stop()
+
+    def _on_stage_error(self, stage, error):
+        self.detection_signal.emit(f"Ошибка обработки кадра ({stage.name}): {error}", "red")
+
+    def _capture_stage(self):
+        """Захват самого свежего кадра не чаще заданного FPS."""
+        delay = self._next_capture - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_capture = max(self._next_capture, time.monotonic() - 1.0 / self.fps) + 1.0 / self.fps
+
+        grabbed = self.grabber.read(timeout=0.1)
+        if grabbed is None:
+            if self.grabber.finished:
                 self.detection_signal.emit(f"Ошибка чтения кадра с камеры {self.camera_url}", "red")
-                break
+                return Pipeline.END
+            return None
+        return {
+            'frame': grabbed.frame,
+            'timestamp': grabbed.timestamp,
+            'motion': self.motion_gate.has_motion(grabbed.frame)
+        }
 
-            try:
-                if self.model and self.tracker:
-                    # Получаем результаты детекции
-                    results = self.model.predict(
-                        frame,
-                        conf=self.conf,
-                        iou=self.iou,
-                        device=self.device,
-                        half=self.half
-                    )[0]
-
-                    # Конвертируем результаты в формат для трекера
-                    detections = sv.Detections.from_ultralytics(results)
-                    
-                    # Обновляем трекер
-                    detections = self.tracker.update_with_detections(detections)
-
-                    # Создаем подписи с ID и названием класса
-                    labels = [
-                        f"#{tracker_id} {results.names[class_id]}"
-                        for class_id, tracker_id 
-                        in zip(detections.class_id, detections.tracker_id)
-                    ]
-
-                    # Аннотируем кадр
-                    annotated_frame = self.box_annotator.annotate(
-                        frame.copy(), 
-                        detections=detections
-                    )
-                    annotated_frame = self.label_annotator.annotate(
-                        annotated_frame, 
-                        detections=detections, 
-                        labels=labels
-                    )
-                    annotated_frame = self.trace_annotator.annotate(
-                        annotated_frame, 
-                        detections=detections
-                    )
-
-                    # Отправляем сообщения о каждом обнаруженном объекте
-                    for idx in range(len(detections)):
-                        class_id = int(detections.class_id[idx])
-                        tracker_id = detections.tracker_id[idx]
-                        class_name = results.names[class_id]
-                        
-                        # Отправляем сообщение о каждом обнаруженном объекте
-                        self.detection_signal.emit(
-                            f"Обнаружен {class_name} (ID: {tracker_id})",
-                            "blue"
-                        )
+    def _infer_stage(self, item):
+        """Детекция объектов на кадре (если планировщик решил ее запускать)."""
+        if self._reload_model:
+            self._reload_model = False
+            self._load_predictor()
+        predictor = self.predictor
+        if predictor is None:
+            return None
+        allowed, safety = self.motion_gate.allow(item['motion'], self.scheduler.active_tracks)
+        if not allowed or safety:
+            # Как только фильтр пропустит кадр, детекция запустится сразу,
+            # без ожидания интервала планировщика
+            self.scheduler.request_detection()
+        item['detected'] = allowed and self.scheduler.should_detect()
+        if item['detected']:
+            detections, results = predictor.predict_detections([item['frame']])
+            self.names = results[0].names
+            item['detections'] = detections[0]
+        item['names'] = self.names
+        return item
+
+    def _track_stage(self, item):
+        """Обновление трекера или перенос рамок треков оптическим потоком."""
+        tracker = self.tracker
+        if tracker is None:
+            return None
+        if item['detected']:
+            item['detections'] = tracker.update_with_detections(item['detections'])
+            self.scheduler.on_detection(item['frame'], item['detections'])
+        else:
+            item['detections'] = self.scheduler.propagate(item['frame'])
+        return item
+
+    def _render_stage(self, item):
+        """Аннотация кадра, сообщения о детекциях и отправка кадра в интерфейс."""
+        detections = item['detections']
+        names = item['names']
 
-                    # Общее сообщение о количестве объектов
-                    self.detection_signal.emit(
-                        f"Обнаружено объектов: {len(detections)}",
-                        "blue"
-                    )
+        # Создаем подписи с ID и названием класса
+        labels = [
+            f"#{tracker_id} {names[class_id]}"
+            for class_id, tracker_id
+            in zip(detections.class_id, detections.tracker_id)
+        ]
 
-                    # Отправляем кадр для отображения
-                    self.change_pixmap_signal.emit(annotated_frame)
+        # Аннотируем кадр
+        annotated_frame = self.box_annotator.annotate(
+            item['frame'].copy(),
+            detections=detections
+        )
+        annotated_frame = self.label_annotator.annotate(
+            annotated_frame,
+            detections=detections,
+            labels=labels
+        )
+        annotated_frame = self.trace_annotator.annotate(
+            annotated_frame,
+            detections=detections
+        )
 
+        # Отправляем сообщения о каждом обнаруженном объекте
+        for class_id, tracker_id in zip(detections.class_id, detections.tracker_id):
+            self.detection_signal.emit(
+                f"Обнаружен {names[int(class_id)]} (ID: {tracker_id})",
+                "blue"
+            )
+
+        # Общее сообщение о количестве объектов
+        self.detection_signal.emit(
+            f"Обнаружено объектов: {len(detections)}",
+            "blue"
+        )
+        
+        # Периодически сообщаем фактическую частоту инференса и отображения
+        now = time.monotonic()
+        if now >= self._next_rate_report:
+            self._next_rate_report = now + self.RATE_REPORT_PERIOD
+            detect_rate, display_rate = self.scheduler.rates()
+            gate = self.motion_gate.stats()
+            self.detection_signal.emit(
+                f"Инференс: {detect_rate:.1f} кадр/с, отображение: {display_rate:.1f} кадр/с "
+                f"(интервал детекции: {self.scheduler.interval}, imgsz: {self.resolution.imgsz}, "
+                f"пропущено без движения: {gate['skipped']} из {gate['checked']})",
+                "gray"
+            )
+
+        # Отправляем кадр для отображения
+        self.change_pixmap_signal.emit(annotated_frame)
+        return item
+
+    def pipeline_stats(self):
+        """Глубина очередей и время обслуживания стадий конвейера."""
+        return self.pipeline.stats() if self.pipeline else {}
+
+    def inference_rates(self):
+        """Частота запусков детектора и частота отображения, кадр/с."""
+        return self.scheduler.rates() if self.scheduler else (0.0, 0.0)
+
+    def resolution_stats(self):
+        """Текущий imgsz, сглаженная задержка инференса и бюджет кадра."""
+        return self.resolution.stats() if self.resolution else {}
+
+    def motion_gate_stats(self):
+        """Счетчики кадров, пропущенных фильтром движения."""
+        return self.motion_gate.stats()
+
+    @property
+    def dropped_frames(self):
+        """Количество кадров, пропущенных циклом обработки."""
+        return self.grabber.frames_dropped if self.grabber else 0
+
+    def stop(self):
+        """Останавливает поток."""
+        self.running = False
+        self.wait()
+        self._close_predictor()
+
+
+class MultiStreamThread(QThread):
+    """
+    Поток детекции для нескольких камер одновременно.
+
+    Каждая камера читается своим потоком захвата, а инференс выполняется
+    одной моделью пакетами из кадров разных камер (MultiStreamBatcher).
+    Трекеры ByteTrack у каждой камеры свои. Результат отправляется
+    одним кадром - сеткой из всех камер.
+    """
+    change_pixmap_signal = Signal(np.ndarray)
+    detection_signal = Signal(str, str)
+
+    CELL_SIZE = (640, 360)  # размер ячейки сетки (ширина, высота)
+
+    def __init__(self, camera_urls, camera_names=None, conf=0.25, iou=0.45, device='cpu', half=False,
+                 max_batch=8, max_wait=0.02, workers=0, backend='auto', precision='fp32'):
+        super().__init__()
+        self.camera_urls = list(camera_urls)
+        self.camera_names = list(camera_names or [f"Камера {i + 1}" for i in range(len(self.camera_urls))])
+        self.running = True
+        
+        # Настройки модели и пакетирования
+        self.conf = conf
+        self.iou = iou
+        self.device = device
+        self.half = half
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers  # 0 - инференс в текущем процессе
+        self.backend = backend  # среда выполнения: auto, torch, onnx, openvino
+        self.precision = precision  # точность весов: fp32 или int8 (квантованная модель)
+        
+        self.batcher = None
+        self.model_path = None
+        self.predictor = None
+        self._reload_model = False  # подготовить предиктор заново в потоке обработки
+        
+        # Трекеры и трассы - отдельно для каждой камеры
+        self.trackers = [sv.ByteTrack() for _ in self.camera_urls]
+        self.trace_annotators = [sv.TraceAnnotator() for _ in self.camera_urls]
+        self.box_annotator = sv.BoundingBoxAnnotator()
+        self.label_annotator = sv.LabelAnnotator()
+
+    def set_model(self, model_path):
+        """
+        Задает модель YOLO, общую для всех камер. Модель готовится
+        в потоке обработки, чтобы не блокировать интерфейс.
+        """
+        self.model_path = model_path
+        self.trackers = [sv.ByteTrack() for _ in self.camera_urls]
+        self.trace_annotators = [sv.TraceAnnotator() for _ in self.camera_urls]
+        self._reload_model = self.isRunning()
+        return True
+
+    def _load_predictor(self):
+        """Готовит предиктор для текущих настроек. Ошибки отправляются сигналом."""
+        self._close_predictor()
+        try:
+            # С пулом процессов кадры пакета распределяются по процессам
+            self.predictor = InferenceBackend.create_predictor(
+                self.model_path, conf=self.conf, iou=self.iou, device=self.device, half=self.half,
+                workers=self.workers, backend=self.backend, max_batch=self.max_batch,
+                precision=self.precision, batch=min(self.max_batch, len(self.camera_urls))
+            )
+            return True
+        except Exception as e:
+            self.detection_signal.emit(f"Ошибка загрузки модели {self.model_path}: {e}", "red")
+            return False
+
+    def update_settings(self, settings):
+        """Обновляет настройки модели."""
+        for key in ('conf', 'iou'):
+            if key in settings:
+                setattr(self, key, settings[key])
+        if settings.get('device', self.device) != self.device or settings.get('half', self.half) != self.half:
+            # Устройство и точность определяют подготовленную модель
+            self.device = settings.get('device', self.device)
+            self.half = settings.get('half', self.half)
+            self._reload_model = self.model_path is not None
+        if self.predictor is not None:
+            self.predictor.update_settings(settings)
+
+    def _close_predictor(self):
+        """Освобождает модель в реестре или останавливает процессы инференса."""
+        InferenceBackend.release_predictor(self.predictor)
+        self.predictor = None
+
+    @classmethod
+    def _make_cell(cls, frame, title):
+        """Вписывает кадр в ячейку сетки с сохранением пропорций."""
+        cell_w, cell_h = cls.CELL_SIZE
+        cell = np.zeros((cell_h, cell_w, 3), dtype=np.uint8)
+        if frame is not None:
+            h, w = frame.shape[:2]
+            scale = min(cell_w / w, cell_h / h)
+            new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+            resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+            x = (cell_w - new_w) // 2
+            y = (cell_h - new_h) // 2
+            cell[y:y + new_h, x:x + new_w] = resized
+        else:
+            cv2.putText(cell, "NO SIGNAL", (20, cell_h // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (128, 128, 128), 2)
+        cv2.putText(cell, title, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        return cell
+
+    @classmethod
+    def compose_grid(cls, cells):
+        """Собирает ячейки в сетку, близкую к квадратной."""
+        cell_w, cell_h = cls.CELL_SIZE
+        cols = max(1, math.ceil(math.sqrt(len(cells))))
+        rows = max(1, math.ceil(len(cells) / cols))
+        grid = np.zeros((rows * cell_h, cols * cell_w, 3), dtype=np.uint8)
+        for index, cell in enumerate(cells):
+            row, col = divmod(index, cols)
+            grid[row * cell_h:(row + 1) * cell_h, col * cell_w:(col + 1) * cell_w] = cell
+        return grid
+
+    def _annotate(self, index, frame, detections, names):
+        """Обновляет трекер камеры и рисует результаты на кадре."""
+        detections = self.trackers[index].update_with_detections(detections)
+        labels = [
+            f"#{tracker_id} {names[class_id]}"
+            for class_id, tracker_id in zip(detections.class_id, detections.tracker_id)
+        ]
+        annotated_frame = self.box_annotator.annotate(frame.copy(), detections=detections)
+        annotated_frame = self.label_annotator.annotate(annotated_frame, detections=detections, labels=labels)
+        annotated_frame = self.trace_annotators[index].annotate(annotated_frame, detections=detections)
+        return annotated_frame, len(detections)
+
+    def run(self):
+        """Запускает захват всех камер и общий пакетный инференс."""
+        if self.model_path:
+            self.detection_signal.emit(f"Подготовка модели {self.model_path}...", "gray")
+            if not self._load_predictor():
+                return
+        batcher = MultiStreamBatcher(self.camera_urls, self.max_batch, self.max_wait)
+        for index in batcher.start():
+            self.detection_signal.emit(f"Не удалось открыть камеру {self.camera_urls[index]}", "red")
+        if not batcher.active:
+            return
+        self.batcher = batcher
+
+        cells = [self._make_cell(None, name) for name in self.camera_names]
+        object_counts = [0] * len(self.camera_urls)
+
+        while self.running:
+            batch = batcher.next_batch()
+            if not batch:
+                if batcher.finished:
+                    self.detection_signal.emit("Все видеопотоки завершены", "blue")
+                    break
+                continue
+
+            try:
+                if self._reload_model:
+                    self._reload_model = False
+                    self._load_predictor()
+                predictor = self.predictor
+                if predictor is not None:
+                    detections_list, results = predictor.predict_detections([g.frame for _, g in batch])
+                for position, (index, grabbed) in enumerate(batch):
+                    frame = grabbed.frame
+                    if predictor is not None:
+                        frame, count = self._annotate(
+                            index, frame, detections_list[position], results[position].names
+                        )
+                        if count != object_counts[index]:
+                            object_counts[index] = count
+                            self.detection_signal.emit(
+                                f"{self.camera_names[index]}: обнаружено объектов: {count}", "blue"
+                            )
+                    cells[index] = self._make_cell(frame, self.camera_names[index])
+
+                self.change_pixmap_signal.emit(self.compose_grid(cells))
             except Exception as e:
-                self.detection_signal.emit(f"Ошибка обработки кадра: {e}", "red")
-                import traceback
-                traceback.print_exc()
-            
-            # Задержка для поддержания заданного FPS
-            cv2.waitKey(int(frame_delay * 1000))
+                self.detection_signal.emit(f"Ошибка обработки кадров: {e}", "red")
+
+        batcher.stop()
 
-        cap.release()
+    @property
+    def dropped_frames(self):
+        """Количество пропущенных кадров по каждой камере."""
+        return self.batcher.frames_dropped if self.batcher else []
 
     def stop(self):
         """Останавливает поток."""
         self.running = False
-        self.wait() 
\ No newline at end of file
+        self.wait()
+        self._close_predictor()
@@ -0,0 +1,29 @@
+import os
+import hashlib
+import threading
+
+
+_hash_cache = {}  # {(path, mtime, size): sha1}
+_hash_lock = threading.Lock()
+
+
+def file_sha1(file_path):
+    """
+    SHA-1 содержимого файла.
+    Результат кешируется по пути, времени изменения и размеру файла,
+    поэтому большие файлы (веса моделей, видео) читаются один раз.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    cache_key = (path, stat.st_mtime_ns, stat.st_size)
+    with _hash_lock:
+        digest = _hash_cache.get(cache_key)
+    if digest is None:
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        with _hash_lock:
+            _hash_cache[cache_key] = digest
+    return digest
@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+from collections import namedtuple, deque
+
+import cv2
+
+
+# Кадр, полученный из источника: изображение, монотонная метка времени, номер кадра
+GrabbedFrame = namedtuple("GrabbedFrame", ["frame", "timestamp", "sequence"])
+
+
+class LatestFrameGrabber:
+    """
+    Захват кадров из источника в отдельном потоке.
+
+    Поток непрерывно вычитывает источник и хранит только последний кадр,
+    поэтому буфер OpenCV у сетевых камер не накапливается, а цикл обработки
+    всегда получает самый свежий кадр. Для видеофайлов чтение идет
+    в темпе FPS файла, чтобы не пропускать кадры при воспроизведении.
+
+    Дополнительно хранится короткая история последних кадров (history),
+    по которой StereoPairAssembler подбирает пары по меткам времени.
+    """
+    def __init__(self, source, realtime_files=True, history=1, condition=None):
+        self.source = source
+        self.realtime_files = realtime_files
+        self.capture = None
+        self.source_fps = 0.0
+        self.running = False
+        self.finished = False
+
+        self.frames_grabbed = 0  # всего кадров получено из источника
+        self.frames_dropped = 0  # кадров, которые потребитель не успел забрать
+
+        # Условие может быть общим для нескольких источников (стереопара)
+        self._condition = condition or threading.Condition()
+        self._history = deque(maxlen=max(1, history))
+        self._latest = None
+        self._skip_frames = 0
+        self._last_read_sequence = -1
+        self._frame_interval = 0.0
+        self._thread = None
+
+    @staticmethod
+    def is_file_source(source):
+        """Возвращает True, если источник - локальный видеофайл."""
+        return isinstance(source, str) and os.path.isfile(source)
+
+    @property
+    def condition(self):
+        """Условие, о котором оповещаются потребители при новом кадре."""
+        return self._condition
+
+    def open(self):
+        """Открывает источник без запуска потока захвата."""
+        if self.capture is not None:
+            return True
+        self.capture = cv2.VideoCapture(self.source)
+        if not self.capture.isOpened():
+            self.capture.release()
+            self.capture = None
+            return False
+        self.source_fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        return True
+
+    def start(self, skip_frames=0):
+        """
+        Открывает источник и запускает поток захвата.
+
+        Args:
+            skip_frames: сколько кадров отбросить в начале через grab()
+                без декодирования (выравнивание видеофайлов стереопары)
+        """
+        if not self.open():
+            return False
+        self._skip_frames = max(0, int(skip_frames))
+
+        if self.realtime_files and self.is_file_source(self.source):
+            if self.source_fps > 0:
+                self._frame_interval = 1.0 / self.source_fps
+        else:
+            # Минимальный внутренний буфер для сетевых источников
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"grabber:{self.source}", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _run(self):
+        # Отбрасываем кадры без декодирования в BGR
+        while self.running and self._skip_frames > 0:
+            if not self.capture.grab():
+                break
+            self._skip_frames -= 1
+
+        next_time = time.monotonic()
+        while self.running:
+            ret, frame = self.capture.read()
+            if not ret:
+                break
+            self._publish(frame, time.monotonic())
+
+            if self._frame_interval:
+                next_time += self._frame_interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.monotonic()
+
+        self.capture.release()
+        with self._condition:
+            self.finished = True
+            self._condition.notify_all()
+
+    def _publish(self, frame, timestamp):
+        """Заменяет последний кадр новым и будит ожидающих потребителей."""
+        with self._condition:
+            self._latest = GrabbedFrame(frame, timestamp, self.frames_grabbed)
+            self._history.append(self._latest)
+            self.frames_grabbed += 1
+            self._condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Возвращает самый свежий кадр, который ещё не был прочитан.
+
+        Args:
+            timeout: максимальное время ожидания нового кадра в секундах
+
+        Returns:
+            GrabbedFrame или None, если нового кадра нет (таймаут или конец потока)
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._latest is None or self._latest.sequence <= self._last_read_sequence:
+                if self.finished:
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            latest = self._latest
+
+        self.frames_dropped += latest.sequence - self._last_read_sequence - 1
+        self._last_read_sequence = latest.sequence
+        return latest
+
+    def history_snapshot(self):
+        """Возвращает копию истории последних кадров (от старых к новым)."""
+        with self._condition:
+            return list(self._history)
+
+    def mark_consumed(self, sequence):
+        """Отмечает кадры до sequence включительно как прочитанные."""
+        with self._condition:
+            if sequence <= self._last_read_sequence:
+                return
+            self.frames_dropped += sequence - self._last_read_sequence - 1
+            self._last_read_sequence = sequence
+
+    @property
+    def latest_sequence(self):
+        """Номер последнего захваченного кадра (-1, если кадров не было)."""
+        latest = self._latest
+        return latest.sequence if latest is not None else -1
+
+    @property
+    def last_read_sequence(self):
+        """Номер последнего прочитанного кадра (-1, если кадров не было)."""
+        return self._last_read_sequence
+
+    def stop(self):
+        """Останавливает поток захвата."""
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        elif self.capture is not None:
+            # Источник открыт, но поток захвата не запускался
+            self.capture.release()
+            self.capture = None
@@ -0,0 +1,112 @@
+import time
+import threading
+
+from src.utils.frame_grabber import LatestFrameGrabber
+
+
+class MultiStreamBatcher:
+    """
+    Сборка пакетов кадров из нескольких источников для общего инференса.
+
+    Каждый источник читается своим LatestFrameGrabber; все они оповещают
+    одно общее условие. Пакет формируется, как только новые кадры есть
+    у max_batch источников или с момента появления первого кадра прошло
+    max_wait секунд. При нехватке места в пакете источники обслуживаются
+    по кругу, чтобы ни один поток не голодал.
+    """
+    def __init__(self, sources, max_batch=8, max_wait=0.02):
+        self.sources = list(sources)
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait  # максимальное ожидание заполнения пакета, с
+
+        self._condition = threading.Condition()
+        self.grabbers = [
+            LatestFrameGrabber(source, condition=self._condition) for source in self.sources
+        ]
+        self.active = []  # индексы успешно открытых источников
+        self._next_stream = 0
+
+        self.batches = 0
+        self.frames_batched = 0
+
+    def start(self):
+        """
+        Запускает захват всех источников.
+
+        Returns:
+            list: индексы источников, которые не удалось открыть
+        """
+        failed = []
+        for index, grabber in enumerate(self.grabbers):
+            if grabber.start():
+                self.active.append(index)
+            else:
+                failed.append(index)
+        return failed
+
+    def stop(self):
+        """Останавливает захват всех источников."""
+        for grabber in self.grabbers:
+            grabber.stop()
+        self.active = []
+
+    @property
+    def finished(self):
+        """True, если закончились все источники."""
+        return all(self.grabbers[index].finished for index in self.active)
+
+    @property
+    def frames_dropped(self):
+        """Количество пропущенных кадров по каждому источнику."""
+        return [grabber.frames_dropped for grabber in self.grabbers]
+
+    def _ready_streams(self):
+        return [
+            index for index in self.active
+            if self.grabbers[index].latest_sequence > self.grabbers[index].last_read_sequence
+        ]
+
+    def next_batch(self, timeout=1.0):
+        """
+        Ожидает и возвращает очередной пакет.
+
+        Returns:
+            list: пары (индекс источника, GrabbedFrame); пустой список
+            при таймауте или если все источники закончились
+        """
+        deadline = time.monotonic() + timeout
+        batch_deadline = None
+        with self._condition:
+            while True:
+                ready = self._ready_streams()
+                if len(ready) >= self.max_batch:
+                    break
+                if ready:
+                    if batch_deadline is None:
+                        batch_deadline = time.monotonic() + self.max_wait
+                    remaining = batch_deadline - time.monotonic()
+                else:
+                    if self.finished:
+                        return []
+                    remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            if not ready:
+                return []
+
+            # Круговой порядок: начинаем с источника после последнего обслуженного
+            ready.sort(key=lambda index: (index - self._next_stream) % len(self.grabbers))
+            selected = ready[:self.max_batch]
+            self._next_stream = (selected[-1] + 1) % len(self.grabbers)
+
+            batch = []
+            for index in selected:
+                grabbed = self.grabbers[index].read(timeout=0)
+                if grabbed is not None:
+                    batch.append((index, grabbed))
+
+        self.batches += 1
+        self.frames_batched += len(batch)
+        return batch
@@ -0,0 +1,214 @@
+import time
+import threading
+from collections import deque
+
+
+class StageQueue:
+    """
+    Ограниченная очередь между стадиями конвейера.
+
+    Политика переполнения:
+    - BLOCK: производитель ждет освобождения места;
+    - DROP_OLDEST: из очереди выбрасывается самый старый элемент
+      (потребитель всегда получает свежие данные);
+    - DROP_NEWEST: новый элемент отбрасывается.
+    """
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+    def __init__(self, maxsize=2, policy=DROP_OLDEST):
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Добавляет элемент. Возвращает False, если элемент не попал в очередь."""
+        with self._condition:
+            while len(self._items) >= self.maxsize and not self.closed:
+                if self.policy == self.DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                    break
+                if self.policy == self.DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                self._condition.wait(0.1)
+            if self.closed:
+                return False
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout=0.1):
+        """Возвращает элемент или None (таймаут, очередь закрыта и пуста)."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._items:
+                if self.closed:
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """Закрывает очередь: новые элементы не принимаются, ожидающие просыпаются."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    @property
+    def drained(self):
+        """True, если очередь закрыта и в ней не осталось элементов."""
+        return self.closed and not self._items
+
+
+class PipelineStage:
+    """
+    Стадия конвейера: отдельный поток, который берет элементы из входной
+    очереди, обрабатывает их функцией и передает результат в выходную.
+
+    Функция первой стадии (источника) вызывается без аргументов.
+    Функция может вернуть None (элемент отброшен) или Pipeline.END
+    (источник закончился). Для каждой стадии считается среднее время
+    обслуживания (экспоненциальное сглаживание).
+    """
+    SMOOTHING = 0.1
+
+    def __init__(self, name, function, input_queue=None, output_queue=None, error_handler=None):
+        self.name = name
+        self.function = function
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.error_handler = error_handler or (
+            lambda stage, e: print(f"Ошибка стадии {stage.name}: {e}")
+        )
+
+        self.running = False
+        self.items_processed = 0
+        self.service_time = 0.0  # сглаженное время обработки элемента, с
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name=f"stage:{self.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while self.running:
+                if self.input_queue is not None:
+                    item = self.input_queue.get()
+                    if item is None:
+                        if self.input_queue.drained:
+                            break
+                        continue
+                    args = (item,)
+                else:
+                    args = ()
+
+                start = time.perf_counter()
+                try:
+                    result = self.function(*args)
+                except Exception as e:
+                    self.error_handler(self, e)
+                    continue
+                if result is Pipeline.END:
+                    break
+                if result is None:
+                    continue
+
+                elapsed = time.perf_counter() - start
+                if self.items_processed:
+                    self.service_time += self.SMOOTHING * (elapsed - self.service_time)
+                else:
+                    self.service_time = elapsed
+                self.items_processed += 1
+
+                if self.output_queue is not None:
+                    self.output_queue.put(result)
+        finally:
+            self.running = False
+            if self.output_queue is not None:
+                self.output_queue.close()
+
+    def stop(self):
+        self.running = False
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+class Pipeline:
+    """
+    Конвейер стадий, соединенных ограниченными очередями.
+
+    Каждая стадия работает в своем потоке, поэтому захват кадра N+1,
+    инференс кадра N и отрисовка кадра N-1 выполняются одновременно.
+    """
+    END = object()  # признак окончания данных источника
+
+    def __init__(self, error_handler=None):
+        self.stages = []
+        self.error_handler = error_handler
+
+    def add_stage(self, name, function, queue_size=2, policy=StageQueue.DROP_OLDEST):
+        """
+        Добавляет стадию. Для всех стадий, кроме первой, перед ней создается
+        входная очередь размера queue_size с политикой policy.
+        """
+        input_queue = None
+        if self.stages:
+            input_queue = StageQueue(queue_size, policy)
+            self.stages[-1].output_queue = input_queue
+        self.stages.append(PipelineStage(name, function, input_queue, error_handler=self.error_handler))
+        return self
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=2.0):
+        """Останавливает все стадии и ждет их завершения."""
+        for stage in self.stages:
+            stage.stop()
+            if stage.input_queue is not None:
+                stage.input_queue.close()
+        for stage in self.stages:
+            stage.join(timeout)
+
+    @property
+    def finished(self):
+        """True, если все стадии завершились (источник закончился или остановка)."""
+        return not any(stage.alive for stage in self.stages)
+
+    def stats(self):
+        """
+        Статистика стадий: {имя: {queue_depth, dropped, service_ms, processed}}.
+        queue_depth и dropped относятся к входной очереди стадии.
+        """
+        stats = {}
+        for stage in self.stages:
+            queue = stage.input_queue
+            stats[stage.name] = {
+                'queue_depth': len(queue) if queue is not None else 0,
+                'dropped': queue.dropped if queue is not None else 0,
+                'service_ms': stage.service_time * 1000,
+                'processed': stage.items_processed
+            }
+        return stats
@@ -0,0 +1,154 @@
+import time
+import threading
+from collections import namedtuple
+
+from src.utils.frame_grabber import LatestFrameGrabber
+
+
+# Стереопара: кадры, метка времени (в шкале камеры 1), рассогласование и номера кадров
+StereoPair = namedtuple("StereoPair", ["frame1", "frame2", "timestamp", "skew", "sequences"])
+
+
+class StereoPairAssembler:
+    """
+    Сборка стереопар по меткам времени.
+
+    Каждый кадр обеих камер получает монотонную метку времени при захвате.
+    К меткам камеры 2 применяется смещение time_diff из sync_data.json,
+    после чего пара составляется из кадров с ближайшими метками
+    в пределах допуска tolerance. Если допуск не задан, он равен половине
+    периода кадра более медленной камеры (по CAP_PROP_FPS): соседние
+    кадры одной камеры никогда не попадают в допуск одновременно.
+    Для видеофайлов смещение компенсируется один раз при старте:
+    опережающий файл пропускает кадры через grab() без декодирования.
+    """
+    DEFAULT_FPS = 30.0  # если источник не сообщает частоту кадров
+
+    def __init__(self, camera1_url, camera2_url, time_diff=0.0, tolerance=None, history=8):
+        self.time_diff = float(time_diff or 0.0)
+        self.requested_tolerance = tolerance  # None - по частоте кадров источников
+        # Допустимое рассогласование пары, с (уточняется в start())
+        self.tolerance = tolerance if tolerance is not None else 0.5 / self.DEFAULT_FPS
+
+        condition = threading.Condition()
+        self.grabbers = (
+            LatestFrameGrabber(camera1_url, history=history, condition=condition),
+            LatestFrameGrabber(camera2_url, history=history, condition=condition)
+        )
+        self._condition = condition
+        self._offset = self.time_diff
+        self._examined = (-1, -1)  # последние кадры, по которым уже пытались собрать пару
+
+        self.pairs_assembled = 0
+        self.pairs_rejected = 0
+
+    @classmethod
+    def from_sync_data(cls, camera1_url, camera2_url, sync_data, **kwargs):
+        """Создает сборщик со смещением time_diff из данных синхронизации."""
+        time_diff = 0.0
+        if sync_data:
+            time_diff = sync_data.get('time_diff', 0.0)
+        return cls(camera1_url, camera2_url, time_diff=time_diff, **kwargs)
+
+    def start(self):
+        """Открывает обе камеры и запускает захват."""
+        grabber1, grabber2 = self.grabbers
+        if not grabber1.open() or not grabber2.open():
+            self.stop()
+            return False
+
+        if self.requested_tolerance is None:
+            rates = [g.source_fps for g in self.grabbers if g.source_fps > 0]
+            self.tolerance = 0.5 / (min(rates) if rates else self.DEFAULT_FPS)
+
+        skip1 = skip2 = 0
+        if self.time_diff and all(LatestFrameGrabber.is_file_source(g.source) for g in self.grabbers):
+            # Видеофайлы: вспышка во втором файле позже на time_diff,
+            # значит второй файл нужно промотать вперед (и наоборот)
+            if self.time_diff > 0:
+                skip2 = int(round(self.time_diff * grabber2.source_fps))
+            else:
+                skip1 = int(round(-self.time_diff * grabber1.source_fps))
+            self._offset = 0.0
+
+        grabber1.start(skip_frames=skip1)
+        grabber2.start(skip_frames=skip2)
+        return True
+
+    def stop(self):
+        """Останавливает захват на обеих камерах."""
+        for grabber in self.grabbers:
+            grabber.stop()
+
+    @property
+    def finished(self):
+        """True, если хотя бы один источник закончился."""
+        return any(grabber.finished for grabber in self.grabbers)
+
+    @property
+    def frames_dropped(self):
+        """Количество пропущенных кадров по каждой камере."""
+        return tuple(grabber.frames_dropped for grabber in self.grabbers)
+
+    def read(self, timeout=1.0):
+        """
+        Возвращает следующую синхронную пару кадров.
+
+        Returns:
+            StereoPair или None (таймаут, конец потока)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            pair = self._try_assemble()
+            if pair is not None:
+                return pair
+            if self.finished:
+                return None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._condition:
+                if self._latest_sequences() == self._examined:
+                    self._condition.wait(remaining)
+
+    def _latest_sequences(self):
+        return tuple(grabber.latest_sequence for grabber in self.grabbers)
+
+    def _try_assemble(self):
+        """Пытается собрать пару из новых кадров истории обеих камер."""
+        latest = self._latest_sequences()
+        if latest == self._examined:
+            return None
+        self._examined = latest
+
+        grabber1, grabber2 = self.grabbers
+        history1 = [f for f in grabber1.history_snapshot() if f.sequence > grabber1.last_read_sequence]
+        history2 = [f for f in grabber2.history_snapshot() if f.sequence > grabber2.last_read_sequence]
+        if not history1 or not history2:
+            return None
+
+        # Самый поздний момент, который уже покрыт обеими камерами
+        reference = min(history1[-1].timestamp, history2[-1].timestamp - self._offset)
+
+        frame1 = min(history1, key=lambda f: abs(f.timestamp - reference))
+        frame2 = min(history2, key=lambda f: abs(f.timestamp - self._offset - reference))
+        skew = (frame2.timestamp - self._offset) - frame1.timestamp
+
+        if abs(skew) > self.tolerance:
+            # Пары нет: отбрасываем более старый кадр и ждем следующий
+            self.pairs_rejected += 1
+            self._examined = (-1, -1)
+            if skew > 0:
+                grabber1.mark_consumed(frame1.sequence)
+            else:
+                grabber2.mark_consumed(frame2.sequence)
+            return None
+
+        grabber1.mark_consumed(frame1.sequence)
+        grabber2.mark_consumed(frame2.sequence)
+        self.pairs_assembled += 1
+        return StereoPair(
+            frame1.frame, frame2.frame, frame1.timestamp, skew,
+            (frame1.sequence, frame2.sequence)
+        )
@@ -248,16 +248,30 @@ class Widget(QWidget):
 
     def show_settings(self):
         """Open the settings dialog."""
-        dialog = SettingsDialog(self, self.model_path)
-        
         # Load current settings from model section instead of detection
         model_settings = self.config.get_model_settings()
+        dialog = SettingsDialog(self, self.model_path, model_settings.get('imgsz_sizes'))
+        tracker_settings = self.config.get_tracker_settings()
+        motion_settings = self.config.get_motion_gate_settings()
+        distance_settings = self.config.get_distance_measure_settings()
         settings = {
             'conf': model_settings['conf'],
             'iou': model_settings['iou'],
             'device': model_settings['device'],
             'half': model_settings['half'],
-            'fps': 30  # Default value for FPS
+            'workers': model_settings.get('workers', 0),
+            'backend': model_settings.get('backend', 'auto'),
+            'precision': model_settings.get('precision', 'fp32'),
+            'adaptive_imgsz': model_settings.get('adaptive_imgsz', True),
+            'fps': tracker_settings['fps'],
+            'detect_interval': tracker_settings['detect_interval'],
+            'adaptive_cadence': tracker_settings['adaptive_cadence'],
+            'motion_gate': motion_settings['enabled'],
+            'motion_min_pixels': motion_settings['min_pixels'],
+            'safety_interval': motion_settings['safety_interval'],
+            'point_undistortion': distance_settings['point_undistortion'],
+            'refine_disparity': distance_settings['refine_disparity'],
+            'dense_depth': distance_settings['dense_depth']
         }
         dialog.set_settings(settings)
         
@@ -270,15 +284,47 @@ class Widget(QWidget):
                 conf=new_settings.get('conf'),
                 iou=new_settings.get('iou'),
                 device=new_settings.get('device'),
-                half=new_settings.get('half')
+                half=new_settings.get('half'),
+                workers=new_settings.get('workers'),
+                backend=new_settings.get('backend'),
+                precision=new_settings.get('precision'),
+                adaptive_imgsz=new_settings.get('adaptive_imgsz')
+            )
+            self.config.set_tracker_settings(
+                fps=new_settings.get('fps'),
+                detect_interval=new_settings.get('detect_interval'),
+                adaptive_cadence=new_settings.get('adaptive_cadence')
+            )
+            self.config.set_motion_gate_settings(
+                enabled=new_settings.get('motion_gate'),
+                min_pixels=new_settings.get('motion_min_pixels'),
+                safety_interval=new_settings.get('safety_interval')
+            )
+            self.config.set_distance_measure_options(
+                point_undistortion=new_settings.get('point_undistortion'),
+                refine_disparity=new_settings.get('refine_disparity'),
+                dense_depth=new_settings.get('dense_depth')
             )
             
             # If video stream is running, apply new settings
             if self.video_handler.thread and self.video_handler.thread.isRunning():
                 self.video_handler.thread.update_settings(new_settings)
                 self.log_message("Настройки успешно обновлены", "green", both_logs=True)
+                if (new_settings.get('workers') != model_settings.get('workers', 0)
+                        or new_settings.get('backend') != model_settings.get('backend', 'auto')
+                        or new_settings.get('precision') != model_settings.get('precision', 'fp32')
+                        or new_settings.get('adaptive_imgsz') != model_settings.get('adaptive_imgsz', True)):
+                    self.log_message("Процессы и среда инференса изменятся после перезапуска видеопотока", "blue", both_logs=True)
             else:
                 self.log_message("Настройки сохранены и будут применены при запуске видеопотока", "blue", both_logs=True)
+            
+            # Running distance measurement: per-frame options apply at once,
+            # point undistortion changes the pipeline and needs a restart
+            distance_thread = self.distance_handler.distance_thread
+            if distance_thread and distance_thread.isRunning():
+                self.distance_handler.apply_settings(new_settings)
+                if new_settings.get('point_undistortion') != distance_settings['point_undistortion']:
+                    self.log_message("Коррекция по точкам изменится после перезапуска измерения", "blue", False)
 
     def log_message(self, message, color="black", both_logs=False):
         """Log a message to the appropriate log panel."""
@@ -314,6 +360,17 @@ class Widget(QWidget):
         # Add camera buttons to the container
         self.log_message("Камеры успешно загружены.", "black")
         
+        # Store camera list for the multi-camera grid
+        self.camera_urls = cameras
+        self.camera_names = camera_names
+        
+        # Button to watch all cameras at once
+        if len(cameras) > 1:
+            all_btn = UIComponentsFactory.create_camera_button(
+                "Все камеры (сетка)", None, lambda _: self.select_all_cameras()
+            )
+            self.cameras_container.addWidget(all_btn)
+        
         for i, (camera_url, camera_name) in enumerate(zip(cameras, camera_names)):
             # Create camera button with icon and name from file
             btn = UIComponentsFactory.create_camera_button(camera_name, camera_url, self.select_camera, i)
@@ -361,11 +418,10 @@ class Widget(QWidget):
             self.log_message(f"Выбрана модель: {file_name}", "blue", both_logs=True)
             
             # If video stream is running, update the model
+            # (the worker thread prepares it; errors arrive through detection_signal)
             if self.video_handler.thread and self.video_handler.thread.isRunning():
-                if self.video_handler.thread.set_model(self.model_path):
-                    self.log_message("Модель успешно загружена в режиме распознавания", "green", both_logs=True)
-                else:
-                    self.log_message("Ошибка при загрузке модели в режиме распознавания", "red", both_logs=True)
+                self.video_handler.thread.set_model(self.model_path)
+                self.log_message("Модель будет загружена в режиме распознавания", "blue", both_logs=True)
             
             # Also update distance handler model if it's running
             if self.distance_handler.distance_thread and self.distance_handler.distance_thread.isRunning():
@@ -390,6 +446,13 @@ class Widget(QWidget):
         if not self.video_handler.select_camera(camera_url):
             self.log_message(f"Камера {camera_url} недоступна.", "red")
 
+    @Slot()
+    def select_all_cameras(self):
+        """Start detection on all cameras in a grid view."""
+        self.log_message(f"Выбраны все камеры: {len(self.camera_urls)}", "black")
+        if not self.video_handler.select_all_cameras(self.camera_urls, self.camera_names):
+            self.log_message("Не удалось запустить многокамерный режим.", "red")
+
     @Slot(QPixmap)
     def update_video_frame(self, pixmap):
         """Update the video frame in the UI."""
@@ -413,6 +476,13 @@ class Widget(QWidget):
         # Index 0 - Camera 1 (original_frame), Index 1 - Camera 2 (processed_frame)
         frame_to_display = original_frame if display_index == 0 else processed_frame
         
+        # Dense depth map is computed in camera 1 coordinates, blend it over that view
+        depth_map = info.get('depth_map')
+        if depth_map is not None and display_index == 0:
+            h, w = frame_to_display.shape[:2]
+            depth_map = cv2.resize(depth_map, (w, h), interpolation=cv2.INTER_NEAREST)
+            frame_to_display = cv2.addWeighted(frame_to_display, 0.6, depth_map, 0.4, 0)
+        
         # Convert frame for display in Qt format
         qt_img = convert_cv_qt(frame_to_display)
         